@@ -0,0 +1,76 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from knox.auth import TokenAuthentication
+from knox.crypto import hash_token
+from knox.models import AuthToken
+from rest_framework import exceptions
+
+
+def token_cache_key(digest):
+    return f'knox-token:{digest}'
+
+
+def invalidate_token(digest):
+    cache.delete(token_cache_key(digest))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Knox token authentication that remembers verified tokens for a short time.
+
+    A cached token costs one SHA-512 and a primary key lookup of the user instead
+    of the token lookup, the per-user token cleanup and the expiry refresh. Only the
+    digest, user id and expiry are cached, never the token itself. Entries live for
+    at most TOKEN_CACHE_TIMEOUT seconds, so Knox's own expiry refresh and its write
+    run at most once per token in that window.
+    """
+
+    def authenticate_credentials(self, token):
+        try:
+            digest = hash_token(token.decode('utf-8'))
+        except (TypeError, ValueError):
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        entry = cache.get(token_cache_key(digest))
+        if entry is None or (entry['expiry'] is not None and entry['expiry'] < timezone.now()):
+            # The full Knox check verifies, cleans up and renews the token
+            user, auth_token = super().authenticate_credentials(token)
+            self.remember(auth_token)
+            return user, auth_token
+
+        user = User.objects.filter(pk=entry['user_id']).first()
+        if user is None:
+            invalidate_token(digest)
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        auth_token = AuthToken(digest=digest, token_key=entry['token_key'], user=user, expiry=entry['expiry'])
+        return self.validate_user(auth_token)
+
+    def remember(self, auth_token):
+        timeout = settings.TOKEN_CACHE_TIMEOUT
+        if auth_token.expiry is not None:
+            timeout = min(timeout, (auth_token.expiry - timezone.now()).total_seconds())
+
+        entry = {
+            'token_key': auth_token.token_key,
+            'user_id': auth_token.user_id,
+            'expiry': auth_token.expiry,
+        }
+        cache.set(token_cache_key(auth_token.digest), entry, max(timeout, 0))
+
+
+async def aauthenticate(request):
+    """
+    Authenticate a plain Django request from an async view.
+
+    Returns the user, or None when no valid token was sent.
+    """
+    try:
+        result = await sync_to_async(CachedTokenAuthentication().authenticate)(request)
+    except exceptions.AuthenticationFailed:
+        return None
+    return result[0] if result else None
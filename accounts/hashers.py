@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_worker = threading.local()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix='password-hash',
+                initializer=mark_worker,
+            )
+    return _pool
+
+
+def mark_worker():
+    _worker.active = True
+
+
+def run_bounded(func, *args, **kwargs):
+    """
+    Run a hash computation on the bounded pool and wait for its result.
+
+    However many requests hash at once (under ASGI every request has its own
+    thread), at most PASSWORD_HASH_WORKERS hashes run in parallel; the rest
+    queue instead of oversubscribing the CPU and, for scrypt and Argon2, memory.
+    """
+    if getattr(_worker, 'active', False):
+        return func(*args, **kwargs)
+    return get_pool().submit(func, *args, **kwargs).result()
+
+
+class BoundedHasherMixin:
+    def encode(self, password, salt, *args, **kwargs):
+        return run_bounded(super().encode, password, salt, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        return run_bounded(super().verify, password, encoded)
+
+
+class ScryptPasswordHasher(BoundedHasherMixin, hashers.ScryptPasswordHasher):
+    pass
+
+
+class Argon2PasswordHasher(BoundedHasherMixin, hashers.Argon2PasswordHasher):
+    pass
+
+
+class PBKDF2PasswordHasher(BoundedHasherMixin, hashers.PBKDF2PasswordHasher):
+    pass
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Index auth_user.email, looked up by every registration to reject duplicates.
+
+    The User model belongs to django.contrib.auth, so the index is created in SQL
+    rather than declared in the model's Meta.
+    """
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX accounts_user_email_idx ON auth_user (email);',
+            'DROP INDEX accounts_user_email_idx;',
+        ),
+    ]
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from knox.models import AuthToken
+
+from .authentication import invalidate_token
+
+
+@receiver(post_delete, sender=AuthToken)
+def forget_deleted_token(sender, instance, **kwargs):
+    # Covers logout, admin deletion and Knox's own cleanup of expired tokens
+    invalidate_token(instance.digest)
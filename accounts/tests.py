@@ -1,3 +1,209 @@
-from django.test import TestCase
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from knox.models import AuthToken
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+
+from .authentication import CachedTokenAuthentication
+from .throttling import TokenBucket, reset_buckets
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='student', password='secret')
+        self.auth_token, self.token = AuthToken.objects.create(self.user)
+
+    def authenticate(self, token=None):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {token or self.token}')
+        return CachedTokenAuthentication().authenticate(request)
+
+    def test_verified_token_is_cached(self):
+        self.assertEqual(self.authenticate()[0], self.user)
+
+        # Only the user is loaded once the token has been verified
+        with self.assertNumQueries(1):
+            user, auth_token = self.authenticate()
+        self.assertEqual(user, self.user)
+        self.assertEqual(auth_token.digest, self.auth_token.digest)
+
+    def test_deleted_token_is_rejected(self):
+        self.authenticate()
+        AuthToken.objects.filter(user=self.user).delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_inactive_user_is_rejected(self):
+        self.authenticate()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_logout_invalidates_token(self):
+        headers = {'HTTP_AUTHORIZATION': f'Token {self.token}'}
+        self.assertEqual(self.client.post('/api/accounts/logout/', **headers).status_code, 200)
+        self.assertEqual(self.client.post('/api/accounts/logout/', **headers).status_code, 401)
+
+    def test_logout_keeps_other_devices_signed_in(self):
+        other_token = AuthToken.objects.create(self.user)[1]
+        self.client.post('/api/accounts/logout/', HTTP_AUTHORIZATION=f'Token {self.token}')
+
+        self.assertEqual(self.client.post('/api/accounts/logout/', HTTP_AUTHORIZATION=f'Token {self.token}').status_code, 401)
+        self.assertEqual(self.authenticate(other_token)[0], self.user)
+
+    def test_logout_all_signs_out_every_device(self):
+        other_token = AuthToken.objects.create(self.user)[1]
+        self.authenticate(other_token)
+        self.client.post('/api/accounts/logout-all/', HTTP_AUTHORIZATION=f'Token {self.token}')
+
+        self.assertFalse(AuthToken.objects.filter(user=self.user).exists())
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(other_token)
+
+
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        reset_buckets()
+
+    def test_new_passwords_use_the_preferred_hasher(self):
+        user = User.objects.create_user(username='student', password='secret')
+        self.assertTrue(user.password.startswith('scrypt$'))
+
+    @override_settings(PASSWORD_HASHERS=['accounts.hashers.PBKDF2PasswordHasher'])
+    def create_legacy_user(self):
+        return User.objects.create_user(username='legacy', password='secret')
+
+    def test_login_upgrades_legacy_hashes(self):
+        user = self.create_legacy_user()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+
+        response = self.client.post('/api/accounts/login/', {'username': 'legacy', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(User.objects.get(pk=user.pk).password.startswith('scrypt$'))
+
+    def test_hashing_runs_on_the_bounded_pool(self):
+        threads = []
+        verify = hashers.ScryptPasswordHasher.verify
+
+        def record_thread(hasher, password, encoded):
+            threads.append(threading.current_thread().name)
+            return verify(hasher, password, encoded)
+
+        user = User.objects.create_user(username='student', password='secret')
+        with mock.patch.object(hashers.ScryptPasswordHasher, 'verify', record_thread):
+            self.assertTrue(user.check_password('secret'))
+        self.assertTrue(threads[0].startswith('password-hash'))
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {'login_ip': '5/min', 'login_username': '3/min', 'register_ip': '2/hour'},
+})
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        reset_buckets()
+        User.objects.create_user(username='student', password='secret')
+
+    def login(self, username='student', password='wrong', address='10.0.0.1'):
+        return self.client.post(
+            '/api/accounts/login/', {'username': username, 'password': password}, REMOTE_ADDR=address,
+        )
+
+    def test_throttled_login_skips_database_and_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 400)
+
+        with self.assertNumQueries(0), mock.patch.object(hashers.ScryptPasswordHasher, 'verify') as verify:
+            response = self.login(password='secret')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        verify.assert_not_called()
+
+    def test_username_is_limited_across_addresses(self):
+        for n in range(3):
+            self.login(username='Student', address=f'10.0.0.{n}')
+        self.assertEqual(self.login(address='10.0.0.9').status_code, 429)
+        # Another account from the same address still gets through
+        self.assertEqual(self.login(username='other', address='10.0.0.9').status_code, 400)
+
+    def test_address_is_limited_across_usernames(self):
+        for n in range(5):
+            self.login(username=f'user{n}')
+        self.assertEqual(self.login(username='student', password='secret').status_code, 429)
+        self.assertEqual(self.login(password='secret', address='10.0.0.2').status_code, 200)
+
+    def test_forwarded_for_header_does_not_pick_the_bucket(self):
+        for n in range(5):
+            self.client.post(
+                '/api/accounts/login/', {'username': f'user{n}', 'password': 'wrong'},
+                REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=f'192.0.2.{n}',
+            )
+        response = self.client.post(
+            '/api/accounts/login/', {'username': 'student', 'password': 'secret'},
+            REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='192.0.2.99',
+        )
+        self.assertEqual(response.status_code, 429)
+
+    def test_forwarded_for_header_does_not_pick_the_registration_bucket(self):
+        for n in range(3):
+            response = self.client.post('/api/accounts/register/', {
+                'username': f'new{n}', 'email': f'new{n}@example.com', 'password': 'secret', 'confirm_password': 'secret',
+            }, HTTP_X_FORWARDED_FOR=f'192.0.2.{n}')
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(User.objects.filter(username='new2').exists())
+
+    def test_trusted_proxy_address_is_read_from_forwarded_for(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            for n in range(6):
+                # The client prepends whatever it likes, the proxy appends the real peer
+                response = self.client.post(
+                    '/api/accounts/login/', {'username': f'user{n}', 'password': 'wrong'},
+                    REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=f'192.0.2.{n}, 203.0.113.7',
+                )
+            self.assertEqual(response.status_code, 429)
+            response = self.client.post(
+                '/api/accounts/login/', {'username': 'student', 'password': 'secret'},
+                REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.8',
+            )
+            self.assertEqual(response.status_code, 200)
+
+    def test_registration_is_limited_per_address(self):
+        for n in range(2):
+            response = self.client.post('/api/accounts/register/', {
+                'username': f'new{n}', 'email': f'new{n}@example.com', 'password': 'secret', 'confirm_password': 'secret',
+            })
+            self.assertEqual(response.status_code, 201)
+        response = self.client.post('/api/accounts/register/', {
+            'username': 'new2', 'email': 'new2@example.com', 'password': 'secret', 'confirm_password': 'secret',
+        })
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(User.objects.filter(username='new2').exists())
+
+    def test_bucket_refills_over_time(self):
+        bucket = TokenBucket(capacity=2, rate=1, max_keys=10)
+        with mock.patch('accounts.throttling.time.monotonic', side_effect=[0, 0, 0, 0.5, 1.0]):
+            self.assertEqual(bucket.take('key'), 0)
+            self.assertEqual(bucket.take('key'), 0)
+            self.assertEqual(bucket.take('key'), 1)
+            self.assertEqual(bucket.take('key'), 0.5)
+            self.assertEqual(bucket.take('key'), 0)
+
+    def test_least_recently_used_keys_are_dropped(self):
+        bucket = TokenBucket(capacity=1, rate=1, max_keys=2)
+        for key in ['a', 'b', 'a', 'c']:
+            bucket.take(key)
+        self.assertEqual(list(bucket.buckets), ['a', 'c'])
+
+    def test_email_lookup_uses_index(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'auth_user')
+        self.assertEqual(constraints['accounts_user_email_idx']['columns'], ['email'])
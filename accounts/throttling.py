@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucket:
+    """
+    Per-process token buckets, one per key, refilled continuously at ``rate`` tokens a second.
+
+    A key starts with ``capacity`` tokens, so short bursts go through while a
+    sustained flood is held to the refill rate. Only the ``max_keys`` most
+    recently used keys are kept; a dropped key has usually refilled anyway.
+    """
+
+    def __init__(self, capacity, rate, max_keys):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, key):
+        """
+        Take a token for ``key`` and return 0, or the seconds until one is available.
+        """
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate
+            if not wait:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return wait
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(scope, rate):
+    with _buckets_lock:
+        if (scope, rate) not in _buckets:
+            num_requests, duration = SimpleRateThrottle.parse_rate(None, rate)
+            _buckets[scope, rate] = TokenBucket(num_requests, num_requests / duration, settings.THROTTLE_MAX_KEYS)
+        return _buckets[scope, rate]
+
+
+def reset_buckets():
+    with _buckets_lock:
+        _buckets.clear()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Rate throttle keeping its state in process memory instead of the cache.
+
+    Checking a request costs a dict lookup under a lock, so throttled requests
+    are turned away without touching the database or the cache. The rate is
+    read from DEFAULT_THROTTLE_RATES under ``<view.throttle_scope>_<key_name>``;
+    a scope without a rate is not throttled.
+    """
+
+    key_name = None
+
+    def __init__(self):
+        # The scope comes from the view, see allow_request
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = f'{getattr(view, "throttle_scope", None)}_{self.key_name}'
+        self.rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if self.rate is None:
+            return True
+
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        self.wait_time = get_bucket(self.scope, self.rate).take(key)
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class IPThrottle(TokenBucketThrottle):
+    key_name = 'ip'
+
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UsernameThrottle(TokenBucketThrottle):
+    key_name = 'username'
+
+    def get_cache_key(self, request, view):
+        # Usernames are stored lowercased, so every spelling shares a bucket
+        data = request.data
+        username = data.get('username') if hasattr(data, 'get') else None
+        return username.lower() if isinstance(username, str) and username else None
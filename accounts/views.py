@@ -4,11 +4,14 @@ from knox.models import AuthToken
 
 from .models import *
 from .serializers import *
+from .throttling import IPThrottle, UsernameThrottle
 
 # Create your views here.
 
 class RegisterView(generics.GenericAPIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [IPThrottle]
+    throttle_scope = 'register'
 
     def post(self, request, format=None):
         serializer = RegisterSerializer(data=request.data)
@@ -29,6 +32,8 @@ class RegisterView(generics.GenericAPIView):
 
 class LoginView(generics.GenericAPIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [IPThrottle, UsernameThrottle]
+    throttle_scope = 'login'
 
     def post(self, request, *args, **kwargs):
         serializer = LoginSerializer(data=request.data)
@@ -42,10 +47,19 @@ class LogoutView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, format=None):
-        user = request.user
-
-        # Delete the current user's token(s)
-        AuthToken.objects.filter(user=user).delete()
+        # Only the token of this device; the user's other sessions stay signed in
+        if isinstance(request.auth, AuthToken):
+            request.auth.delete()
         
         return Response({"message": "Logout successful.", "Token" : 'Token Destroyed'}, status=status.HTTP_200_OK)
 
+
+class LogoutAllView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, format=None):
+        # Delete the current user's token(s) on every device
+        AuthToken.objects.filter(user=request.user).delete()
+
+        return Response({"message": "Logged out of all devices.", "Token" : 'Tokens Destroyed'}, status=status.HTTP_200_OK)
+
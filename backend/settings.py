@@ -3,6 +3,7 @@ Django settings for olms project.
 
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,11 +44,26 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.JSONRenderer',
     ],
       'DEFAULT_AUTHENTICATION_CLASSES': [
-        'knox.auth.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.CursorPagination',
+    'PAGE_SIZE': 20,
+    # Reverse proxies in front of the app; client addresses are read this many hops back in
+    # X-Forwarded-For, or from REMOTE_ADDR when 0, so clients cannot pick their own throttle key
+    'NUM_PROXIES': int(os.environ.get('LMS_NUM_PROXIES', 0)),
+    # Token buckets of accounts.throttling: the burst allowed, refilled over the period
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.environ.get('LMS_THROTTLE_LOGIN_IP', '30/min'),
+        'login_username': os.environ.get('LMS_THROTTLE_LOGIN_USERNAME', '10/min'),
+        'register_ip': os.environ.get('LMS_THROTTLE_REGISTER_IP', '20/hour'),
+    },
 }
 
+# Most keys (addresses, usernames) each throttle scope remembers in memory
+THROTTLE_MAX_KEYS = 100000
+
 MIDDLEWARE = [
+    'core.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -95,6 +111,79 @@ DATABASES = {
 }
 
 
+# Cache
+
+# The local-memory cache is private to each process. Deployments running several
+# worker processes should set LMS_CACHE_BACKEND=file so cached responses and their
+# invalidation are shared between workers.
+if os.environ.get('LMS_CACHE_BACKEND') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('LMS_CACHE_LOCATION', BASE_DIR / '.cache'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'lms',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Learner progress events are merged in memory and written every PROGRESS_FLUSH_INTERVAL
+# seconds, or as soon as PROGRESS_BUFFER_SIZE lessons are pending. 0 disables the timer.
+PROGRESS_FLUSH_INTERVAL = float(os.environ.get('LMS_PROGRESS_FLUSH_INTERVAL', 2))
+PROGRESS_BUFFER_SIZE = 5000
+
+# Rows younger than this are left for the next refresh_rollups run, see core.analytics.refresh
+ROLLUP_SETTLE_SECONDS = 60
+
+# Seconds a cached course or lesson list response is kept
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Seconds a verified Knox token is trusted without going back to the database
+TOKEN_CACHE_TIMEOUT = 60
+
+
+# Instrumentation
+
+# Share of requests whose queries, DB time, serializer time and latency are recorded
+INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get('LMS_INSTRUMENTATION_SAMPLE_RATE', 0.05))
+
+# Also count statements repeated within a request, the signature of an N+1 loop
+INSTRUMENTATION_DETECT_DUPLICATES = os.environ.get('LMS_INSTRUMENTATION_DUPLICATES') == '1'
+
+
+# Real-time messages
+
+# Pub/sub used to push new messages to open event streams
+MESSAGE_BROKER = 'core.pubsub.InProcessBroker'
+
+# Seconds between keep-alive comments on idle event streams
+EVENT_STREAM_KEEPALIVE = 15
+
+
+# Password hashing
+
+# New passwords are hashed with the hasher named by LMS_PASSWORD_HASHER; the others
+# still verify existing hashes, which are upgraded on the next successful login.
+# argon2 needs the argon2-cffi package.
+_PASSWORD_HASHERS = {
+    'scrypt': 'accounts.hashers.ScryptPasswordHasher',
+    'argon2': 'accounts.hashers.Argon2PasswordHasher',
+    'pbkdf2': 'accounts.hashers.PBKDF2PasswordHasher',
+}
+_PREFERRED_HASHER = os.environ.get('LMS_PASSWORD_HASHER', 'scrypt')
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[_PREFERRED_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != _PREFERRED_HASHER
+]
+
+# Hashes computed in parallel per process; further logins queue for a worker
+PASSWORD_HASH_WORKERS = int(os.environ.get('LMS_PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -0,0 +1,14 @@
+"""
+Performance benchmarks for the LMS API.
+
+They run against the test database and are not collected by the regular test
+run. Run them with:
+
+    python manage.py test benchmarks --pattern="bench_*.py"
+
+bench_endpoints seeds a dataset (sized with BENCH_SEED_* variables), drives every
+API route and fails when queries per request, or p95 latency on a dataset of the
+same size, regress against baseline.json. Refresh the baseline with:
+
+    BENCH_UPDATE_BASELINE=1 python manage.py test benchmarks.bench_endpoints --pattern="bench_*.py"
+"""
@@ -0,0 +1,126 @@
+import os
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.test import override_settings
+from rest_framework.test import APIClient, APITestCase
+
+from core.analytics import BUCKETS, refresh, score_bucket
+from core.models import Assessment, Attempt, Content, Course, Enrollment, Instructor
+
+from .utils import measure, report
+
+
+ENROLLMENTS = int(os.environ.get('BENCH_ANALYTICS_ENROLLMENTS', 1_000_000))
+COURSES = 4
+DAYS = 365
+ATTEMPTS = int(os.environ.get('BENCH_ANALYTICS_ATTEMPTS', 100_000))
+ASSESSMENTS = 10
+BATCH_SIZE = 5000
+
+
+def on_day(day):
+    # auto_now_add fields take their value from timezone.now()
+    return mock.patch('django.utils.timezone.now', return_value=datetime(2023, 1, 1, 12, tzinfo=dt_timezone.utc) + timedelta(days=day))
+
+
+@override_settings(ROLLUP_SETTLE_SECONDS=0)
+class AnalyticsBenchmark(APITestCase):
+    """
+    Analytics of the largest course, read from the rollups or aggregated from the raw rows.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='bench-instructor', password='secret')
+        instructor = Instructor.objects.create(user=user, bio='')
+        Course.objects.bulk_create([
+            Course(
+                title=f'Course {n}', slug=f'bench-course-{n}', instructor=instructor, description='',
+                start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+            )
+            for n in range(COURSES)
+        ])
+        courses = list(Course.objects.order_by('id'))
+        cls.course = courses[0]
+
+        students_count = ENROLLMENTS // COURSES
+        User.objects.bulk_create([User(username=f'bench-student-{n}') for n in range(students_count)], batch_size=BATCH_SIZE)
+        students = list(User.objects.filter(username__startswith='bench-student-').order_by('id').values_list('pk', flat=True))
+
+        # Every student in every course, spread over a year
+        per_day = -(-students_count // DAYS)
+        for day in range(DAYS):
+            cohort = students[day * per_day:(day + 1) * per_day]
+            with on_day(day):
+                Enrollment.objects.bulk_create(
+                    [Enrollment(course=course, student_id=student) for course in courses for student in cohort],
+                    batch_size=BATCH_SIZE,
+                )
+
+        lesson = Content.objects.create(course=cls.course, title='Lesson', slug='bench-lesson', description='')
+        Assessment.objects.bulk_create([
+            Assessment(content=lesson, title=f'quiz {n}', description='') for n in range(ASSESSMENTS)
+        ])
+        assessments = list(Assessment.objects.filter(content=lesson).values_list('pk', flat=True))
+        per_day = -(-ATTEMPTS // DAYS)
+        for day in range(DAYS):
+            with on_day(day):
+                Attempt.objects.bulk_create(
+                    [
+                        Attempt(assessment_id=assessments[n % ASSESSMENTS], student_id=students[n % len(students)],
+                                score=n % 11, total=10)
+                        for n in range(day * per_day, min(ATTEMPTS, (day + 1) * per_day))
+                    ],
+                    batch_size=BATCH_SIZE,
+                )
+
+    def live_analytics(self):
+        enrollments, total = [], 0
+        per_day = Enrollment.objects.filter(course=self.course).annotate(day=TruncDate('enrollment_date'))
+        for row in per_day.values('day').annotate(count=Count('pk')).order_by('day'):
+            total += row['count']
+            enrollments.append({'day': row['day'], 'enrollments': row['count'], 'total': total})
+
+        distributions = defaultdict(lambda: [0] * BUCKETS)
+        attempts = Attempt.objects.filter(assessment__content__course=self.course).values('assessment_id', 'score', 'total')
+        for row in attempts.annotate(count=Count('pk')).order_by():
+            distributions[row['assessment_id']][score_bucket(row['score'], row['total'])] += row['count']
+        return enrollments, distributions
+
+    def test_rollups_against_live_aggregation(self):
+        start = time.perf_counter()
+        refresh('enrollments', chunk_size=50_000)
+        refresh('scores', chunk_size=50_000)
+        initial = time.perf_counter() - start
+
+        # A day's worth of new enrollments, picked up incrementally
+        with on_day(DAYS):
+            Enrollment.objects.bulk_create(
+                [Enrollment(course=self.course, student=User.objects.create(username=f'late-{n}')) for n in range(1000)]
+            )
+        start = time.perf_counter()
+        refresh('enrollments')
+        incremental = time.perf_counter() - start
+
+        client = APIClient()
+        client.force_authenticate(self.course.instructor.user)
+        url = f'/api/courses/{self.course.slug}/analytics/'
+        data = client.get(url).data
+
+        enrollments, distributions = self.live_analytics()
+        self.assertEqual(data['enrollments'], enrollments)
+        self.assertEqual({row['id']: row['distribution'] for row in data['assessments']}, dict(distributions))
+
+        print(f"\nAnalytics of one course, {ENROLLMENTS + 1000} enrollments and {ATTEMPTS} attempts in total")
+        print(f"  first refresh of the rollups     {initial:8.2f} s")
+        print(f"  refresh after 1000 enrollments   {incremental * 1000:8.2f} ms")
+        report('Analytics request', {
+            'rollups (endpoint)': measure(lambda: client.get(url), repeat=20),
+            'live GROUP BY': measure(self.live_analytics, repeat=5, warmup=1),
+        })
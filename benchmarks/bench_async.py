@@ -0,0 +1,90 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from asgiref.sync import ThreadSensitiveContext
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, TransactionTestCase
+from knox.models import AuthToken
+
+from core.models import Content, Course, Enrollment, Instructor, Message
+
+
+CONCURRENCY = int(os.environ.get('BENCH_CONCURRENCY', 200))
+# Worker threads of the WSGI deployment, e.g. gunicorn --threads
+WSGI_THREADS = int(os.environ.get('BENCH_WSGI_THREADS', 8))
+# Simulated network round trip to Postgres, added to every query
+DB_LATENCY = float(os.environ.get('BENCH_DB_LATENCY_MS', 5)) / 1000
+
+
+def add_latency(execute, sql, params, many, context):
+    time.sleep(DB_LATENCY)
+    return execute(sql, params, many, context)
+
+
+def slow_connection(sender, connection, **kwargs):
+    connection.execute_wrappers.append(add_latency)
+
+
+class AsyncThroughputBenchmark(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        instructor_user = User.objects.create_user(username='bench-instructor', password='secret')
+        instructor = Instructor.objects.create(user=instructor_user, bio='')
+        self.course = Course.objects.create(
+            title='Benchmark Course', description='', instructor=instructor,
+            start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+        )
+        student = User.objects.create_user(username='bench-student', password='secret')
+        Enrollment.objects.create(course=self.course, student=student)
+        for n in range(20):
+            Content.objects.create(course=self.course, title=f'Lesson {n}', description=f'Lesson **{n}**')
+        Message.objects.bulk_create([
+            Message(course=self.course, sender=student, receiver=instructor_user, content=f'message {n}')
+            for n in range(50)
+        ])
+        self.headers = {'Authorization': f'Token {AuthToken.objects.create(student)[1]}'}
+        connection_created.connect(slow_connection)
+
+    def tearDown(self):
+        connection_created.disconnect(slow_connection)
+
+    def test_wsgi_and_asgi_throughput(self):
+        endpoints = {
+            'course retrieve': ('/api/courses/{slug}/', '/api/async/courses/{slug}/'),
+            'lesson list': ('/api/{slug}/lessons/', '/api/async/{slug}/lessons/'),
+            'message list': ('/api/{slug}/messages/', '/api/async/{slug}/messages/'),
+        }
+        print(f"\nThroughput, {CONCURRENCY} concurrent requests, {DB_LATENCY * 1000:.0f} ms per query")
+        for label, (sync_url, async_url) in endpoints.items():
+            wsgi = self.wsgi(sync_url.format(slug=self.course.slug))
+            asgi = asyncio.run(self.asgi(async_url.format(slug=self.course.slug)))
+            print(f"  {label:<20} WSGI ({WSGI_THREADS} threads) {wsgi:8.0f} req/s   ASGI {asgi:8.0f} req/s")
+
+    def wsgi(self, url):
+        def get(_):
+            response = Client().get(url, headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+
+        with ThreadPoolExecutor(WSGI_THREADS) as pool:
+            start = time.perf_counter()
+            list(pool.map(get, range(CONCURRENCY)))
+            return CONCURRENCY / (time.perf_counter() - start)
+
+    async def asgi(self, url):
+        client = AsyncClient()
+
+        async def get():
+            # Like ASGIHandler, give every request its own thread for sync ORM calls
+            async with ThreadSensitiveContext():
+                response = await client.get(url, headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(get() for _ in range(CONCURRENCY)))
+        return CONCURRENCY / (time.perf_counter() - start)
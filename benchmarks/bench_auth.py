@@ -0,0 +1,45 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from knox.auth import TokenAuthentication
+from knox.models import AuthToken
+from rest_framework.test import APIRequestFactory
+
+from accounts.authentication import CachedTokenAuthentication
+
+from .utils import measure, report
+
+
+REQUESTS = 500
+# Other sessions of the same user, Knox walks all of them on every request
+OTHER_TOKENS = 5
+
+
+class AuthenticationBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='bench-student', password='secret')
+        for _ in range(OTHER_TOKENS):
+            AuthToken.objects.create(cls.user)
+        cls.token = AuthToken.objects.create(cls.user)[1]
+
+    def setUp(self):
+        cache.clear()
+        self.request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def test_auth_overhead_per_request(self):
+        results = {}
+        queries = {}
+        for label, authentication in [('knox', TokenAuthentication()), ('cached', CachedTokenAuthentication())]:
+            authenticate = lambda: authentication.authenticate(self.request)
+            results[label] = measure(authenticate, repeat=REQUESTS)
+            with CaptureQueriesContext(connection) as context:
+                authenticate()
+            queries[label] = len(context)
+
+        report(f"Token authentication, {REQUESTS} requests", results)
+        for label, count in queries.items():
+            print(f"  {label:<32} {count} queries per request")
@@ -0,0 +1,60 @@
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from core.models import Assessment, Content, Course, Instructor, Question
+
+
+QUESTIONS = 50
+OPTIONS = 4
+
+
+def question_tree(n):
+    return {
+        'question_text': f'Question {n}',
+        'options': [{'option_text': f'Option {i}', 'is_correct': i == 0} for i in range(OPTIONS)],
+    }
+
+
+class BulkAuthoringBenchmark(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='bench-instructor', password='secret')
+        instructor = Instructor.objects.create(user=cls.user, bio='')
+        course = Course.objects.create(
+            title='Benchmark Course', description='', instructor=instructor,
+            start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+        )
+        lesson = Content.objects.create(course=course, title='Lesson', description='')
+        cls.assessment = Assessment.objects.create(content=lesson, title='quiz', description='')
+        cls.base_url = f'/api/{course.slug}/assessment-{cls.assessment.pk}'
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def author_per_item(self):
+        for n in range(QUESTIONS):
+            tree = question_tree(n)
+            self.client.post(f'{self.base_url}/questions/', {'question_text': tree['question_text']})
+            question = Question.objects.filter(assessment=self.assessment).latest('id')
+            for option in tree['options']:
+                self.client.post(f'{self.base_url}/question-{question.pk}/options/', option)
+
+    def author_bulk(self):
+        response = self.client.post(
+            f'{self.base_url}/questions/bulk/', [question_tree(n) for n in range(QUESTIONS)], format='json'
+        )
+        assert response.status_code == 201
+
+    def test_authoring_throughput(self):
+        print(f"\nAuthoring {QUESTIONS} questions with {OPTIONS} options each")
+        for label, author in [('per-item POSTs', self.author_per_item), ('bulk endpoint', self.author_bulk)]:
+            Question.objects.all().delete()
+            start = time.perf_counter()
+            author()
+            elapsed = time.perf_counter() - start
+            items = QUESTIONS * (OPTIONS + 1)
+            print(f"  {label:<20} {elapsed * 1000:9.1f} ms   {items / elapsed:10.0f} items/s")
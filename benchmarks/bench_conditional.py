@@ -0,0 +1,84 @@
+import os
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+
+from core.models import Assessment, Content, Course, Enrollment, Instructor, Option, Question
+
+from .utils import measure, report
+
+
+LESSONS = int(os.environ.get('BENCH_COURSE_LESSONS', 50))
+QUESTIONS = int(os.environ.get('BENCH_QUIZ_QUESTIONS', 50))
+
+
+class ConditionalGetBenchmark(APITestCase):
+    """
+    Compare full responses with 304 answers to clients revalidating an unchanged copy.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='bench-instructor', password='secret')
+        instructor = Instructor.objects.create(user=user, bio='')
+        cls.course = Course.objects.create(
+            title='Benchmark Course', description='A course with many lessons.', instructor=instructor,
+            start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+        )
+        cls.student = User.objects.create_user(username='bench-student', password='secret')
+        Enrollment.objects.create(course=cls.course, student=cls.student)
+
+        description = '\n\n'.join(f'## Part {n}\n\nRead the **notes** and try the exercise.' for n in range(10))
+        lessons = [Content(course=cls.course, title=f'Lesson {n}', slug=f'lesson-{n}', description=description)
+                   for n in range(LESSONS)]
+        for lesson in lessons:
+            lesson.render_description()
+        Content.objects.bulk_create(lessons)
+
+        cls.lesson = Content.objects.get(slug='lesson-0')
+        cls.assessment = Assessment.objects.create(content=cls.lesson, title='quiz', description='Final quiz')
+        questions = Question.objects.bulk_create(
+            [Question(assessment=cls.assessment, question_text=f'Question {n}?') for n in range(QUESTIONS)]
+        )
+        Option.objects.bulk_create([
+            Option(question=question, option_text=f'Option {n}', is_correct=n == 0)
+            for question in questions for n in range(4)
+        ])
+        cls.question = questions[0]
+
+    def test_not_modified(self):
+        cache.clear()
+        client = APIClient()
+        client.force_authenticate(self.student)
+
+        slug = self.course.slug
+        scenarios = {
+            'course detail': f'/api/courses/{slug}/',
+            'lesson list': f'/api/{slug}/lessons/',
+            'lesson detail': f'/api/{slug}/lessons/lesson-0/',
+            'quiz export': f'/api/{slug}/assessments/lesson-0/quiz/full/',
+            'option list': f'/api/{slug}/assessment-{self.assessment.pk}/question-{self.question.pk}/options/',
+        }
+        results = {}
+        print(f'\nConditional GETs on a course with {LESSONS} lessons and a {QUESTIONS} question quiz')
+        for label, url in scenarios.items():
+            full = client.get(url)
+            self.assertEqual(full.status_code, 200)
+            etag = full['ETag']
+            with CaptureQueriesContext(connection) as captured:
+                revalidated = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            # Counted before measuring, every request resets the query log
+            queries = len(captured)
+            self.assertEqual(revalidated.status_code, 304)
+
+            results[f'{label}, 200'] = measure(lambda: client.get(url), repeat=30)
+            results[f'{label}, 304 ({queries} queries)'] = measure(
+                lambda: client.get(url, HTTP_IF_NONE_MATCH=etag), repeat=30
+            )
+            print(f'  {label:<20} {len(full.content):>8} bytes -> {len(revalidated.content)} bytes')
+
+        report('Latency of full and not modified responses', results)
@@ -0,0 +1,74 @@
+import os
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db.models import Count
+from rest_framework.test import APITestCase
+
+from core.counters import reconcile
+from core.models import Content, Course, Enrollment, Instructor
+
+from .utils import measure, report
+
+
+COURSES = int(os.environ.get('BENCH_COUNTER_COURSES', 500))
+STUDENTS = 200
+
+
+class CourseCounterBenchmark(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='bench-instructor', password='secret')
+        cls.instructor = Instructor.objects.create(user=user, bio='')
+        Course.objects.bulk_create(
+            [
+                Course(
+                    title=f'Course {n}', slug=f'course-{n}', description='', instructor=cls.instructor,
+                    start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+                )
+                for n in range(COURSES)
+            ],
+            batch_size=1000,
+        )
+        User.objects.bulk_create([User(username=f'bench-student-{n}') for n in range(STUDENTS)])
+        students = list(User.objects.filter(username__startswith='bench-student-'))
+        courses = list(Course.objects.all())
+        Enrollment.objects.bulk_create(
+            [Enrollment(course=course, student=student) for course in courses for student in students[:50]],
+            batch_size=1000,
+        )
+        Content.objects.bulk_create(
+            [
+                Content(course=course, title=f'{n}', slug=f'{course.pk}-{n}', description='')
+                for course in courses for n in range(10)
+            ],
+            batch_size=1000,
+        )
+        # Bulk inserts skip the signals, so the counters start from a reconcile
+        reconcile()
+
+    def test_dashboard_counts(self):
+        courses = Course.objects.filter(instructor=self.instructor)
+
+        def per_course():
+            return [
+                (course.pk, Enrollment.objects.filter(course=course).count(), Content.objects.filter(course=course).count())
+                for course in courses
+            ]
+
+        def aggregated():
+            # Two joined COUNTs need DISTINCT and multiply the rows scanned
+            return list(courses.annotate(
+                students=Count('enrollment', distinct=True), lessons=Count('content', distinct=True)
+            ).values_list('pk', 'students', 'lessons'))
+
+        def counters():
+            return list(courses.values_list('pk', 'enrollment_count', 'lesson_count'))
+
+        self.assertEqual(sorted(per_course()), sorted(counters()))
+        report(f"Per-course counts for {COURSES} courses", {
+            'COUNT per course (N+1)': measure(per_course, repeat=5),
+            'annotated COUNT joins': measure(aggregated, repeat=5),
+            'counter columns': measure(counters),
+        })
@@ -0,0 +1,88 @@
+import os
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from core.models import Course, Instructor
+from core.serializers import CourseSerializer
+
+from .utils import measure, report
+
+
+COURSES = int(os.environ.get('BENCH_INSTRUCTOR_COURSES', 5000))
+# Courses of other instructors sharing the table
+OTHER_COURSES = int(os.environ.get('BENCH_OTHER_COURSES', 20000))
+
+
+class CourseListBenchmark(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='bench-instructor', password='secret')
+        instructor = Instructor.objects.create(user=cls.user, bio='')
+        others = [
+            Instructor(user=user, bio='')
+            for user in User.objects.bulk_create([User(username=f'bench-other-{n}') for n in range(100)])
+        ]
+        Instructor.objects.bulk_create(others)
+
+        start = timezone.localdate() - timedelta(days=1000)
+        Course.objects.bulk_create(
+            [
+                Course(
+                    title=f'Course {n}', slug=f'bench-course-{n}', instructor=instructor, description='',
+                    start_date=start + timedelta(days=n % 1500), end_date=start + timedelta(days=n % 1500 + 90),
+                )
+                for n in range(COURSES)
+            ]
+            + [
+                Course(
+                    title=f'Other {n}', slug=f'bench-other-{n}', instructor=others[n % len(others)], description='',
+                    start_date=start + timedelta(days=n % 1500), end_date=start + timedelta(days=n % 1500 + 90),
+                )
+                for n in range(OTHER_COURSES)
+            ],
+            batch_size=2000,
+        )
+
+    def previous_list(self):
+        # The previous listing: an exists() probe, a second filter and no select_related, same fields
+        queryset = Course.objects.all()
+        if queryset.filter(instructor=self.user.instructor).exists():
+            queryset = queryset.filter(instructor=self.user.instructor)
+        return CourseSerializer(queryset.order_by('id')[:20], many=True).data
+
+    def test_instructor_course_list(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.get('/api/courses/')
+        deep = '/api/courses/'
+        for _ in range(50):
+            deep = client.get(deep).data['next']
+
+        scenarios = {
+            'own courses, first page': '/api/courses/',
+            'own courses, page 51': deep,
+            'running today': '/api/courses/?active=true',
+            'starting in 30 days, by date': f'/api/courses/?start_date={timezone.localdate() + timedelta(days=30)}&ordering=start_date',
+            'ending within 30 days, by end date': f'/api/courses/?end_date={timezone.localdate() + timedelta(days=30)}&ordering=-end_date',
+            'another instructor': '/api/courses/?instructor=bench-other-1',
+        }
+        results = {}
+        for label, url in scenarios.items():
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(client.get(url).status_code, 200)
+            # Counted before measuring, every request resets the query log
+            queries = len(captured)
+            results[f'{label} ({queries} queries)'] = measure(lambda: client.get(url), repeat=30)
+
+        with CaptureQueriesContext(connection) as captured:
+            self.previous_list()
+        queries = len(captured)
+        results[f'previous listing ({queries} queries)'] = measure(self.previous_list, repeat=30)
+
+        report(f'Course list of an instructor with {COURSES} courses, {COURSES + OTHER_COURSES} in total', results)
@@ -0,0 +1,192 @@
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+
+from accounts.throttling import reset_buckets
+from core.instrumentation import route_names
+from core.progress import get_buffer
+
+from .seed import PASSWORD, seed
+from .utils import percentile
+
+
+BASELINE = Path(__file__).with_name('baseline.json')
+REPEAT = int(os.environ.get('BENCH_REPEAT', 30))
+# Password hashing dominates these, a few samples are enough
+SLOW_ROUTES = {'login', 'register'}
+# A measured p95 may exceed the baseline by this factor before it counts as a regression
+LATENCY_TOLERANCE = float(os.environ.get('BENCH_LATENCY_TOLERANCE', 3.0))
+# Open-ended event stream, measured by bench_events instead
+SKIPPED_ROUTES = {'message-stream'}
+
+
+# Progress events stay buffered, no thread writes them behind the rolled back transactions
+@override_settings(PROGRESS_FLUSH_INTERVAL=0)
+class EndpointBenchmark(APITestCase):
+    """
+    Drive every API route against a seeded dataset, report latency percentiles and
+    queries per request, and fail on regressions against benchmarks/baseline.json.
+
+    Writes are rolled back after each call, so every sample runs against the same
+    data. BENCH_UPDATE_BASELINE=1 stores the current results as the new baseline.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        start = time.perf_counter()
+        cls.data = seed()
+        cls.seed_time = time.perf_counter() - start
+
+    def setUp(self):
+        reset_buckets()
+        get_buffer().drain()
+
+    def tearDown(self):
+        get_buffer().drain()
+
+    def scenarios(self):
+        d = self.data
+        course, lesson, assessment, question = d.course.slug, d.lesson.slug, d.assessment, d.question
+        instructor, student, admin = d.instructor, d.student, d.admin
+        quiz = f'/api/{course}/assessment-{assessment.pk}'
+        return [
+            # (route, user, method, path, data, expected status)
+            ('api-root', student, 'get', '/api/', None, 200),
+            ('register', None, 'post', '/api/accounts/register/', {
+                'username': 'newcomer', 'email': 'newcomer@example.com',
+                'password': PASSWORD, 'confirm_password': PASSWORD,
+            }, 201),
+            ('login', None, 'post', '/api/accounts/login/', {'username': student.username, 'password': PASSWORD}, 200),
+            ('logout', student, 'post', '/api/accounts/logout/', None, 200),
+            ('logout-all', student, 'post', '/api/accounts/logout-all/', None, 200),
+            ('instructors-list', admin, 'get', '/api/instructors/', None, 200),
+            ('instructors-detail', student, 'get', f'/api/instructors/{instructor.username}/', None, 200),
+            ('courses-list', instructor, 'get', '/api/courses/', None, 200),
+            ('courses-detail', instructor, 'get', f'/api/courses/{course}/', None, 200),
+            ('courses-dashboard', student, 'get', '/api/courses/dashboard/', None, 200),
+            ('courses-analytics', instructor, 'get', f'/api/courses/{course}/analytics/', None, 200),
+            ('courses-search', None, 'get', '/api/courses/search/?q=introduction+topic', None, 200),
+            ('enrollment-list', admin, 'get', f'/api/{course}/enrollments/', None, 200),
+            ('enrollment-detail', admin, 'get', f'/api/{course}/enrollments/{d.enrollment.pk}/', None, 200),
+            ('enrollment-bulk-import', instructor, 'post', f'/api/{course}/enrollments/import/',
+             '\n'.join(f'student{n}' for n in range(100)), 200),
+            ('enrollment-roster', instructor, 'get', f'/api/{course}/enrollments/roster/', None, 200),
+            ('lessons-list', student, 'get', f'/api/{course}/lessons/', None, 200),
+            ('lessons-detail', student, 'get', f'/api/{course}/lessons/{lesson}/', None, 200),
+            ('progress-list', student, 'get', f'/api/{course}/progress/', None, 200),
+            ('progress-events', student, 'post', f'/api/{course}/progress/events/', {
+                'events': [{'lesson': lesson, 'type': 'view'}] * 50 + [{'lesson': lesson, 'type': 'complete'}],
+            }, 202),
+            ('assessments-list', student, 'get', f'/api/{course}/assessments/{lesson}/', None, 200),
+            ('assessments-detail', student, 'get', f'/api/{course}/assessments/{lesson}/quiz/', None, 200),
+            ('assessments-full', student, 'get', f'/api/{course}/assessments/{lesson}/quiz/full/', None, 200),
+            ('assessments-submit', student, 'post', f'/api/{course}/assessments/{lesson}/quiz/submit/', {
+                'answers': {str(question.pk): d.option.pk},
+            }, 201),
+            ('questions-list', instructor, 'get', f'{quiz}/questions/', None, 200),
+            ('questions-detail', instructor, 'get', f'{quiz}/questions/{question.pk}/', None, 200),
+            ('questions-bulk', instructor, 'post', f'{quiz}/questions/bulk/', [
+                {'question_text': f'Bulk {n}?', 'options': [
+                    {'option_text': 'yes', 'is_correct': True}, {'option_text': 'no', 'is_correct': False},
+                ]}
+                for n in range(10)
+            ], 201),
+            ('options-list', instructor, 'get', f'{quiz}/question-{question.pk}/options/', None, 200),
+            ('options-detail', instructor, 'get', f'{quiz}/question-{question.pk}/options/{d.option.pk}/', None, 200),
+            ('messages-list', student, 'get', f'/api/{course}/messages/', None, 200),
+            ('messages-detail', student, 'get', f'/api/{course}/messages/{d.message.pk}/', None, 200),
+            ('conversations-list', student, 'get', f'/api/{course}/conversations/', None, 200),
+            ('conversations-detail', student, 'get', f'/api/{course}/conversations/{instructor.username}/', None, 200),
+            ('conversations-messages', student, 'get',
+             f'/api/{course}/conversations/{instructor.username}/messages/', None, 200),
+            ('conversations-read', student, 'post', f'/api/{course}/conversations/{instructor.username}/read/', None, 204),
+            ('async-course-detail', None, 'get', f'/api/async/courses/{course}/', None, 200),
+            ('async-lessons', student, 'get', f'/api/async/{course}/lessons/', None, 200),
+            ('async-messages', student, 'get', f'/api/async/{course}/messages/', None, 200),
+            ('instrumentation-list', admin, 'get', '/api/instrumentation/', None, 200),
+            ('instrumentation-reset', admin, 'post', '/api/instrumentation/reset/', None, 204),
+        ]
+
+    def call(self, client, method, path, data):
+        if isinstance(data, str):
+            return getattr(client, method)(path, data, content_type='text/csv')
+        return getattr(client, method)(path, data, format='json')
+
+    def run_scenario(self, user, method, path, data, status, repeat):
+        client = APIClient()
+        if user is not None:
+            client.credentials(HTTP_AUTHORIZATION=f'Token {self.data.tokens[user.pk]}')
+
+        latencies, queries, routes = [], [], set()
+        for n in range(repeat + 2):
+            with transaction.atomic(), CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = self.call(client, method, path, data)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = (time.perf_counter() - start) * 1000
+                transaction.set_rollback(True)
+            self.assertEqual(response.status_code, status, f'{method.upper()} {path}: {getattr(response, "data", None)}')
+            routes.add(response.resolver_match.view_name)
+            # The first two calls warm caches
+            if n >= 2:
+                latencies.append(elapsed)
+                queries.append(len(captured))
+        latencies.sort()
+        return routes, {
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'queries': statistics.median_low(queries),
+        }
+
+    def test_endpoints(self):
+        results, covered = {}, set()
+        for route, user, method, path, data, status in self.scenarios():
+            repeat = 5 if route in SLOW_ROUTES else REPEAT
+            routes, results[route] = self.run_scenario(user, method, path, data, status, repeat)
+            covered |= routes
+
+        api_routes = {name for name in route_names() if not name.startswith('admin:')}
+        self.assertEqual(api_routes - SKIPPED_ROUTES - covered, set(), 'Routes without a benchmark scenario')
+
+        baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else None
+        self.report(results, baseline)
+        if os.environ.get('BENCH_UPDATE_BASELINE') == '1':
+            BASELINE.write_text(json.dumps({'sizes': self.data.sizes, 'routes': results}, indent=2, sort_keys=True) + '\n')
+            return
+        if baseline is not None:
+            self.assertEqual(self.regressions(results, baseline), [])
+
+    def regressions(self, results, baseline):
+        # Query counts are compared always, latency only on a dataset of the same size
+        compare_latency = baseline['sizes'] == self.data.sizes
+        found = []
+        for route, stats in results.items():
+            expected = baseline['routes'].get(route)
+            if expected is None:
+                continue
+            if stats['queries'] > expected['queries']:
+                found.append(f"{route}: {stats['queries']} queries, baseline {expected['queries']}")
+            if compare_latency and stats['p95_ms'] > expected['p95_ms'] * LATENCY_TOLERANCE + 2:
+                found.append(f"{route}: p95 {stats['p95_ms']:.2f} ms, baseline {expected['p95_ms']:.2f} ms")
+        return found
+
+    def report(self, results, baseline):
+        sizes = ', '.join(f'{name} {value}' for name, value in self.data.sizes.items())
+        print(f"\nSeeded {sizes} in {self.seed_time:.1f} s")
+        print(f"  {'route':<28} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8}   baseline p95 / queries")
+        for route, stats in results.items():
+            expected = (baseline or {}).get('routes', {}).get(route)
+            against = f"{expected['p95_ms']:9.2f} / {expected['queries']}" if expected else ''
+            print(
+                f"  {route:<28} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f} "
+                f"{stats['queries']:>8}   {against}"
+            )
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import statistics
+import time
+import tracemalloc
+from datetime import date
+
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from core.models import Course, Enrollment, Instructor, Message
+from core.pubsub import InProcessBroker
+
+from .utils import measure
+
+
+CONNECTIONS = int(os.environ.get('BENCH_CONNECTIONS', 10_000))
+# Interval at which clients polled /api/<course>/messages/ before streaming
+POLL_INTERVAL = 5
+
+
+class EventStreamBenchmark(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor_user = User.objects.create_user(username='bench-instructor', password='secret')
+        instructor = Instructor.objects.create(user=instructor_user, bio='')
+        cls.course = Course.objects.create(
+            title='Benchmark Course', description='', instructor=instructor,
+            start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+        )
+        cls.student = User.objects.create_user(username='bench-student', password='secret')
+        Enrollment.objects.create(course=cls.course, student=cls.student)
+        Message.objects.bulk_create([
+            Message(course=cls.course, sender=cls.student, receiver=instructor_user, content=f'message {n}')
+            for n in range(50)
+        ])
+
+    def test_idle_connections_and_delivery_latency(self):
+        latencies, memory = asyncio.run(self.stream(CONNECTIONS))
+
+        self.client.force_authenticate(self.student)
+        poll = measure(lambda: self.client.get(f'/api/{self.course.slug}/messages/'))
+
+        print(f"\nEvent streams, {CONNECTIONS} idle connections")
+        print(f"  memory per idle connection       {memory / CONNECTIONS:8.0f} bytes")
+        print(f"  delivery latency                 p50 {statistics.median(latencies):.3f} ms   max {max(latencies):.3f} ms")
+        print(f"Polling every {POLL_INTERVAL}s with the same number of clients")
+        print(f"  requests per second              {CONNECTIONS / POLL_INTERVAL:8.0f}")
+        print(f"  server time per second           {CONNECTIONS / POLL_INTERVAL * poll['mean'] / 1000:8.2f} s")
+
+    async def stream(self, connections):
+        broker = InProcessBroker()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+
+        received = []
+
+        async def listen(n):
+            subscription = broker.subscribe(f'messages:1:{n}')
+            sent_at = await subscription.get()
+            received.append((time.perf_counter() - sent_at) * 1000)
+            broker.unsubscribe(subscription)
+
+        listeners = [asyncio.create_task(listen(n)) for n in range(connections)]
+        await asyncio.sleep(0)
+        memory = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        # Publish from another thread, like a sync view saving a Message
+        def publish_all():
+            for n in range(connections):
+                broker.publish(f'messages:1:{n}', time.perf_counter())
+
+        await asyncio.to_thread(publish_all)
+        await asyncio.gather(*listeners)
+        return received, memory
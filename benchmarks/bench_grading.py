@@ -0,0 +1,59 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from core.models import Assessment, Content, Course, Enrollment, Instructor, Option, Question
+
+from .utils import measure, report
+
+
+class GradingBenchmark(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor_user = User.objects.create_user(username='bench-instructor', password='secret')
+        instructor = Instructor.objects.create(user=instructor_user, bio='')
+        cls.course = Course.objects.create(
+            title='Benchmark Course', description='', instructor=instructor,
+            start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+        )
+        cls.lesson = Content.objects.create(course=cls.course, title='Lesson', description='')
+        cls.student = User.objects.create_user(username='bench-student', password='secret')
+        Enrollment.objects.create(course=cls.course, student=cls.student)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.student)
+
+    def create_assessment(self, size):
+        assessment = Assessment.objects.create(content=self.lesson, title=f'quiz-{size}', description='')
+        questions = Question.objects.bulk_create(
+            [Question(assessment=assessment, question_text=f'Question {n}') for n in range(size)]
+        )
+        options = Option.objects.bulk_create([
+            Option(question=question, option_text=f'Option {i}', is_correct=i == 0)
+            for question in questions for i in range(4)
+        ])
+        answers = {str(option.question_id): option.pk for option in options[::4]}
+        return assessment, answers
+
+    def test_grading_latency(self):
+        results = {}
+        for size in [100, 1000]:
+            assessment, answers = self.create_assessment(size)
+            url = f'/api/{self.course.slug}/assessments/{self.lesson.slug}/{assessment.title}/submit/'
+
+            def submit():
+                response = self.client.post(url, {'answers': answers}, format='json')
+                assert response.status_code == 201 and response.data['score'] == size
+
+            def submit_cold():
+                cache.clear()
+                submit()
+
+            results[f'{size} questions, cached key'] = measure(submit)
+            results[f'{size} questions, cold key'] = measure(submit_cold)
+
+        report("Grading an answer sheet", results)
@@ -0,0 +1,71 @@
+import os
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.inbox import encode_cursor
+from core.models import Course, Enrollment, Instructor, Message
+
+from .utils import measure, report
+
+
+# The 10M-message load test runs with BENCH_MESSAGES=10000000 against Postgres
+MESSAGES = int(os.environ.get('BENCH_MESSAGES', 100_000))
+STUDENTS = int(os.environ.get('BENCH_STUDENTS', 200))
+
+
+class InboxBenchmark(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create_user(username='bench-instructor', password='secret')
+        instructor = Instructor.objects.create(user=cls.instructor, bio='')
+        cls.course = Course.objects.create(
+            title='Benchmark Course', description='', instructor=instructor,
+            start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+        )
+        User.objects.bulk_create([User(username=f'bench-student-{n}') for n in range(STUDENTS)])
+        cls.students = list(User.objects.filter(username__startswith='bench-student-').order_by('id'))
+        Enrollment.objects.bulk_create([Enrollment(course=cls.course, student=student) for student in cls.students])
+
+        start = timezone.now() - timedelta(days=365)
+        batch = []
+        for n in range(MESSAGES):
+            student = cls.students[n % STUDENTS]
+            sender, receiver = (student, cls.instructor) if n % 2 else (cls.instructor, student)
+            batch.append(Message(course=cls.course, sender=sender, receiver=receiver, content=f'message {n}'))
+            if len(batch) == 5000:
+                Message.objects.bulk_create(batch)
+                batch = []
+        Message.objects.bulk_create(batch)
+        # bulk_create sets every timestamp to "now"; spread them out like real traffic
+        for n, pk in enumerate(Message.objects.order_by('id').values_list('id', flat=True)[::1000]):
+            Message.objects.filter(id__gte=pk, id__lt=pk + 1000).update(timestamp=start + timedelta(minutes=n))
+
+        call_command('rebuild_conversations', stdout=StringIO())
+
+    def test_inbox_latency(self):
+        student = self.students[0]
+        thread = Message.objects.filter(course=self.course, sender=student) | Message.objects.filter(course=self.course, receiver=student)
+        deep = thread.order_by('-timestamp', '-id')[thread.count() // 2]
+
+        def fetch(user, url):
+            self.client.force_authenticate(user)
+            response = self.client.get(url)
+            assert response.status_code == 200
+
+        slug = self.course.slug
+        report(f"Inbox, {MESSAGES} messages, {STUDENTS} threads", {
+            'instructor thread list': measure(lambda: fetch(self.instructor, f'/api/{slug}/conversations/')),
+            'thread history, page 1': measure(
+                lambda: fetch(student, f'/api/{slug}/conversations/bench-instructor/messages/')
+            ),
+            'thread history, middle page': measure(
+                lambda: fetch(student, f'/api/{slug}/conversations/bench-instructor/messages/?cursor={encode_cursor(deep)}')
+            ),
+            'message list, OR filter': measure(lambda: fetch(self.instructor, f'/api/{slug}/messages/')),
+        })
@@ -0,0 +1,42 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework.test import APIClient, APITestCase
+
+from core.models import Content, Course, Enrollment, Instructor
+
+from .utils import measure, report
+
+
+class InstrumentationOverheadBenchmark(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor_user = User.objects.create_user(username='bench-instructor', password='secret')
+        instructor = Instructor.objects.create(user=instructor_user, bio='')
+        cls.course = Course.objects.create(
+            title='Benchmark Course', description='', instructor=instructor,
+            start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+        )
+        cls.student = User.objects.create_user(username='bench-student', password='secret')
+        Enrollment.objects.create(course=cls.course, student=cls.student)
+        for n in range(20):
+            Content.objects.create(course=cls.course, title=f'Lesson {n}', description=f'Lesson **{n}**')
+
+    def test_overhead(self):
+        url = f'/api/{self.course.slug}/assessments/lesson-0/'
+        results = {}
+        for label, rate, duplicates in [
+            ('off', 0.0, False),
+            ('5% sampled', 0.05, False),
+            ('every request', 1.0, False),
+            ('every request + duplicates', 1.0, True),
+        ]:
+            with self.settings(INSTRUMENTATION_SAMPLE_RATE=rate, INSTRUMENTATION_DETECT_DUPLICATES=duplicates):
+                cache.clear()
+                client = APIClient()
+                client.force_authenticate(self.student)
+                self.assertEqual(client.get(url).status_code, 200)
+                results[label] = measure(lambda: client.get(url), repeat=500, warmup=20)
+        report("Instrumentation overhead, uncached assessment list", results)
@@ -0,0 +1,62 @@
+from datetime import date
+from unittest import mock
+
+import markdown
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from core.models import Content, Course, Instructor
+
+from .utils import measure, report
+
+
+LESSONS = 500
+
+DESCRIPTION = """
+# Lesson {n}
+
+Some **bold** text, some *emphasis* and a [link](https://example.com/{n}).
+
+* first point
+* second point
+* third point
+
+```
+print("lesson {n}")
+```
+"""
+
+
+class MarkdownStoreBenchmark(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='bench-instructor', password='secret')
+        instructor = Instructor.objects.create(user=cls.user, bio='')
+        cls.course = Course.objects.create(
+            title='Benchmark Course', description='', instructor=instructor,
+            start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+        )
+        for n in range(LESSONS):
+            Content.objects.create(course=cls.course, title=f'Lesson {n}', description=DESCRIPTION.format(n=n))
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/{self.course.slug}/lessons/'
+
+    def test_lesson_list_latency(self):
+        def list_lessons():
+            url = f'{self.url}?page_size=100'
+            while url:
+                response = self.client.get(url)
+                assert response.status_code == 200
+                url = response.data['next']
+
+        stored = measure(list_lessons)
+        with mock.patch.object(Content, 'formatted_description', lambda obj: markdown.markdown(obj.description)):
+            rendered = measure(list_lessons)
+
+        report(f"Lesson list, {LESSONS} lessons", {
+            'stored description_html': stored,
+            'markdown on every request': rendered,
+        })
@@ -0,0 +1,91 @@
+from base64 import b64encode
+from datetime import date
+from unittest import mock
+from urllib import parse
+
+from django.contrib.auth.models import User
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.test import APITestCase
+
+from core.models import Course, Enrollment, Instructor, Message
+from core.views import EnrollmentViewSet, MessageViewSet
+
+from .utils import measure, report
+
+
+PAGE_SIZE = 20
+PAGE = 1000
+ROWS = PAGE_SIZE * PAGE * 2
+
+
+def encode_cursor(position, offset):
+    # Same format as rest_framework.pagination.CursorPagination.encode_cursor
+    querystring = parse.urlencode({'p': position, 'o': offset})
+    return parse.quote(b64encode(querystring.encode('ascii')).decode('ascii'))
+
+
+class DeepPageBenchmark(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='bench-admin', password='secret')
+        instructor_user = User.objects.create_user(username='bench-instructor', password='secret')
+        instructor = Instructor.objects.create(user=instructor_user, bio='')
+        cls.course = Course.objects.create(
+            title='Benchmark Course', description='', instructor=instructor,
+            start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+        )
+
+        User.objects.bulk_create([User(username=f'bench-student-{n}') for n in range(ROWS)], batch_size=1000)
+        students = User.objects.filter(username__startswith='bench-student-')
+        Enrollment.objects.bulk_create(
+            [Enrollment(course=cls.course, student=student) for student in students], batch_size=1000
+        )
+
+        cls.student = students.first()
+        Message.objects.bulk_create(
+            [
+                Message(course=cls.course, sender=cls.student, receiver=instructor_user, content=f'message {n}')
+                for n in range(ROWS)
+            ],
+            batch_size=1000,
+        )
+
+    def deep_cursor(self, queryset, ordering):
+        # Build the cursor a client would hold after walking to the requested page
+        field = ordering[0].lstrip('-')
+        last = queryset.order_by(*ordering)[PAGE_SIZE * (PAGE - 1) - 1]
+        position = getattr(last, field)
+        tied = queryset.filter(**{field: position}).order_by(*ordering)
+        offset = list(tied.values_list('pk', flat=True)).index(last.pk) + 1
+        return encode_cursor(str(position), offset)
+
+    def compare(self, title, user, url, viewset, queryset):
+        self.client.force_authenticate(user)
+        cursor = self.deep_cursor(queryset, viewset.ordering)
+
+        def fetch(page_url):
+            response = self.client.get(page_url)
+            assert response.status_code == 200 and len(response.data['results']) == PAGE_SIZE
+
+        results = {
+            'cursor, page 1': measure(lambda: fetch(f'{url}?page_size={PAGE_SIZE}')),
+            f'cursor, page {PAGE}': measure(lambda: fetch(f'{url}?page_size={PAGE_SIZE}&cursor={cursor}')),
+        }
+        with mock.patch.object(viewset, 'pagination_class', LimitOffsetPagination):
+            offset_url = f'{url}?limit={PAGE_SIZE}&offset={PAGE_SIZE * (PAGE - 1)}'
+            results[f'offset, page {PAGE}'] = measure(lambda: fetch(offset_url))
+
+        report(f"{title}, {ROWS} rows, page size {PAGE_SIZE}", results)
+
+    def test_enrollment_list(self):
+        self.compare(
+            'Enrollment list', self.admin, f'/api/{self.course.slug}/enrollments/',
+            EnrollmentViewSet, Enrollment.objects.filter(course=self.course),
+        )
+
+    def test_message_list(self):
+        self.compare(
+            'Message list', self.student, f'/api/{self.course.slug}/messages/',
+            MessageViewSet, Message.objects.filter(course=self.course),
+        )
@@ -0,0 +1,39 @@
+import importlib.util
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient, APITestCase
+
+
+LOGINS = int(os.environ.get('BENCH_LOGINS', 20))
+
+HASHERS = {
+    'pbkdf2 (Django default)': 'accounts.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'accounts.hashers.ScryptPasswordHasher',
+}
+if importlib.util.find_spec('argon2'):
+    HASHERS['argon2'] = 'accounts.hashers.Argon2PasswordHasher'
+
+# Every login comes from the same address, which the login throttle would soon turn away
+UNTHROTTLED = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+
+
+class PasswordHashingBenchmark(APITestCase):
+
+    def test_logins_per_second_per_core(self):
+        print(f"\nLogins per second on one core, {LOGINS} sequential logins")
+        for label, hasher in HASHERS.items():
+            with self.settings(PASSWORD_HASHERS=[hasher], PASSWORD_HASH_WORKERS=1, REST_FRAMEWORK=UNTHROTTLED):
+                username = f'bench-{hasher.rsplit(".", 1)[1].lower()}'
+                User.objects.create(username=username, password=make_password('bench-secret'))
+                client = APIClient()
+
+                start = time.perf_counter()
+                for _ in range(LOGINS):
+                    response = client.post('/api/accounts/login/', {'username': username, 'password': 'bench-secret'})
+                    self.assertEqual(response.status_code, 200)
+                elapsed = time.perf_counter() - start
+            print(f"  {label:<32} {LOGINS / elapsed:8.1f} logins/s   {elapsed / LOGINS * 1000:8.1f} ms per login")
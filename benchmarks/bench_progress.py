@@ -0,0 +1,103 @@
+import os
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from core.models import Content, Course, CourseProgress, Enrollment, Instructor, LessonProgress
+from core.progress import get_buffer
+
+
+STUDENTS = int(os.environ.get('BENCH_PROGRESS_STUDENTS', 200))
+LESSONS = int(os.environ.get('BENCH_PROGRESS_LESSONS', 20))
+# Events per request sent by the buffered client, the way a player reports them
+BATCH = 50
+# Row-per-event writes are timed on a sample and extrapolated
+NAIVE_SAMPLE = 500
+
+
+@override_settings(PROGRESS_FLUSH_INTERVAL=0)
+class ProgressIngestionBenchmark(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='bench-instructor', password='secret')
+        cls.course = Course.objects.create(
+            title='Benchmark Course', description='', instructor=Instructor.objects.create(user=user, bio=''),
+            start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+        )
+        Content.objects.bulk_create([
+            Content(course=cls.course, title=f'Lesson {n}', slug=f'bench-lesson-{n}', description='')
+            for n in range(LESSONS)
+        ])
+        cls.lessons = list(Content.objects.filter(course=cls.course).order_by('id'))
+        User.objects.bulk_create([User(username=f'bench-student-{n}') for n in range(STUDENTS)])
+        cls.students = list(User.objects.filter(username__startswith='bench-student-').order_by('id'))
+        Enrollment.objects.bulk_create([Enrollment(course=cls.course, student=student) for student in cls.students])
+
+    def setUp(self):
+        get_buffer().drain()
+
+    def events(self):
+        # Every student views each lesson a few times and completes half of them
+        events = []
+        for n, lesson in enumerate(self.lessons):
+            events += [{'lesson': lesson.slug, 'type': 'view'}] * 4
+            if n % 2 == 0:
+                events.append({'lesson': lesson.slug, 'type': 'complete'})
+        return events
+
+    def row_per_event(self, student, lesson, kind):
+        now = timezone.now()
+        progress, created = LessonProgress.objects.get_or_create(
+            student=student, content=lesson, defaults={'course': self.course},
+        )
+        if kind == 'view':
+            LessonProgress.objects.filter(pk=progress.pk).update(view_count=F('view_count') + 1, last_viewed_at=now)
+        elif progress.completed_at is None:
+            LessonProgress.objects.filter(pk=progress.pk).update(completed_at=now)
+            summary, _ = CourseProgress.objects.get_or_create(student=student, course=self.course)
+            CourseProgress.objects.filter(pk=summary.pk).update(completed_lessons=F('completed_lessons') + 1)
+
+    def test_sustained_events_per_second(self):
+        lessons = {lesson.slug: lesson for lesson in self.lessons}
+        sample = [(student, event) for student in self.students[:5] for event in self.events()][:NAIVE_SAMPLE]
+        start = time.perf_counter()
+        for student, event in sample:
+            self.row_per_event(student, lessons[event['lesson']], event['type'])
+        naive = len(sample) / (time.perf_counter() - start)
+        LessonProgress.objects.all().delete()
+        CourseProgress.objects.all().delete()
+
+        url = f'/api/{self.course.slug}/progress/events/'
+        clients = []
+        for student in self.students:
+            client = APIClient()
+            client.force_authenticate(student)
+            clients.append(client)
+
+        total = 0
+        start = time.perf_counter()
+        for client in clients:
+            events = self.events()
+            for offset in range(0, len(events), BATCH):
+                response = client.post(url, {'events': events[offset:offset + BATCH]}, format='json')
+                self.assertEqual(response.status_code, 202)
+            total += len(events)
+        flush_start = time.perf_counter()
+        get_buffer().flush()
+        flush_time = time.perf_counter() - flush_start
+        buffered = total / (time.perf_counter() - start)
+
+        self.assertEqual(LessonProgress.objects.count(), STUDENTS * LESSONS)
+        self.assertEqual(
+            set(CourseProgress.objects.values_list('completed_lessons', flat=True)), {(LESSONS + 1) // 2},
+        )
+
+        print(f"\nProgress ingestion, {STUDENTS} students x {LESSONS} lessons, {total} events")
+        print(f"  {'row per event':<32} {naive:10.0f} events/s")
+        print(f"  {f'buffered, {BATCH} per request':<32} {buffered:10.0f} events/s   final flush {flush_time * 1000:.0f} ms")
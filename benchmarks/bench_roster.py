@@ -0,0 +1,57 @@
+import os
+import time
+import tracemalloc
+from datetime import date
+
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from core.models import Course, Enrollment, Instructor
+
+
+COHORT = int(os.environ.get('BENCH_COHORT', 20_000))
+# One-at-a-time enrollment is timed on a sample and extrapolated
+SAMPLE = 200
+
+
+class RosterBenchmark(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor_user = User.objects.create_user(username='bench-instructor', password='secret')
+        instructor = Instructor.objects.create(user=cls.instructor_user, bio='')
+        cls.course = Course.objects.create(
+            title='Benchmark Course', description='', instructor=instructor,
+            start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+        )
+        User.objects.bulk_create([User(username=f'bench-student-{n}') for n in range(COHORT + SAMPLE)], batch_size=1000)
+        cls.sample = list(User.objects.filter(username__startswith='bench-student-').order_by('-id')[:SAMPLE])
+
+    def test_import_and_export(self):
+        url = f'/api/{self.course.slug}/enrollments/'
+
+        start = time.perf_counter()
+        for student in self.sample:
+            self.client.force_authenticate(student)
+            self.client.post(url)
+        single = (time.perf_counter() - start) / SAMPLE * COHORT
+
+        self.client.force_authenticate(self.instructor_user)
+        body = '\n'.join(f'bench-student-{n}' for n in range(COHORT))
+        start = time.perf_counter()
+        result = self.client.post(f'{url}import/', body, content_type='text/csv').data
+        bulk = time.perf_counter() - start
+        self.assertEqual(result['enrolled'], COHORT)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        lines = sum(1 for _ in self.client.get(f'{url}roster/').streaming_content)
+        export = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertEqual(lines, Enrollment.objects.filter(course=self.course).count() + 1)
+
+        print(f"\nEnrolling a cohort of {COHORT}")
+        print(f"  one POST per student (extrapolated)  {single:8.2f} s")
+        print(f"  CSV import                           {bulk:8.2f} s")
+        print(f"Roster export of {lines - 1} rows      {export:8.2f} s   peak memory {peak / 1024:8.0f} KiB")
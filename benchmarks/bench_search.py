@@ -0,0 +1,71 @@
+import os
+import random
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db.models import Q
+from rest_framework.test import APITestCase
+
+from core import search
+from core.models import Content, Course, Instructor
+
+from .utils import measure, report
+
+
+COURSES = int(os.environ.get('BENCH_COURSES', 100_000))
+VOCABULARY = [f'term{n}' for n in range(5000)]
+
+
+def text(rng, words):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+class CatalogSearchBenchmark(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        instructor_user = User.objects.create_user(username='bench-instructor', password='secret')
+        instructor = Instructor.objects.create(user=instructor_user, bio='')
+        Course.objects.bulk_create(
+            [
+                Course(
+                    title=f'Course {n} {text(rng, 3)}', slug=f'course-{n}', description=text(rng, 30),
+                    instructor=instructor, start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+                )
+                for n in range(COURSES)
+            ],
+            batch_size=1000,
+        )
+        course_ids = list(Course.objects.values_list('id', flat=True)[:COURSES // 10])
+        Content.objects.bulk_create(
+            [
+                Content(course_id=course_id, title=text(rng, 3), slug=f'lesson-{course_id}', description=text(rng, 50))
+                for course_id in course_ids
+            ],
+            batch_size=1000,
+        )
+
+    def test_search_latency(self):
+        search.reset_index()
+        start = time.perf_counter()
+        search.get_index()
+        build = (time.perf_counter() - start) * 1000
+
+        # Ranking needs every match, so the scan cannot stop at the first page
+        def scan(*terms):
+            condition = Q()
+            for term in terms:
+                condition &= Q(title__icontains=term) | Q(description__icontains=term)
+            return list(Course.objects.filter(condition).values_list('id', flat=True))
+
+        results = {
+            'substring scan, one term': measure(lambda: scan('term42 '), repeat=5),
+            'inverted index, one term': measure(lambda: self.client.get('/api/courses/search/?q=term42')),
+            'substring scan, two terms': measure(lambda: scan('term42 ', 'term7 '), repeat=5),
+            'inverted index, two terms': measure(lambda: self.client.get('/api/courses/search/?q=term42+term7')),
+        }
+        print(f"\nIn-memory index over {COURSES} courses built in {build:.0f} ms")
+        report(f"Catalog search, {COURSES} courses", results)
+        search.reset_index()
@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+
+from accounts.throttling import TokenBucket, reset_buckets
+
+from .utils import measure, report
+
+
+TAKES = 100_000
+
+
+class ThrottlingBenchmark(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username='bench-student', password='bench-secret')
+
+    def setUp(self):
+        reset_buckets()
+
+    def test_rejected_login_cost(self):
+        client = APIClient()
+        attempt = {'username': 'bench-student', 'password': 'wrong'}
+        rates = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'login_ip': None, 'login_username': None}
+
+        def login():
+            return client.post('/api/accounts/login/', attempt)
+
+        # A failed attempt that gets through pays for the user lookup and the hash
+        with self.settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}):
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(login().status_code, 400)
+            accepted_queries = len(captured)
+            accepted = measure(login, repeat=10)
+
+        while login().status_code != 429:
+            pass
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(login().status_code, 429)
+        # Read now, the next request resets the query log
+        rejected_queries = len(captured)
+        rejected = measure(login, repeat=200)
+
+        report('Failed login attempt', {
+            f'let through ({accepted_queries} queries)': accepted,
+            f'throttled ({rejected_queries} queries)': rejected,
+        })
+
+        bucket = TokenBucket(capacity=10, rate=1, max_keys=settings.THROTTLE_MAX_KEYS)
+        start = time.perf_counter()
+        for n in range(TAKES):
+            bucket.take(f'10.0.{n % 256}.{n // 256 % 256}')
+        elapsed = time.perf_counter() - start
+        print(f"  token bucket check               {elapsed / TAKES * 1e6:8.2f} us")
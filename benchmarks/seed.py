@@ -0,0 +1,158 @@
+import os
+from datetime import date, timedelta
+from io import StringIO
+from itertools import cycle
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from knox.models import AuthToken
+
+from core.counters import reconcile
+from core.models import Assessment, Content, Course, Enrollment, Instructor, Message, Option, Question
+
+
+# Default size of the seeded dataset; each can be overridden with BENCH_SEED_<NAME>
+DEFAULTS = {
+    'instructors': 20,
+    'courses_per_instructor': 5,
+    'lessons_per_course': 10,
+    'questions_per_assessment': 5,
+    'students': 2000,
+    'enrollments_per_student': 3,
+    'messages': 20000,
+}
+
+BATCH_SIZE = 1000
+
+# Known password of the users the benchmarks log in as
+PASSWORD = 'bench-secret'
+
+
+def scale():
+    return {name: int(os.environ.get(f'BENCH_SEED_{name.upper()}', default)) for name, default in DEFAULTS.items()}
+
+
+def seed(sizes=None):
+    """
+    Bulk-insert an LMS dataset and return the rows the benchmarks act as or on.
+
+    Everything but the handful of users that log in is created with bulk_create,
+    so counters and conversations are rebuilt at the end the way the management
+    commands do after an import.
+    """
+    sizes = {**scale(), **(sizes or {})}
+
+    User.objects.bulk_create(
+        [User(username=f'instructor{n}', email=f'instructor{n}@example.com') for n in range(sizes['instructors'])]
+        + [User(username=f'student{n}', email=f'student{n}@example.com') for n in range(sizes['students'])],
+        batch_size=BATCH_SIZE,
+    )
+    instructor_users = list(User.objects.filter(username__startswith='instructor').order_by('id'))
+    students = list(User.objects.filter(username__startswith='student').order_by('id'))
+    Instructor.objects.bulk_create([Instructor(user=user, bio=f'Bio of {user.username}') for user in instructor_users])
+    # The first instructor and student can log in with a real password
+    for user in [instructor_users[0], students[0]]:
+        user.set_password(PASSWORD)
+        user.save(update_fields=['password'])
+
+    start = date(2023, 1, 1)
+    Course.objects.bulk_create(
+        [
+            Course(
+                title=f'Course {n} by {user.username}', slug=f'course-{user.pk}-{n}', instructor_id=user.pk,
+                description=f'An introduction to topic {n}, with exercises and a final quiz.',
+                start_date=start, end_date=start + timedelta(days=180),
+            )
+            for user in instructor_users for n in range(sizes['courses_per_instructor'])
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    courses = list(Course.objects.select_related('instructor').order_by('id'))
+
+    lessons = []
+    for course in courses:
+        for n in range(sizes['lessons_per_course']):
+            lesson = Content(
+                course=course, title=f'Lesson {n}', slug=f'{course.slug}-lesson-{n}',
+                description=f'## Lesson {n}\n\nRead the **notes** and try the [exercise](https://example.com/{n}).',
+            )
+            lesson.render_description()
+            lessons.append(lesson)
+    Content.objects.bulk_create(lessons, batch_size=BATCH_SIZE)
+    lessons = list(Content.objects.order_by('id'))
+
+    Assessment.objects.bulk_create(
+        [Assessment(content=lesson, title='quiz', description=f'Quiz on {lesson.title}') for lesson in lessons],
+        batch_size=BATCH_SIZE,
+    )
+    assessments = list(Assessment.objects.order_by('id'))
+    Question.objects.bulk_create(
+        [
+            Question(assessment=assessment, question_text=f'Question {n}?')
+            for assessment in assessments for n in range(sizes['questions_per_assessment'])
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    Option.objects.bulk_create(
+        [
+            Option(question_id=question_id, option_text=f'Option {n}', is_correct=n == 0)
+            for question_id in Question.objects.values_list('id', flat=True) for n in range(4)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    # Students spread over the courses, the first course gets the first students
+    enrollments = {}
+    course_cycle = cycle(courses)
+    for student in students:
+        for _ in range(min(sizes['enrollments_per_student'], len(courses))):
+            course = next(course_cycle)
+            enrollments[(course.pk, student.pk)] = Enrollment(course=course, student=student)
+    Enrollment.objects.bulk_create(enrollments.values(), batch_size=BATCH_SIZE)
+
+    pairs = list(enrollments)
+    now = timezone.now()
+    instructors_by_course = {course.pk: course.instructor.user_id for course in courses}
+    messages = []
+    for n in range(sizes['messages']):
+        course_id, student_id = pairs[n % len(pairs)]
+        instructor_id = instructors_by_course[course_id]
+        # Two messages from the student for every reply, whatever the number of pairs
+        sender, receiver = (student_id, instructor_id) if (n + n // len(pairs)) % 3 else (instructor_id, student_id)
+        messages.append(Message(
+            course_id=course_id, sender_id=sender, receiver_id=receiver,
+            content=f'Message {n}', timestamp=now - timedelta(seconds=sizes['messages'] - n),
+        ))
+    Message.objects.bulk_create(messages, batch_size=BATCH_SIZE)
+
+    reconcile()
+    call_command('rebuild_conversations', stdout=StringIO())
+    # Freshly seeded rows are not yet settled; count them right away
+    with override_settings(ROLLUP_SETTLE_SECONDS=0):
+        call_command('refresh_rollups', stdout=StringIO())
+
+    admin = User.objects.create_superuser(username='bench-admin', email='admin@example.com', password=PASSWORD)
+    course = courses[0]
+    student = students[0]
+    lesson = Content.objects.filter(course=course).order_by('id').first()
+    assessment = Assessment.objects.get(content=lesson)
+    question = Question.objects.filter(assessment=assessment).order_by('id').first()
+    return SimpleNamespace(
+        sizes=sizes,
+        admin=admin,
+        instructor=course.instructor.user,
+        student=student,
+        course=course,
+        lesson=lesson,
+        assessment=assessment,
+        question=question,
+        option=Option.objects.filter(question=question).order_by('id').first(),
+        enrollment=Enrollment.objects.get(course=course, student=student),
+        message=Message.objects.filter(course=course, sender=student).order_by('id').first(),
+        tokens={
+            user.pk: AuthToken.objects.create(user)[1] for user in [admin, course.instructor.user, student]
+        },
+    )
@@ -0,0 +1,40 @@
+import statistics
+import time
+
+
+def measure(func, repeat=20, warmup=2):
+    """
+    Call ``func`` repeatedly and return latency statistics in milliseconds.
+    """
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    return {
+        'mean': statistics.fmean(samples),
+        'p50': percentile(samples, 50),
+        'p95': percentile(samples, 95),
+        'p99': percentile(samples, 99),
+    }
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = round((pct / 100) * (len(sorted_samples) - 1))
+    return sorted_samples[index]
+
+
+def report(title, results):
+    """
+    Print a small table of ``{label: stats}`` results.
+    """
+    print(f"\n{title}")
+    for label, stats in results.items():
+        print(f"  {label:<32} mean {stats['mean']:8.2f} ms   p50 {stats['p50']:8.2f} ms   p95 {stats['p95']:8.2f} ms")
@@ -3,13 +3,71 @@ from .models import *
 # Register your models here.
 
 admin.site.register(Instructor)
-admin.site.register(Course)
-admin.site.register(Content)
-admin.site.register(Enrollment)
-admin.site.register(Assessment)
-admin.site.register(Question)
-admin.site.register(Option)
-admin.site.register(Message)
 
 
+@admin.register(Course)
+class CourseAdmin(admin.ModelAdmin):
+    list_select_related = ['instructor__user']
+    raw_id_fields = ['instructor']
 
+
+@admin.register(Content)
+class ContentAdmin(admin.ModelAdmin):
+    list_select_related = ['course']
+    raw_id_fields = ['course']
+
+
+@admin.register(Enrollment)
+class EnrollmentAdmin(admin.ModelAdmin):
+    list_select_related = ['student', 'course']
+    raw_id_fields = ['student', 'course']
+
+
+# The __str__ of these models walks up to the course; without the joins the
+# change list runs one query per level per row, and the FK dropdowns do the same
+@admin.register(Assessment)
+class AssessmentAdmin(admin.ModelAdmin):
+    list_select_related = ['content__course']
+    raw_id_fields = ['content']
+
+
+@admin.register(Question)
+class QuestionAdmin(admin.ModelAdmin):
+    list_select_related = ['assessment__content__course']
+    raw_id_fields = ['assessment']
+
+
+@admin.register(Option)
+class OptionAdmin(admin.ModelAdmin):
+    list_select_related = ['question__assessment__content__course']
+    raw_id_fields = ['question']
+
+
+@admin.register(Message)
+class MessageAdmin(admin.ModelAdmin):
+    list_select_related = ['sender', 'course__instructor__user']
+    raw_id_fields = ['sender', 'receiver', 'course']
+
+
+@admin.register(Attempt)
+class AttemptAdmin(admin.ModelAdmin):
+    list_select_related = ['student']
+    raw_id_fields = ['assessment', 'student']
+
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_select_related = ['user', 'peer', 'course']
+    raw_id_fields = ['user', 'peer', 'course', 'last_message']
+
+
+@admin.register(LessonProgress)
+class LessonProgressAdmin(admin.ModelAdmin):
+    list_select_related = ['student', 'content']
+    raw_id_fields = ['student', 'content', 'course']
+
+
+@admin.register(CourseProgress)
+class CourseProgressAdmin(admin.ModelAdmin):
+    list_select_related = ['student', 'course']
+    raw_id_fields = ['student', 'course']
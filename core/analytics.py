@@ -0,0 +1,166 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Assessment, Attempt, Enrollment, EnrollmentRollup, RollupWatermark, ScoreRollup
+
+
+BUCKETS = 10
+
+
+def score_bucket(score, total):
+    return min(BUCKETS - 1, score * BUCKETS // total) if total else 0
+
+
+def count_enrollments(rows):
+    counted = rows.annotate(day=TruncDate('enrollment_date')).values('course_id', 'day').annotate(count=Count('pk'))
+    return {(row['course_id'], row['day']): row['count'] for row in counted.order_by()}
+
+
+def count_attempts(rows):
+    # Grouped on the raw score, which has few distinct values; bucketed here rather than in SQL
+    counted = rows.annotate(day=TruncDate('submitted_at')).values('assessment_id', 'day', 'score', 'total')
+    counts = defaultdict(int)
+    for row in counted.annotate(count=Count('pk')).order_by():
+        counts[row['assessment_id'], row['day'], score_bucket(row['score'], row['total'])] += row['count']
+    return counts
+
+
+# Rollup name -> (source model, its creation timestamp, counting function, rollup model, key fields, count field)
+ROLLUPS = {
+    'enrollments': (Enrollment, 'enrollment_date', count_enrollments, EnrollmentRollup, ['course', 'day'], 'enrollments'),
+    'scores': (Attempt, 'submitted_at', count_attempts, ScoreRollup, ['assessment', 'day', 'bucket'], 'attempts'),
+}
+
+
+def add_counts(model, key_fields, count_field, counts, batch_size):
+    """
+    Add ``{key: count}`` to the rollup rows, creating the ones that don't exist yet.
+    """
+    columns = [f'{field}_id' if model._meta.get_field(field).is_relation else field for field in key_fields]
+    stored = model.objects.select_for_update().filter(**{
+        f'{column}__in': {key[n] for key in counts} for n, column in enumerate(columns)
+    })
+    stored = {tuple(getattr(row, column) for column in columns): getattr(row, count_field) for row in stored}
+
+    model.objects.bulk_create(
+        [model(**dict(zip(columns, key)), **{count_field: stored.get(key, 0) + count}) for key, count in counts.items()],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=key_fields,
+        update_fields=[count_field],
+    )
+
+
+def refresh(name, chunk_size=10000):
+    """
+    Count the rows added to the source of a rollup since its watermark and return how many.
+
+    Rows younger than ROLLUP_SETTLE_SECONDS are left for the next run: a row
+    whose transaction commits after a higher id has been counted would
+    otherwise fall behind the watermark and never be counted.
+    """
+    source, created_field, count, rollup, key_fields, count_field = ROLLUPS[name]
+    settled = timezone.now() - timedelta(seconds=settings.ROLLUP_SETTLE_SECONDS)
+    watermark, _ = RollupWatermark.objects.get_or_create(name=name)
+
+    processed = 0
+    while True:
+        pending = source.objects.filter(pk__gt=watermark.last_id, **{f'{created_field}__lt': settled}).order_by('pk')
+        end = pending.values_list('pk', flat=True)[chunk_size - 1:chunk_size].first()
+        if end is None:
+            end = pending.aggregate(end=Max('pk'))['end']
+            if end is None:
+                return processed
+
+        chunk = source.objects.filter(pk__gt=watermark.last_id, pk__lte=end)
+        with transaction.atomic():
+            # Waits for a regrade moving counted attempts, whose new scores this chunk then reads
+            RollupWatermark.objects.select_for_update().filter(name=name).get()
+            counts = count(chunk)
+            add_counts(rollup, key_fields, count_field, counts, chunk_size)
+            # Moved in the same transaction as the counts, so a chunk is never counted twice
+            RollupWatermark.objects.filter(name=name).update(last_id=end, updated_at=timezone.now())
+        processed += sum(counts.values())
+        watermark.last_id = end
+
+
+def adjust_counted_scores(deltas, batch_size):
+    # (attempt, score, total, delta) for attempts the rollup already counted; the rest are left to refresh()
+    watermark = RollupWatermark.objects.select_for_update().filter(name='scores').first()
+    if watermark is None:
+        return
+
+    counts = defaultdict(int)
+    for attempt, score, total, delta in deltas:
+        if attempt.pk <= watermark.last_id:
+            # The day TruncDate gave the attempt when it was counted
+            counts[attempt.assessment_id, timezone.localdate(attempt.submitted_at), score_bucket(score, total)] += delta
+
+    counts = {key: count for key, count in counts.items() if count}
+    if counts:
+        add_counts(ScoreRollup, ROLLUPS['scores'][4], 'attempts', counts, batch_size)
+
+
+def move_scores(changes, batch_size=1000):
+    """
+    Move re-graded attempts the score rollup already counted from their old bucket to their new one.
+
+    ``changes`` are (attempt, old score, old total) tuples; call this in the
+    transaction saving the new scores.
+    """
+    adjust_counted_scores(
+        [(attempt, score, total, -1) for attempt, score, total in changes]
+        + [(attempt, attempt.score, attempt.total, 1) for attempt, _, _ in changes],
+        batch_size,
+    )
+
+
+def forget_scores(attempts, batch_size=1000):
+    """
+    Remove deleted attempts the score rollup already counted from their bucket.
+    """
+    adjust_counted_scores([(attempt, attempt.score, attempt.total, -1) for attempt in attempts], batch_size)
+
+
+def rebuild(name):
+    with transaction.atomic():
+        ROLLUPS[name][3].objects.all().delete()
+        RollupWatermark.objects.filter(name=name).delete()
+
+
+def course_analytics(course):
+    """
+    Return new enrollments per day and the score distribution of every assessment of ``course``.
+    """
+    enrollments, total = [], 0
+    for day, count in EnrollmentRollup.objects.filter(course=course).order_by('day').values_list('day', 'enrollments'):
+        total += count
+        enrollments.append({'day': day, 'enrollments': count, 'total': total})
+
+    distributions = defaultdict(lambda: [0] * BUCKETS)
+    scores = ScoreRollup.objects.filter(assessment__content__course=course).values('assessment_id', 'bucket')
+    for row in scores.annotate(attempts=Sum('attempts')).order_by():
+        distributions[row['assessment_id']][row['bucket']] = row['attempts']
+
+    assessments = Assessment.objects.filter(content__course=course).order_by('id').values('id', 'title', 'content__slug')
+    watermarks = dict(RollupWatermark.objects.values_list('name', 'updated_at'))
+    return {
+        'enrollments': enrollments,
+        'assessments': [
+            {
+                'id': assessment['id'],
+                'lesson': assessment['content__slug'],
+                'title': assessment['title'],
+                'attempts': sum(distributions[assessment['id']]),
+                'distribution': distributions[assessment['id']],
+            }
+            for assessment in assessments
+        ],
+        'refreshed_at': {name: watermarks.get(name) for name in ROLLUPS},
+    }
@@ -0,0 +1,116 @@
+from django.db.models import Q
+from django.utils.cache import get_conditional_response
+from django.http import JsonResponse
+from rest_framework.request import Request
+from rest_framework.utils.urls import replace_query_param
+
+from accounts.authentication import aauthenticate
+
+from .cache import acached_response, add_validators
+from .inbox import decode_cursor, encode_cursor
+from .models import Content, Course, Message
+from .pagination import CursorPagination
+from .permissions import ais_enrolled_student
+from .serializers import ContentSerializer, CourseSerializer, MessageSerializer
+
+
+def error_response(status, detail):
+    return JsonResponse({"detail": detail}, status=status)
+
+
+def get_page_size(request):
+    return CursorPagination().get_page_size(Request(request))
+
+
+async def get_course_for_member(request, course_slug):
+    """
+    Resolve the course for a course member, the rule ContentPermission and
+    MessagesPermission apply to reads: its instructor or an enrolled student.
+
+    Returns (user, course, None), or (None, None, error response).
+    """
+    user = await aauthenticate(request)
+    if user is None:
+        return None, None, error_response(401, "Authentication credentials were not provided.")
+
+    course = await Course.objects.select_related('instructor__user').defer('search_vector').filter(slug=course_slug).afirst()
+    if course is None:
+        return None, None, error_response(404, "Not found.")
+
+    if user != course.instructor.user and not await ais_enrolled_student(user, course):
+        return None, None, error_response(403, "You do not have permission to perform this action.")
+    return user, course, None
+
+
+async def course_detail(request, slug):
+    async def render():
+        course = await Course.objects.select_related('instructor__user').defer('search_vector').filter(slug=slug).afirst()
+        if course is None:
+            return error_response(404, "Not found.")
+        return JsonResponse(CourseSerializer(course).data)
+
+    return await acached_response(slug, 'course', request, render, conditional=True)
+
+
+async def lesson_list(request, course_slug):
+    user, course, error = await get_course_for_member(request, course_slug)
+    if error:
+        return error
+
+    # Validated like the sync lesson list, against the course loaded for the permission check
+    last_modified = course.content_updated_at.timestamp()
+    etag = f'"lessons-{course.pk}-{last_modified}-json"'
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if not_modified is not None:
+        return not_modified
+
+    async def render():
+        page_size = get_page_size(request)
+        queryset = Content.objects.filter(course=course).order_by('id')
+        after = request.GET.get('after')
+        if after:
+            if not after.isdigit():
+                return error_response(404, "Invalid cursor.")
+            queryset = queryset.filter(id__gt=int(after))
+
+        lessons = [lesson async for lesson in queryset[:page_size + 1]]
+        next_url = None
+        if len(lessons) > page_size:
+            lessons = lessons[:page_size]
+            next_url = replace_query_param(request.build_absolute_uri(), 'after', lessons[-1].pk)
+
+        return JsonResponse({'next': next_url, 'results': ContentSerializer(lessons, many=True).data})
+
+    response = await acached_response(course_slug, 'lessons', request, render)
+    add_validators(response, etag, int(last_modified))
+    return response
+
+
+async def message_list(request, course_slug):
+    user, course, error = await get_course_for_member(request, course_slug)
+    if error:
+        return error
+
+    page_size = get_page_size(request)
+    older = Q()
+    cursor = request.GET.get('cursor')
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            return error_response(404, "Invalid cursor.")
+        timestamp, pk = position
+        older = Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, pk__lt=pk)
+
+    # Sent and received messages are read from their own indexes and merged, newest first
+    messages = []
+    for field in ['sender', 'receiver']:
+        branch = Message.objects.filter(older, course=course, **{field: user}).order_by('-timestamp', '-pk')
+        messages.extend([message async for message in branch[:page_size + 1]])
+    messages.sort(key=lambda message: (message.timestamp, message.pk), reverse=True)
+
+    next_url = None
+    if len(messages) > page_size:
+        messages = messages[:page_size]
+        next_url = replace_query_param(request.build_absolute_uri(), 'cursor', encode_cursor(messages[-1]))
+
+    return JsonResponse({'next': next_url, 'results': MessageSerializer(messages, many=True).data})
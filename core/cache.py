@@ -0,0 +1,274 @@
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+# Seconds an enrollment membership answer is shared between requests
+ENROLLMENT_CACHE_TIMEOUT = 300
+
+# Answer keys are versioned by Assessment.updated_at, so they never need explicit invalidation
+ANSWER_KEY_CACHE_TIMEOUT = 60 * 60
+
+
+def enrollment_cache_key(user_id, course_id):
+    return f'enrollment:{course_id}:{user_id}'
+
+
+def get_enrollment_membership(user_id, course_id):
+    # Returns True/False, or None when the answer is not cached
+    return cache.get(enrollment_cache_key(user_id, course_id))
+
+
+def set_enrollment_membership(user_id, course_id, is_enrolled):
+    cache.set(enrollment_cache_key(user_id, course_id), is_enrolled, ENROLLMENT_CACHE_TIMEOUT)
+
+
+async def aget_enrollment_membership(user_id, course_id):
+    return await cache.aget(enrollment_cache_key(user_id, course_id))
+
+
+async def aset_enrollment_membership(user_id, course_id, is_enrolled):
+    await cache.aset(enrollment_cache_key(user_id, course_id), is_enrolled, ENROLLMENT_CACHE_TIMEOUT)
+
+
+def invalidate_enrollment(user_id, course_id):
+    cache.delete(enrollment_cache_key(user_id, course_id))
+
+
+def invalidate_enrollments(user_ids, course_id):
+    cache.delete_many([enrollment_cache_key(user_id, course_id) for user_id in user_ids])
+
+
+def answer_key_cache_key(assessment):
+    return f'answer-key:{assessment.pk}:{assessment.updated_at.timestamp()}'
+
+
+def get_answer_key(assessment):
+    return cache.get(answer_key_cache_key(assessment))
+
+
+def set_answer_key(assessment, answer_key):
+    cache.set(answer_key_cache_key(assessment), answer_key, ANSWER_KEY_CACHE_TIMEOUT)
+
+
+def course_version_key(course_slug):
+    return f'course-version:{course_slug}'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a lost counter never reuses an older version
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def get_course_version(course_slug):
+    return get_version(course_version_key(course_slug))
+
+
+def bump_course_version(course_slug):
+    bump_version(course_version_key(course_slug))
+
+
+def user_version_key(user_id):
+    return f'user-version:{user_id}'
+
+
+def bump_user_versions(user_ids):
+    # Expires what is cached for these users: their enrollments, messages or progress changed
+    for user_id in set(user_ids):
+        bump_version(user_version_key(user_id))
+
+
+def response_cache_key(course_slug, version, name, request):
+    url = hashlib.md5(request.build_absolute_uri().encode('utf-8')).hexdigest()
+    return f'response:{course_slug}:{version}:{name}:{url}'
+
+
+def seed_course_version(course_slug):
+    """
+    Create the version of a course that has none yet, and return it.
+
+    Returns None when a concurrent bump created it first: what was read before
+    then belongs to no version and must not be cached.
+    """
+    version = time.time_ns()
+    return version if cache.add(course_version_key(course_slug), version, None) else None
+
+
+def conditional_response(request, etag, last_modified, render):
+    """
+    Answer 304 when the client's copy is still current, or call ``render`` and add the validators.
+
+    ``last_modified`` is a timestamp, or None for a resource validated by its ETag alone.
+    """
+    last_modified = None if last_modified is None else int(last_modified)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    response = render()
+    add_validators(response, etag, last_modified)
+    return response
+
+
+def add_validators(response, etag, last_modified):
+    if response.status_code == 200:
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+
+
+def cached_response(course_slug, name, request, render, conditional=False):
+    """
+    Serve a course-scoped response from the cache, or call ``render`` and store its data.
+
+    The version is read before rendering, so data read before a concurrent update
+    is stored under the old version and never served once the version is bumped.
+    Reading never creates a version: a slug gets one once it has rendered, so
+    requests for slugs that do not exist leave nothing behind.
+
+    With ``conditional``, responses carry the version in their ETag and a client
+    holding the current entry is answered 304 without anything being rendered.
+    They send no Last-Modified: the version records that the course changed, not when.
+    """
+    version = cache.get(course_version_key(course_slug))
+    key = entry = None
+    if version is not None:
+        key = response_cache_key(course_slug, version, name, request)
+        entry = cache.get(key)
+
+    if conditional and version is not None:
+        etag = response_etag(course_slug, version, name, request.accepted_renderer.format)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+    if entry is not None:
+        count_response_cache('hits')
+        response = Response(entry)
+        response['X-Cache'] = 'HIT'
+    else:
+        count_response_cache('misses')
+        response = render()
+        if response.status_code == 200:
+            if version is None:
+                version = seed_course_version(course_slug)
+                if version is not None:
+                    key = response_cache_key(course_slug, version, name, request)
+            if version is not None:
+                cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+
+    if conditional and version is not None:
+        add_validators(response, response_etag(course_slug, version, name, request.accepted_renderer.format), None)
+    return response
+
+
+async def acached_response(course_slug, name, request, render, conditional=False):
+    """
+    Async counterpart of cached_response for the views in core.async_views.
+
+    ``render`` is awaited and returns a JsonResponse, whose body is stored as is.
+    """
+    version = await cache.aget(course_version_key(course_slug))
+    key = entry = None
+    if version is not None:
+        key = response_cache_key(course_slug, version, name, request)
+        entry = await cache.aget(key)
+
+    if conditional and version is not None:
+        etag = response_etag(course_slug, version, name, 'json')
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+    if entry is not None:
+        await sync_to_async(count_response_cache)('hits')
+        response = HttpResponse(entry, content_type='application/json')
+        response['X-Cache'] = 'HIT'
+    else:
+        await sync_to_async(count_response_cache)('misses')
+        response = await render()
+        if response.status_code == 200:
+            if version is None:
+                version = await sync_to_async(seed_course_version)(course_slug)
+                if version is not None:
+                    key = response_cache_key(course_slug, version, name, request)
+            if version is not None:
+                await cache.aset(key, response.content, settings.RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+
+    if conditional and version is not None:
+        add_validators(response, response_etag(course_slug, version, name, 'json'), None)
+    return response
+
+
+def response_etag(course_slug, version, name, variant):
+    return f'"{name}-{course_slug}-{version}-{variant}"'
+
+
+def cached_dashboard(user_id, request, course_slugs, render):
+    """
+    Serve a user's dashboard from the cache, or call ``render`` and store its data.
+
+    The entry is keyed by the user's version and remembers the versions of the
+    courses it shows, so it also expires when one of those courses changes.
+    ``course_slugs`` returns the slugs of the user's courses; their versions are
+    read before ``render`` runs, so a course changed while rendering no longer
+    matches the stored version.
+    """
+    url = hashlib.md5(request.build_absolute_uri().encode('utf-8')).hexdigest()
+    key = f'response:user:{user_id}:{get_version(user_version_key(user_id))}:dashboard:{url}'
+    entry = cache.get(key)
+    if entry is not None:
+        courses, data = entry
+        if cache.get_many([course_version_key(slug) for slug in courses]) == {
+            course_version_key(slug): version for slug, version in courses.items()
+        }:
+            count_response_cache('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+    count_response_cache('misses')
+    slugs = set(course_slugs())
+    keys = {slug: course_version_key(slug) for slug in slugs}
+    versions = cache.get_many(keys.values())
+    courses = {slug: versions.get(key) or get_course_version(slug) for slug, key in keys.items()}
+
+    response, rendered = render()
+    # Courses enrolled in or left while rendering have no version in the snapshot
+    if response.status_code == 200 and set(rendered) == slugs:
+        cache.set(key, (courses, response.data), settings.RESPONSE_CACHE_TIMEOUT)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def count_response_cache(counter):
+    key = f'response-cache:{counter}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def response_cache_stats():
+    return {counter: cache.get(f'response-cache:{counter}', 0) for counter in ['hits', 'misses']}
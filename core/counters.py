@@ -0,0 +1,99 @@
+import threading
+from collections import defaultdict
+from functools import partial, reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.query import QuerySet
+
+from .cache import bump_course_version
+from .models import Assessment, Content, Course, Enrollment
+
+
+# Counter column on Course -> (counted model, path from that model to its course)
+COUNTERS = {
+    'enrollment_count': (Enrollment, 'course'),
+    'lesson_count': (Content, 'course'),
+    'assessment_count': (Assessment, 'content__course'),
+}
+
+
+# Lookup -> values of the courses expired by the current transaction, per thread
+_expired = threading.local()
+
+
+def adjust(field, delta, **lookup):
+    """
+    Add ``delta`` to a counter of the course matching ``lookup``, without reading either.
+    """
+    Course.objects.filter(**lookup).update(**{field: F(field) + delta})
+    # The counts are part of the cached course responses, expired once the new count is visible
+    expire_course(**lookup)
+
+
+def expire_course(**lookup):
+    """
+    Bump the version of the course matching ``lookup``, such as ``pk=course_id``, after commit.
+
+    Callers only need the ids their rows hold: the slugs of all the courses a
+    transaction expired are read in one query by the first of its callbacks.
+    """
+    (field, value), = lookup.items()
+    if not hasattr(_expired, 'lookups'):
+        _expired.lookups = defaultdict(set)
+    _expired.lookups[field].add(value)
+    transaction.on_commit(bump_expired_courses)
+
+
+def bump_expired_courses():
+    lookups = getattr(_expired, 'lookups', None)
+    if not lookups:
+        return
+    # Left over by a rolled back transaction, the extra courses only expire early
+    query = reduce(or_, (Q(**{f'{field}__in': values}) for field, values in lookups.items()))
+    lookups.clear()
+    for slug in Course.objects.filter(query).values_list('slug', flat=True).distinct():
+        bump_course_version(slug)
+
+
+def deleted_with(origin, *models):
+    # Whether the delete started from one of ``models``, whose own receivers handle the cascade
+    if isinstance(origin, QuerySet):
+        return issubclass(origin.model, models)
+    return isinstance(origin, models)
+
+
+def deleted_with_course(origin):
+    # Rows removed by a course's cascade have no course left to count them
+    return deleted_with(origin, Course)
+
+
+def actual_count(field):
+    model, path = COUNTERS[field]
+    counted = model.objects.filter(**{path: OuterRef('pk')}).order_by().values(path)
+    return Coalesce(Subquery(counted.annotate(total=Count('pk')).values('total')), Value(0))
+
+
+def reconcile(courses=None, chunk_size=1000):
+    """
+    Recount the counters of ``courses`` (all by default) and fix the rows that drifted.
+
+    Returns the number of courses updated.
+    """
+    courses = Course.objects.all() if courses is None else courses
+    actual = {f'actual_{field}': actual_count(field) for field in COUNTERS}
+    rows = courses.annotate(**actual).values_list('pk', 'slug', *COUNTERS, *actual).order_by('pk')
+
+    drifted = []
+    fields = len(COUNTERS)
+    for pk, slug, *counts in rows.iterator(chunk_size=chunk_size):
+        stored, recounted = counts[:fields], counts[fields:]
+        if stored != recounted:
+            drifted.append(Course(pk=pk, slug=slug, **dict(zip(COUNTERS, recounted))))
+
+    Course.objects.bulk_update(drifted, list(COUNTERS), batch_size=chunk_size)
+    for course in drifted:
+        transaction.on_commit(partial(bump_course_version, course.slug))
+    return len(drifted)
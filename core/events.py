@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from .async_views import get_course_for_member
+from .pubsub import get_broker, message_channel
+from .serializers import ThreadMessageSerializer
+
+
+def publish_message(message):
+    event = ThreadMessageSerializer(message).data
+    broker = get_broker()
+    for user_id in {message.sender_id, message.receiver_id}:
+        broker.publish(message_channel(message.course_id, user_id), event)
+
+
+async def message_stream(request, course_slug):
+    """
+    Server-Sent Events stream of the messages a user sends and receives in a course.
+
+    Served through backend.asgi; each idle connection costs a queue and a
+    suspended coroutine rather than a worker thread.
+    """
+    user, course, error = await get_course_for_member(request, course_slug)
+    if error:
+        return error
+
+    broker = get_broker()
+    subscription = broker.subscribe(message_channel(course.pk, user.pk))
+
+    async def events():
+        try:
+            yield ': connected\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), settings.EVENT_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing idle connections
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f'event: message\ndata: {json.dumps(event)}\n\n'
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,42 @@
+from functools import partial
+
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .cache import conditional_response
+from .models import Course
+from .permissions import get_course
+
+
+def touch_course_content(**lookup):
+    """
+    Record that the lessons or assessments of the courses matching ``lookup`` changed.
+    """
+    Course.objects.filter(**lookup).update(content_updated_at=timezone.now())
+
+
+class ConditionalCourseContentMixin:
+    """
+    Validate list and retrieve against the course's content_updated_at.
+
+    The course is already loaded by the permission check, so an unchanged list is
+    answered with 304 without querying it. Retrieve looks the object up first: the
+    ETag only covers the course, and a missing one must still be a 404.
+    """
+
+    def etag_variant(self):
+        # Part of the ETag telling apart representations of the same data
+        return self.request.accepted_renderer.format
+
+    def conditional(self, render):
+        course = get_course(self)
+        last_modified = course.content_updated_at.timestamp()
+        etag = f'"{self.basename}-{course.pk}-{last_modified}-{self.etag_variant()}"'
+        return conditional_response(self.request, etag, last_modified, render)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self.conditional(lambda: Response(self.get_serializer(instance).data))
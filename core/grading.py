@@ -0,0 +1,28 @@
+from . import cache
+from .models import Option, Question
+
+
+def build_answer_key(assessment):
+    """
+    Map every question of the assessment to its correct option.
+
+    Keys are question ids as strings, matching the JSON answer sheets stored on
+    Attempt. Questions without a correct option map to None and can't be scored.
+    """
+    answer_key = cache.get_answer_key(assessment)
+    if answer_key is None:
+        answer_key = {str(pk): None for pk in Question.objects.filter(assessment=assessment).values_list('pk', flat=True)}
+        correct_options = Option.objects.filter(question__assessment=assessment, is_correct=True)
+        for question_id, option_id in correct_options.values_list('question_id', 'pk'):
+            answer_key[str(question_id)] = option_id
+        cache.set_answer_key(assessment, answer_key)
+    return answer_key
+
+
+def grade(answer_key, answers):
+    # Returns (score, total) for an answer sheet, without touching the database
+    score = sum(
+        1 for question_id, option_id in answer_key.items()
+        if option_id is not None and answers.get(question_id) == option_id
+    )
+    return score, len(answer_key)
@@ -0,0 +1,103 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+
+from .models import Conversation, Message
+
+
+def record_message(message):
+    """
+    Update the sender's and the receiver's conversation rows for a new message.
+    """
+    with transaction.atomic():
+        for user_id, peer_id, unread in [
+            (message.sender_id, message.receiver_id, 0),
+            (message.receiver_id, message.sender_id, 1),
+        ]:
+            conversation = Conversation.objects.filter(user_id=user_id, course_id=message.course_id, peer_id=peer_id)
+            changes = {
+                'last_message': message,
+                'updated_at': message.timestamp,
+                'unread_count': F('unread_count') + unread,
+            }
+            if conversation.update(**changes):
+                continue
+            try:
+                with transaction.atomic():
+                    Conversation.objects.create(
+                        user_id=user_id, course_id=message.course_id, peer_id=peer_id,
+                        last_message=message, updated_at=message.timestamp, unread_count=unread,
+                    )
+            except IntegrityError:
+                # Another request created the row first
+                conversation.update(**changes)
+
+
+def forget_message(message):
+    """
+    Bring the sender's and the receiver's conversation rows up to date after a message was deleted.
+    """
+    thread = Message.objects.filter(
+        Q(sender_id=message.sender_id, receiver_id=message.receiver_id)
+        | Q(sender_id=message.receiver_id, receiver_id=message.sender_id),
+        course_id=message.course_id,
+    )
+    with transaction.atomic():
+        latest = thread.order_by('-timestamp', '-pk').first()
+        for user_id, peer_id in [(message.sender_id, message.receiver_id), (message.receiver_id, message.sender_id)]:
+            conversation = Conversation.objects.select_for_update().filter(
+                user_id=user_id, course_id=message.course_id, peer_id=peer_id,
+            ).first()
+            if conversation is None:
+                continue
+            if latest is None:
+                conversation.delete()
+                continue
+
+            changes = {'last_message': latest, 'updated_at': latest.timestamp}
+            if user_id == message.receiver_id and conversation.unread_count:
+                # The unread messages are the newest ones received; the deleted one was among them
+                # when fewer than unread_count received messages are newer than it
+                newer = thread.filter(
+                    Q(timestamp__gt=message.timestamp) | Q(timestamp=message.timestamp, pk__gt=message.pk),
+                    sender_id=peer_id,
+                ).count()
+                if newer < conversation.unread_count:
+                    changes['unread_count'] = F('unread_count') - 1
+            Conversation.objects.filter(pk=conversation.pk).update(**changes)
+
+
+def encode_cursor(message):
+    value = f'{message.timestamp.isoformat()}|{message.pk}'
+    return urlsafe_b64encode(value.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, pk = urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (TypeError, ValueError, UnicodeError):
+        return None
+
+
+def thread_history(course, user, peer, page_size, cursor=None):
+    """
+    Return one page of a thread, newest first, and whether older messages remain.
+
+    Each direction of the thread is read from its own index range and the two
+    already-sorted pages are merged, so deep pages cost the same as the first one.
+    """
+    older = Q()
+    if cursor is not None:
+        timestamp, pk = cursor
+        older = Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, pk__lt=pk)
+
+    messages = []
+    for sender, receiver in [(user, peer), (peer, user)]:
+        branch = Message.objects.filter(older, course=course, sender=sender, receiver=receiver).select_related('sender')
+        messages.extend(branch.order_by('-timestamp', '-pk')[:page_size + 1])
+
+    messages.sort(key=lambda message: (message.timestamp, message.pk), reverse=True)
+    return messages[:page_size], len(messages) > page_size
@@ -0,0 +1,239 @@
+import random
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import get_resolver
+
+
+# Upper bounds, in milliseconds, of the latency histogram kept for each route
+LATENCY_BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf')]
+
+COUNTERS = ['requests', 'queries', 'db_us', 'serializer_us', 'total_us', 'duplicates']
+
+# Timings of the sampled request being handled in this context, None otherwise
+current = ContextVar('instrumentation', default=None)
+
+
+class RequestTimings:
+    def __init__(self, detect_duplicates):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        self.statements = Counter() if detect_duplicates else None
+
+    def query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            if self.statements is not None:
+                self.statements[sql] += 1
+
+    def duplicates(self):
+        """
+        Return the number of repeated statements and the most repeated one.
+
+        The same SQL with different parameters counts as a repeat: it is how
+        an N+1 loop shows up.
+        """
+        if not self.statements:
+            return 0, None
+        sql, count = self.statements.most_common(1)[0]
+        repeats = sum(count - 1 for count in self.statements.values())
+        return repeats, sql if count > 1 else None
+
+
+def instrument_query(execute, sql, params, many, context):
+    # Context variables follow sync_to_async, so queries of async views are counted too
+    timings = current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.query(execute, sql, params, many, context)
+
+
+def add_query_wrapper(connection, **kwargs):
+    if instrument_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(instrument_query)
+
+
+def install_query_wrapper():
+    connection_created.connect(add_query_wrapper)
+    for connection in connections.all(initialized_only=True):
+        add_query_wrapper(connection)
+
+
+class TimedSerializerMixin:
+    """
+    Add the time a serializer spends producing data to the sampled request's timings.
+
+    Only the outermost call is measured: nested serializers run inside it, and a
+    list serializer times each item through its child.
+    """
+
+    def to_representation(self, instance):
+        timings = current.get()
+        if timings is None or timings.serializing:
+            return super().to_representation(instance)
+        timings.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            timings.serializer_time += time.perf_counter() - start
+            timings.serializing = False
+
+
+def stats_key(route, name):
+    return f'instrumentation:{route}:{name}'
+
+
+def increment(key, delta):
+    if not cache.add(key, delta, None):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            cache.set(key, delta, None)
+
+
+def record(route, timings, total_time):
+    values = {
+        'requests': 1,
+        'queries': timings.queries,
+        'db_us': round(timings.db_time * 1e6),
+        'serializer_us': round(timings.serializer_time * 1e6),
+        'total_us': round(total_time * 1e6),
+    }
+    repeats, sql = timings.duplicates()
+    if repeats:
+        values['duplicates'] = repeats
+        cache.set(stats_key(route, 'duplicate_sql'), sql, None)
+    values[f'latency_le_{bucket_label(total_time * 1000)}'] = 1
+
+    for name, delta in values.items():
+        if delta:
+            increment(stats_key(route, name), delta)
+
+
+def bucket_label(latency_ms):
+    bound = LATENCY_BUCKETS[bisect_left(LATENCY_BUCKETS, latency_ms)]
+    return 'inf' if bound == float('inf') else bound
+
+
+def route_names(resolver=None, prefix=''):
+    resolver = resolver or get_resolver()
+    names = {prefix + name for name in resolver.reverse_dict if isinstance(name, str)}
+    for namespace, (_, namespaced) in resolver.namespace_dict.items():
+        names.update(route_names(namespaced, f'{prefix}{namespace}:'))
+    return sorted(names)
+
+
+def route_stats():
+    """
+    Return the aggregates of every route with at least one sampled request, most queries first.
+    """
+    buckets = [f'latency_le_{bucket_label(bound)}' for bound in LATENCY_BUCKETS]
+    names = route_names()
+    keys = [stats_key(route, name) for route in names for name in [*COUNTERS, *buckets, 'duplicate_sql']]
+    values = cache.get_many(keys)
+
+    report = []
+    for route in names:
+        counts = {name: values.get(stats_key(route, name), 0) for name in COUNTERS}
+        requests = counts['requests']
+        if not requests:
+            continue
+
+        # Approximate p95 by the upper bound of the bucket that reaches it
+        p95, seen = None, 0
+        for bound, bucket in zip(LATENCY_BUCKETS, buckets):
+            seen += values.get(stats_key(route, bucket), 0)
+            if p95 is None and seen >= 0.95 * requests:
+                p95 = bound
+
+        report.append({
+            'route': route,
+            'requests': requests,
+            'queries_per_request': counts['queries'] / requests,
+            'db_ms': counts['db_us'] / requests / 1000,
+            'serializer_ms': counts['serializer_us'] / requests / 1000,
+            'latency_ms': counts['total_us'] / requests / 1000,
+            'latency_p95_ms': p95,
+            'duplicates_per_request': counts['duplicates'] / requests,
+            'duplicate_sql': values.get(stats_key(route, 'duplicate_sql')),
+        })
+    report.sort(key=lambda row: row['queries_per_request'] * row['requests'], reverse=True)
+    return report
+
+
+def reset_stats():
+    buckets = [f'latency_le_{bucket_label(bound)}' for bound in LATENCY_BUCKETS]
+    cache.delete_many([
+        stats_key(route, name) for route in route_names() for name in [*COUNTERS, *buckets, 'duplicate_sql']
+    ])
+
+
+class InstrumentationMiddleware:
+    """
+    Record query count, DB time, serializer time and latency per route name.
+
+    Only a sample of requests (INSTRUMENTATION_SAMPLE_RATE) is measured; the
+    others pay for one random() call. Aggregates are kept in the cache, so with
+    a shared cache backend they cover every worker.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        self.detect_duplicates = settings.INSTRUMENTATION_DETECT_DUPLICATES
+        install_query_wrapper()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timings = RequestTimings(self.detect_duplicates)
+        token = current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        self.record(request, response, timings, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        timings = RequestTimings(self.detect_duplicates)
+        token = current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        await sync_to_async(self.record)(request, response, timings, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, timings, total_time):
+        # Streamed bodies are produced after the view returns, outside the measurement
+        match = request.resolver_match
+        if match is not None and match.view_name and not response.streaming:
+            record(match.view_name, timings, total_time)
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Course
+from core.roster import enroll_students, read_identifiers
+
+
+class Command(BaseCommand):
+    help = "Enroll the students listed in a CSV of usernames or emails in a course."
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_slug')
+        parser.add_argument('csv_path', help="Path to the CSV file, or - to read standard input.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        course = Course.objects.filter(slug=options['course_slug']).first()
+        if course is None:
+            raise CommandError(f"Course {options['course_slug']!r} does not exist.")
+
+        if options['csv_path'] == '-':
+            result = enroll_students(course, read_identifiers(sys.stdin), options['batch_size'])
+        else:
+            with open(options['csv_path'], newline='', encoding='utf-8') as lines:
+                result = enroll_students(course, read_identifiers(lines), options['batch_size'])
+
+        for identifier in result['unknown']:
+            self.stderr.write(f"No user matches {identifier!r}.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Enrolled {result['enrolled']} student(s), {result['already_enrolled']} already enrolled, "
+            f"{len(result['unknown'])} unknown."
+        ))
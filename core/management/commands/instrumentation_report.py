@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from core.instrumentation import reset_stats, route_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the per-route query and latency aggregates recorded by InstrumentationMiddleware. "
+        "Other processes' requests are only visible with a shared cache backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--reset', action='store_true', help="Clear the aggregates after printing them.")
+
+    def handle(self, *args, **options):
+        rows = route_stats()[:options['limit']]
+        if not rows:
+            self.stdout.write("No sampled requests yet.")
+        for row in rows:
+            p95 = row['latency_p95_ms']
+            self.stdout.write(
+                f"{row['route']:<40} {row['requests']:>7} req  {row['queries_per_request']:7.1f} queries  "
+                f"db {row['db_ms']:8.2f} ms  serializer {row['serializer_ms']:8.2f} ms  "
+                f"total {row['latency_ms']:8.2f} ms  p95 <= {p95} ms  duplicates {row['duplicates_per_request']:.1f}"
+            )
+            if row['duplicate_sql']:
+                self.stdout.write(f"    most repeated: {row['duplicate_sql']}")
+
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS("Cleared the aggregates."))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Conversation, Message
+
+
+class Command(BaseCommand):
+    help = "Rebuild the conversation summaries from the stored messages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        # (user, course, peer) -> (last message id, timestamp); unread counts start at zero
+        latest = {}
+        messages = Message.objects.order_by('timestamp', 'id').values_list(
+            'id', 'sender_id', 'receiver_id', 'course_id', 'timestamp'
+        )
+        for pk, sender_id, receiver_id, course_id, timestamp in messages.iterator(chunk_size=options['chunk_size']):
+            latest[(sender_id, course_id, receiver_id)] = (pk, timestamp)
+            latest[(receiver_id, course_id, sender_id)] = (pk, timestamp)
+
+        conversations = [
+            Conversation(user_id=user_id, course_id=course_id, peer_id=peer_id, last_message_id=pk, updated_at=timestamp)
+            for (user_id, course_id, peer_id), (pk, timestamp) in latest.items()
+        ]
+        with transaction.atomic():
+            Conversation.objects.bulk_create(
+                conversations,
+                batch_size=options['chunk_size'],
+                update_conflicts=True,
+                unique_fields=['user', 'course', 'peer'],
+                update_fields=['last_message', 'updated_at'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(conversations)} conversation(s)."))
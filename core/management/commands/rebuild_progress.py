@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.progress import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = "Recount the per-course progress summaries from the stored lesson progress."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_summaries(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} progress summary(ies)."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Course
+from core.search import search_vector, uses_search_vector
+
+
+class Command(BaseCommand):
+    help = "Recompute the catalog search vector of every course."
+
+    def handle(self, *args, **options):
+        if not uses_search_vector():
+            self.stdout.write("The in-memory search index is built on first use; nothing to rebuild.")
+            return
+
+        updated = Course.objects.update(search_vector=search_vector())
+        self.stdout.write(self.style.SUCCESS(f"Indexed {updated} course(s)."))
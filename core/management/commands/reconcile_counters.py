@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recount the enrollment, lesson and assessment counters of every course and fix any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fixed = reconcile(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Fixed the counters of {fixed} course(s)."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.analytics import ROLLUPS, rebuild, refresh
+
+
+class Command(BaseCommand):
+    help = "Add the enrollments and attempts created since the last run to the daily analytics rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument('--rebuild', action='store_true', help="Drop the rollups and count every row again.")
+
+    def handle(self, *args, **options):
+        for name in ROLLUPS:
+            if options['rebuild']:
+                rebuild(name)
+            processed = refresh(name, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f"Rolled up {processed} new row(s) into {name}."))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.analytics import move_scores
+from core.grading import build_answer_key, grade
+from core.models import Attempt
+
+
+class Command(BaseCommand):
+    help = "Re-grade submitted attempts against the current answer keys."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--assessment', type=int, help="Only re-grade attempts of this assessment id.")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        queryset = Attempt.objects.select_related('assessment').only(
+            'id', 'answers', 'score', 'total', 'submitted_at', 'assessment__id', 'assessment__updated_at'
+        ).order_by('id')
+        if options['assessment']:
+            queryset = queryset.filter(assessment_id=options['assessment'])
+
+        answer_keys = {}
+        last_id = 0
+        regraded = changed = 0
+        while True:
+            # Walk the attempts by primary key so every chunk costs the same
+            chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+
+            changes = []
+            for attempt in chunk:
+                assessment = attempt.assessment
+                if assessment.pk not in answer_keys:
+                    answer_keys[assessment.pk] = build_answer_key(assessment)
+
+                score, total = grade(answer_keys[assessment.pk], attempt.answers)
+                if (score, total) != (attempt.score, attempt.total):
+                    changes.append((attempt, attempt.score, attempt.total))
+                    attempt.score, attempt.total = score, total
+
+            with transaction.atomic():
+                Attempt.objects.bulk_update([attempt for attempt, _, _ in changes], ['score', 'total'])
+                # The score rollup follows the attempts it already counted
+                move_scores(changes, chunk_size)
+            regraded += len(chunk)
+            changed += len(changes)
+            last_id = chunk[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"Re-graded {regraded} attempt(s), {changed} score(s) changed."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Content
+
+
+class Command(BaseCommand):
+    help = "Backfill the stored HTML rendering of lesson descriptions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--force', action='store_true', help="Re-render every lesson, even if it is up to date.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pending = []
+        updated = 0
+
+        queryset = Content.objects.only('id', 'description', 'description_html', 'description_hash')
+        for content in queryset.iterator(chunk_size=batch_size):
+            if options['force']:
+                content.description_hash = ''
+            if content.render_description():
+                pending.append(content)
+
+            if len(pending) >= batch_size:
+                Content.objects.bulk_update(pending, ['description_html', 'description_hash'])
+                updated += len(pending)
+                pending = []
+
+        if pending:
+            Content.objects.bulk_update(pending, ['description_html', 'description_hash'])
+            updated += len(pending)
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered {updated} lesson description(s)."))
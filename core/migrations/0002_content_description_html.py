@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-18 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='content',
+            name='description_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='content',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.5 on 2026-10-18 11:49
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def dedupe(apps, schema_editor):
+    Enrollment = apps.get_model('core', 'Enrollment')
+    Option = apps.get_model('core', 'Option')
+
+    # Keep the earliest enrollment of each student in a course
+    duplicates = (
+        Enrollment.objects.values('course_id', 'student_id')
+        .annotate(first_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        Enrollment.objects.filter(course_id=row['course_id'], student_id=row['student_id']).exclude(
+            pk=row['first_id']
+        ).delete()
+
+    # Keep the first correct option of each question
+    duplicates = (
+        Option.objects.filter(is_correct=True)
+        .values('question_id')
+        .annotate(first_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        Option.objects.filter(question_id=row['question_id'], is_correct=True).exclude(
+            pk=row['first_id']
+        ).update(is_correct=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_content_description_html'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe, migrations.RunPython.noop),
+    ]
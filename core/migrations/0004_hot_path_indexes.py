@@ -0,0 +1,37 @@
+# Generated by Django 4.2.5 on 2026-10-18 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_dedupe_enrollments_and_correct_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['title', 'instructor'], name='course_title_instructor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['course', 'sender', 'timestamp'], name='message_course_sender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['course', 'receiver', 'timestamp'], name='message_course_receiver_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='option',
+            index=models.Index(fields=['question', 'is_correct'], name='option_question_correct_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='enrollment',
+            constraint=models.UniqueConstraint(fields=('course', 'student'), name='unique_course_enrollment'),
+        ),
+        migrations.AddConstraint(
+            model_name='option',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_correct', True)), fields=('question',), name='unique_correct_option'),
+        ),
+    ]
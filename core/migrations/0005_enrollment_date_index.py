@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 11:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['course', 'enrollment_date', 'id'], name='enrollment_course_date_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-18 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_enrollment_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
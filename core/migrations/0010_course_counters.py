@@ -0,0 +1,48 @@
+# Generated by Django 4.2.5 on 2026-10-18 12:13
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_existing(apps, schema_editor):
+    Course = apps.get_model('core', 'Course')
+    Enrollment = apps.get_model('core', 'Enrollment')
+    Content = apps.get_model('core', 'Content')
+    Assessment = apps.get_model('core', 'Assessment')
+
+    def total(model, path):
+        rows = model.objects.filter(**{path: OuterRef('pk')}).order_by().values(path)
+        return Coalesce(Subquery(rows.annotate(total=Count('pk')).values('total')), Value(0))
+
+    Course.objects.update(
+        enrollment_count=total(Enrollment, 'course'),
+        lesson_count=total(Content, 'course'),
+        assessment_count=total(Assessment, 'content__course'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_course_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='assessment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='enrollment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.5 on 2026-10-18 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['instructor', 'id'], name='course_instructor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['instructor', 'start_date', 'id'], name='course_instructor_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['instructor', 'end_date', 'id'], name='course_instructor_end_idx'),
+        ),
+    ]
@@ -1,9 +1,13 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
-import markdown
+from django.utils import timezone
 from django.utils.text import slugify
 
+from .rendering import description_hash, render_markdown
+
 
 class Instructor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
@@ -18,6 +22,15 @@ class Enrollment(models.Model):
     course = models.ForeignKey("Course", on_delete=models.CASCADE)
     student = models.ForeignKey(User, on_delete=models.CASCADE)
     enrollment_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'student'], name='unique_course_enrollment'),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'enrollment_date', 'id'], name='enrollment_course_date_idx'),
+        ]
+
     def __str__(self):
         return f"Student: {self.student.username}, Course: {self.course.title}"
 
@@ -29,13 +42,46 @@ class Course(models.Model):
     instructor = models.ForeignKey(Instructor, on_delete=models.CASCADE)
     start_date = models.DateField()
     end_date = models.DateField()
+    # Weighted title, description and lesson text, maintained by core.search on Postgres.
+    # Only searches read it, other queries defer it
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Maintained with F() expressions by core.counters
+    enrollment_count = models.PositiveIntegerField(default=0, editable=False)
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)
+    assessment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Newest change to the course's lessons, assessments, questions or options
+    content_updated_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    COUNTER_FIELDS = ['enrollment_count', 'lesson_count', 'assessment_count']
+    # Taken by the list actions of /api/courses/, a course under one of them could not be reached
+    RESERVED_SLUGS = ['search', 'dashboard']
+    # Written with queryset.update() by the code maintaining them, never from a loaded instance
+    MAINTAINED_FIELDS = COUNTER_FIELDS + ['content_updated_at', 'search_vector']
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['title', 'instructor'], name='course_title_instructor_idx'),
+            GinIndex(fields=['search_vector'], name='course_search_idx'),
+            # Keys of the course list, always filtered by instructor: by id, start date or end date
+            models.Index(fields=['instructor', 'id'], name='course_instructor_idx'),
+            models.Index(fields=['instructor', 'start_date', 'id'], name='course_instructor_start_idx'),
+            models.Index(fields=['instructor', 'end_date', 'id'], name='course_instructor_end_idx'),
+        ]
 
     def get_enrolled_students(self):
         return Enrollment.objects.filter(course=self).select_related('student')
         
     def save(self, *args, **kwargs):
+        # Remember the slug the course was saved under, cached responses are keyed by it
+        self._previous_slug = self.slug
         # Automatically generate the slug from the title when saving the object
         self.slug = slugify(self.title)
+        # Saving a loaded course must not write back values read before a concurrent change
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.MAINTAINED_FIELDS
+            ]
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -47,14 +93,34 @@ class Content(models.Model):
     title = models.CharField(max_length=255)
     slug = models.SlugField(unique = True, max_length=255)
     description = models.TextField()
+    description_html = models.TextField(blank=True, editable=False)
+    description_hash = models.CharField(max_length=64, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         # Automatically generate the slug from the title when saving the object
         self.slug = slugify(self.title)
+        rendered = self.render_description()
+
+        update_fields = kwargs.get('update_fields')
+        if rendered and update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'description_html', 'description_hash'}
         super().save(*args, **kwargs)
-    
+
+    def render_description(self):
+        # Re-render the stored HTML only when the markdown source has changed
+        digest = description_hash(self.description)
+        if digest == self.description_hash:
+            return False
+        self.description_html = render_markdown(self.description)
+        self.description_hash = digest
+        return True
+
     def formatted_description(self):
-        return markdown.markdown(self.description)
+        # Rows written through queryset.update() or not yet backfilled fall back to rendering
+        if self.description_hash and self.description_hash == description_hash(self.description):
+            return self.description_html
+        return render_markdown(self.description)
 
     def __str__(self):
         return f"{self.title} ({self.course.title})."
@@ -64,6 +130,8 @@ class Assessment(models.Model):
     content = models.ForeignKey(Content, on_delete=models.CASCADE)
     title = models.CharField(max_length=256)
     description = models.TextField()
+    # Bumped whenever the assessment or any of its questions and options change
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Assesment# {self.pk}, Content: {self.content.title}, Course: {self.content.course.title}"
@@ -72,6 +140,8 @@ class Assessment(models.Model):
 class Question(models.Model):
     assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE)
     question_text = models.TextField()
+    # Bumped when one of its options changes as well
+    updated_at = models.DateTimeField(auto_now=True)
 
     def get_options(self):
         return self.option_set.all()
@@ -83,19 +153,171 @@ class Option(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     option_text = models.CharField(max_length=255)
     is_correct = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['question', 'is_correct'], name='option_question_correct_idx'),
+        ]
+        constraints = [
+            # A question can have at most one correct answer
+            models.UniqueConstraint(
+                fields=['question'], condition=models.Q(is_correct=True), name='unique_correct_option'
+            ),
+        ]
 
     def __str__(self):
         return f"Options of Question# {self.question.pk}, Assessment# {self.question.assessment.pk}, Content: {self.question.assessment.content.title}, Course: {self.question.assessment.content.course.title}"
 
 
+class Attempt(models.Model):
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE)
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attempts')
+    # Answer sheet as {question_id: option_id}
+    answers = models.JSONField(default=dict)
+    score = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    submitted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['assessment', 'student'], name='attempt_assessment_student_idx'),
+        ]
+
+    def __str__(self):
+        return f"Attempt# {self.pk} of Assessment# {self.assessment_id} by {self.student.username}: {self.score}/{self.total}"
+
+
 class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_messages')
     course = models.ForeignKey('Course', on_delete=models.CASCADE)
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['course', 'sender', 'timestamp'], name='message_course_sender_idx'),
+            models.Index(fields=['course', 'receiver', 'timestamp'], name='message_course_receiver_idx'),
+            models.Index(fields=['course', 'sender', 'receiver', 'timestamp'], name='message_thread_idx'),
+        ]
+
     def __str__(self):
         return f"Message from {self.sender.username}, Course: {self.course.title} (by {self.course.instructor.user.username}), "
 
 
 
+
+
+class Conversation(models.Model):
+    """
+    One user's view of their message thread with a peer in a course.
+
+    Rows are maintained as messages are sent, so the inbox never aggregates messages on read.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='conversations')
+    peer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    last_message = models.ForeignKey(Message, null=True, on_delete=models.SET_NULL, related_name='+')
+    unread_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'course', 'peer'], name='unique_conversation'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'course', 'updated_at'], name='conversation_inbox_idx'),
+        ]
+
+    def __str__(self):
+        return f"Conversation of {self.user.username} with {self.peer.username}, Course: {self.course.title}"
+
+
+class LessonProgress(models.Model):
+    """
+    A student's views and completion of one lesson, written in batches by core.progress.
+    """
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lesson_progress')
+    content = models.ForeignKey(Content, on_delete=models.CASCADE)
+    # Copied from the lesson so a course's progress is read without a join
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    view_count = models.PositiveIntegerField(default=0)
+    first_viewed_at = models.DateTimeField(null=True)
+    last_viewed_at = models.DateTimeField(null=True)
+    completed_at = models.DateTimeField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'content'], name='unique_lesson_progress'),
+        ]
+        indexes = [
+            models.Index(fields=['student', 'course'], name='lesson_progress_student_idx'),
+        ]
+
+    def __str__(self):
+        return f"Progress of {self.student.username} in {self.content.title}"
+
+
+class CourseProgress(models.Model):
+    """
+    Number of lessons a student completed in a course, kept up to date as progress is flushed.
+    """
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='course_progress')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    completed_lessons = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_course_progress'),
+        ]
+
+    @property
+    def percent(self):
+        # Capped, a flush racing a lesson's deletion can leave the count one ahead until rebuilt
+        lesson_count = self.course.lesson_count
+        return min(100, round(100 * self.completed_lessons / lesson_count)) if lesson_count else 0
+
+    def __str__(self):
+        return f"Progress of {self.student.username} in {self.course.title}: {self.completed_lessons} lesson(s)"
+
+
+class EnrollmentRollup(models.Model):
+    """
+    Enrollments created in a course on one day, maintained by core.analytics.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    day = models.DateField()
+    enrollments = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'day'], name='unique_enrollment_rollup'),
+        ]
+
+
+class ScoreRollup(models.Model):
+    """
+    Attempts submitted on an assessment on one day, per tenth of the maximum score.
+    """
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE)
+    day = models.DateField()
+    # 0 for scores under 10%, ..., 9 for 90% and above
+    bucket = models.PositiveSmallIntegerField()
+    attempts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['assessment', 'day', 'bucket'], name='unique_score_rollup'),
+        ]
+
+
+class RollupWatermark(models.Model):
+    # Highest primary key of the source table already counted in a rollup
+    name = models.CharField(max_length=64, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} rolled up through #{self.last_id}"
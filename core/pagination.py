@@ -0,0 +1,15 @@
+from rest_framework import pagination
+
+
+class CursorPagination(pagination.CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = 'pk'
+
+    def get_ordering(self, request, queryset, view):
+        # Each viewset declares the indexed keys its keyset is built on
+        ordering = getattr(view, 'ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
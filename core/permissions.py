@@ -2,15 +2,55 @@ from django.shortcuts import get_object_or_404
 from rest_framework import permissions
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 from .models import *
+from .cache import (
+    aget_enrollment_membership, aset_enrollment_membership, get_enrollment_membership, set_enrollment_membership,
+)
 
 
-def is_enrolled_student(user, course):
-    enrolled_students = course.get_enrolled_students()
-    return user.pk in enrolled_students.values_list('student__pk', flat=True)
+def is_enrolled_student(user, course, request=None):
+    if not user.is_authenticated:
+        return False
+
+    # Answers are memoized on the request first, then shared between requests through the cache
+    memo = {}
+    if request is not None:
+        if not hasattr(request, '_enrollment_memo'):
+            request._enrollment_memo = {}
+        memo = request._enrollment_memo
+    if course.pk in memo:
+        return memo[course.pk]
+
+    is_enrolled = get_enrollment_membership(user.pk, course.pk)
+    if is_enrolled is None:
+        is_enrolled = Enrollment.objects.filter(course=course, student=user).exists()
+        set_enrollment_membership(user.pk, course.pk, is_enrolled)
+
+    memo[course.pk] = is_enrolled
+    return is_enrolled
+
+
+async def ais_enrolled_student(user, course):
+    # Async twin of is_enrolled_student for views running on the event loop
+    if not user.is_authenticated:
+        return False
+
+    is_enrolled = await aget_enrollment_membership(user.pk, course.pk)
+    if is_enrolled is None:
+        is_enrolled = await Enrollment.objects.filter(course=course, student=user).aexists()
+        await aset_enrollment_membership(user.pk, course.pk, is_enrolled)
+    return is_enrolled
 
 def get_course(view):
+    # Resolve the course from the URL once per request; permissions and views share the result
     course_slug = view.kwargs.get('course_slug')
-    return get_object_or_404(Course, slug=course_slug)
+    request = view.request
+    if not hasattr(request, '_resolved_courses'):
+        request._resolved_courses = {}
+
+    if course_slug not in request._resolved_courses:
+        queryset = Course.objects.select_related('instructor__user').defer('search_vector')
+        request._resolved_courses[course_slug] = get_object_or_404(queryset, slug=course_slug)
+    return request._resolved_courses[course_slug]
 
 
 class IsOwnerOrReadOnly(BasePermission):
@@ -45,12 +85,18 @@ class CoursesPermission(BasePermission):
         return True  # Allow any user to retrieve a course
 
 
+class AnalyticsPermission(BasePermission):
+    def has_object_permission(self, request, view, obj):
+        # A course's analytics are for its instructor and site admins
+        return request.user.is_staff or request.user == obj.instructor.user
+
+
 class ContentPermission(BasePermission):
     def has_permission(self, request, view):
         course = get_course(view)
 
         if request.method in SAFE_METHODS:
-            return request.user == course.instructor.user or is_enrolled_student(request.user, course)
+            return request.user == course.instructor.user or is_enrolled_student(request.user, course, request)
 
         return request.user == course.instructor.user
 
@@ -58,16 +104,28 @@ class ContentPermission(BasePermission):
         course = get_course(view)
 
         if request.method in SAFE_METHODS: 
-            return request.user == course.instructor.user or is_enrolled_student(request.user, course)
+            return request.user == course.instructor.user or is_enrolled_student(request.user, course, request)
 
         return request.user == course.instructor.user
 
 
+class AttemptPermission(BasePermission):
+    def has_permission(self, request, view):
+        # Only enrolled students submit answer sheets
+        return is_enrolled_student(request.user, get_course(view), request)
+
+
+class ProgressPermission(BasePermission):
+    def has_permission(self, request, view):
+        # Progress is only tracked for enrolled students
+        return is_enrolled_student(request.user, get_course(view), request)
+
+
 class MessagesPermission(BasePermission):
     def has_permission(self, request, view):
         course = get_course(view)
 
-        if request.user == course.instructor.user or is_enrolled_student(request.user, course):
+        if request.user == course.instructor.user or is_enrolled_student(request.user, course, request):
             return True
 
         return False
@@ -83,3 +141,17 @@ class MessagesPermission(BasePermission):
         return False
 
 
+class RosterPermission(BasePermission):
+    def has_permission(self, request, view):
+        # Only the course instructor and site admins manage the roster
+        if request.user.is_staff:
+            return True
+        return request.user == get_course(view).instructor.user
+
+
+class ConversationPermission(MessagesPermission):
+    def has_object_permission(self, request, view, obj):
+        # Conversations are private to the user they summarize
+        return obj.user == request.user
+
+
@@ -0,0 +1,235 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+
+from .cache import bump_user_versions
+from .models import Content, CourseProgress, Enrollment, LessonProgress
+
+
+logger = logging.getLogger(__name__)
+
+VIEW, COMPLETE = 'view', 'complete'
+
+BATCH_SIZE = 1000
+
+
+class PendingProgress:
+    """
+    Events of one student on one lesson received since the last flush, merged.
+    """
+    __slots__ = ['course_id', 'views', 'first_viewed_at', 'last_viewed_at', 'completed_at']
+
+    def __init__(self, course_id):
+        self.course_id = course_id
+        self.views = 0
+        self.first_viewed_at = self.last_viewed_at = self.completed_at = None
+
+    def add(self, kind, at):
+        if kind == COMPLETE:
+            self.completed_at = earliest(self.completed_at, at)
+        else:
+            self.views += 1
+            self.first_viewed_at = earliest(self.first_viewed_at, at)
+            self.last_viewed_at = latest(self.last_viewed_at, at)
+
+    @property
+    def last_activity_at(self):
+        return latest(self.last_viewed_at, self.completed_at)
+
+
+def earliest(*values):
+    return min((value for value in values if value is not None), default=None)
+
+
+def latest(*values):
+    return max((value for value in values if value is not None), default=None)
+
+
+class ProgressBuffer:
+    """
+    Collect progress events in memory and write them in batches.
+
+    Events for the same student and lesson are merged as they arrive, so a flush
+    writes one row per lesson touched, whatever the number of events. Events
+    still buffered when the process dies are lost.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def add(self, student_id, course_id, events):
+        """
+        Buffer ``(lesson id, kind, timestamp)`` events of a student in a course.
+        """
+        with self.lock:
+            for content_id, kind, at in events:
+                key = (student_id, content_id)
+                if key not in self.pending:
+                    self.pending[key] = PendingProgress(course_id)
+                self.pending[key].add(kind, at)
+            full = len(self.pending) >= self.max_size
+        # Past its size the buffer is written by the request that filled it
+        if full:
+            self.flush()
+
+    def drain(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        return pending
+
+    def flush(self):
+        """
+        Write everything buffered so far and return the number of lessons updated.
+        """
+        return write_progress(self.drain())
+
+
+def write_progress(pending):
+    if not pending:
+        return 0
+
+    with transaction.atomic():
+        # Drop events of lessons deleted or students unenrolled since they were buffered. The
+        # rows stay locked until commit: the lessons cannot be deleted under the insert below,
+        # and concurrent flushes for the same students wait, even for rows not written yet
+        lessons = set(Content.objects.select_for_update().filter(
+            pk__in={content_id for _, content_id in pending},
+        ).order_by('pk').values_list('pk', flat=True))
+        enrolled = set(Enrollment.objects.select_for_update().filter(
+            student_id__in={student_id for student_id, _ in pending},
+            course_id__in={entry.course_id for entry in pending.values()},
+        ).order_by('pk').values_list('student_id', 'course_id'))
+        pending = {
+            (student_id, content_id): entry for (student_id, content_id), entry in pending.items()
+            if content_id in lessons and (student_id, entry.course_id) in enrolled
+        }
+
+        stored = LessonProgress.objects.select_for_update().filter(
+            student_id__in={student_id for student_id, _ in pending},
+            content_id__in={content_id for _, content_id in pending},
+        )
+        stored = {(row.student_id, row.content_id): row for row in stored}
+
+        rows = []
+        activity = {}
+        for (student_id, content_id), entry in pending.items():
+            row = stored.get((student_id, content_id))
+            completed_at = row.completed_at if row else None
+            rows.append(LessonProgress(
+                student_id=student_id, content_id=content_id, course_id=entry.course_id,
+                view_count=(row.view_count if row else 0) + entry.views,
+                first_viewed_at=earliest(row and row.first_viewed_at, entry.first_viewed_at),
+                last_viewed_at=latest(row and row.last_viewed_at, entry.last_viewed_at),
+                completed_at=earliest(completed_at, entry.completed_at),
+            ))
+            key = (student_id, entry.course_id)
+            activity[key] = latest(activity.get(key), entry.last_activity_at)
+
+        LessonProgress.objects.bulk_create(
+            rows,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['student', 'content'],
+            update_fields=['view_count', 'first_viewed_at', 'last_viewed_at', 'completed_at'],
+        )
+        update_summaries(activity)
+    # Dashboards show the completion of each course
+    bump_user_versions(student_id for student_id, _ in activity)
+    return len(rows)
+
+
+def update_summaries(activity):
+    # Completions are recounted from the lesson rows just written, in the same transaction,
+    # so a completion is counted once whichever flush wrote it
+    students = {student_id for student_id, _ in activity}
+    courses = {course_id for _, course_id in activity}
+    completed = LessonProgress.objects.filter(
+        student_id__in=students, course_id__in=courses, completed_at__isnull=False,
+    ).values_list('student_id', 'course_id').annotate(count=Count('pk')).order_by()
+    completions = defaultdict(int, {(student_id, course_id): count for student_id, course_id, count in completed})
+
+    summaries = CourseProgress.objects.select_for_update().filter(student_id__in=students, course_id__in=courses)
+    summaries = {(row.student_id, row.course_id): row for row in summaries}
+
+    rows = []
+    for (student_id, course_id), last_activity_at in activity.items():
+        summary = summaries.get((student_id, course_id))
+        rows.append(CourseProgress(
+            student_id=student_id, course_id=course_id,
+            completed_lessons=completions[student_id, course_id],
+            last_activity_at=latest(summary and summary.last_activity_at, last_activity_at),
+        ))
+    CourseProgress.objects.bulk_create(
+        rows,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['student', 'course'],
+        update_fields=['completed_lessons', 'last_activity_at'],
+    )
+
+
+def flush_periodically(buffer, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            buffer.flush()
+        except Exception:
+            logger.exception("Writing buffered learner progress failed")
+        finally:
+            close_old_connections()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """
+    Return the process's progress buffer, starting its flush thread on first use.
+    """
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = ProgressBuffer(settings.PROGRESS_BUFFER_SIZE)
+            if settings.PROGRESS_FLUSH_INTERVAL:
+                threading.Thread(
+                    target=flush_periodically, args=(_buffer, settings.PROGRESS_FLUSH_INTERVAL),
+                    name='progress-flush', daemon=True,
+                ).start()
+            atexit.register(_buffer.flush)
+        return _buffer
+
+
+def rebuild_summaries(chunk_size=1000):
+    """
+    Recount every course summary from the lesson rows, and return how many were written.
+    """
+    summaries = defaultdict(lambda: [0, None])
+    rows = LessonProgress.objects.values_list('student_id', 'course_id', 'completed_at', 'last_viewed_at')
+    for student_id, course_id, completed_at, last_viewed_at in rows.iterator(chunk_size=chunk_size):
+        summary = summaries[student_id, course_id]
+        summary[0] += completed_at is not None
+        summary[1] = latest(summary[1], completed_at, last_viewed_at)
+
+    with transaction.atomic():
+        # Summaries without any lesson row left go back to zero
+        CourseProgress.objects.update(completed_lessons=0)
+        CourseProgress.objects.bulk_create(
+            [
+                CourseProgress(student_id=student_id, course_id=course_id, completed_lessons=completed, last_activity_at=at)
+                for (student_id, course_id), (completed, at) in summaries.items()
+            ],
+            batch_size=chunk_size,
+            update_conflicts=True,
+            unique_fields=['student', 'course'],
+            update_fields=['completed_lessons', 'last_activity_at'],
+        )
+    return len(summaries)
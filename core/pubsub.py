@@ -0,0 +1,75 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """
+    A subscriber's queue, bound to the event loop that created it.
+    """
+
+    def __init__(self, channel, maxsize):
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, event):
+        # Slow consumers lose events rather than holding memory
+        if not self.queue.full():
+            self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """
+    Publish/subscribe between the threads and event loop of a single process.
+
+    Another broker (Redis, Postgres LISTEN/NOTIFY...) can replace it through the
+    MESSAGE_BROKER setting as long as it offers subscribe, unsubscribe and publish.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(channel, self.queue_size)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, event):
+        # Safe to call from sync views running in worker threads
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+        return len(subscribers)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.MESSAGE_BROKER)()
+    return _broker
+
+
+def message_channel(course_id, user_id):
+    return f'messages:{course_id}:{user_id}'
@@ -0,0 +1,17 @@
+import hashlib
+from functools import lru_cache
+
+import markdown
+
+
+# Upper bound on the number of rendered descriptions kept in process memory
+RENDER_CACHE_SIZE = 1024
+
+
+def description_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_markdown(text):
+    return markdown.markdown(text)
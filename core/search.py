@@ -0,0 +1,190 @@
+import re
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, OuterRef, Q, Subquery
+
+from .models import Content, Course
+
+
+SEARCH_CONFIG = 'english'
+
+# Postgres' default ts_rank weights, used by the in-memory index as well
+WEIGHTS = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+
+
+def uses_search_vector():
+    return connection.vendor == 'postgresql'
+
+
+def search_vector():
+    """
+    Expression computing a course's search vector in the database, for use in update().
+    """
+    # Needs the Postgres driver, which SQLite runs don't have installed
+    from django.contrib.postgres.aggregates import StringAgg
+
+    lessons = Content.objects.filter(course=OuterRef('pk')).order_by().values('course')
+
+    def lesson_text(field):
+        return Subquery(lessons.annotate(text=StringAgg(field, ' ', ordering='id')).values('text'))
+
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(lesson_text('title'), weight='C', config=SEARCH_CONFIG)
+        + SearchVector(lesson_text('description'), weight='D', config=SEARCH_CONFIG)
+    )
+
+
+def course_fields(course_id):
+    """
+    Return the weighted text of a course: its title and description, then its lessons'.
+    """
+    course = Course.objects.values('title', 'description').get(pk=course_id)
+    lessons = list(Content.objects.filter(course_id=course_id).order_by('id').values_list('title', 'description'))
+    return {
+        'A': course['title'],
+        'B': course['description'],
+        'C': ' '.join(title for title, _ in lessons),
+        'D': ' '.join(description for _, description in lessons),
+    }
+
+
+def update_course(course_id):
+    """
+    Bring the search document of a course up to date after it or one of its lessons changed.
+    """
+    if uses_search_vector():
+        Course.objects.filter(pk=course_id).update(search_vector=search_vector())
+    elif _index is not None:
+        _index.add(course_id, course_fields(course_id))
+
+
+def remove_course(course_id):
+    if not uses_search_vector() and _index is not None:
+        _index.remove(course_id)
+
+
+def tokenize(text):
+    return re.findall(r'\w+', text.lower())
+
+
+class InvertedIndex:
+    """
+    In-memory stand-in for the Postgres search vector, used when running on SQLite.
+
+    Every term of the query must match; a course's rank is the sum of the weights
+    of the fields each term appears in.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.terms = {}
+
+    def add(self, course_id, fields):
+        self.remove(course_id)
+        scores = defaultdict(float)
+        for weight, text in fields.items():
+            for term in set(tokenize(text)):
+                scores[term] += WEIGHTS[weight]
+        for term, score in scores.items():
+            self.postings[term][course_id] = score
+        self.terms[course_id] = set(scores)
+
+    def remove(self, course_id):
+        for term in self.terms.pop(course_id, ()):
+            postings = self.postings[term]
+            postings.pop(course_id, None)
+            if not postings:
+                del self.postings[term]
+
+    def search(self, text):
+        """
+        Return ``(rank, course id)`` pairs for every matching course, best first.
+        """
+        terms = set(tokenize(text))
+        if not terms:
+            return []
+        # Intersect starting from the rarest term
+        postings = sorted((self.postings.get(term, {}) for term in terms), key=len)
+        ranks = dict(postings[0])
+        for other in postings[1:]:
+            ranks = {course_id: rank + other[course_id] for course_id, rank in ranks.items() if course_id in other}
+        return sorted(((rank, course_id) for course_id, rank in ranks.items()), reverse=True)
+
+
+_index = None
+
+
+def get_index():
+    global _index
+    if _index is None:
+        _index = build_index()
+    return _index
+
+
+def build_index():
+    index = InvertedIndex()
+    fields = defaultdict(lambda: {'A': '', 'B': '', 'C': [], 'D': []})
+    for pk, title, description in Course.objects.values_list('pk', 'title', 'description').iterator():
+        fields[pk].update(A=title, B=description)
+    lessons = Content.objects.order_by('id').values_list('course_id', 'title', 'description')
+    for course_id, title, description in lessons.iterator():
+        fields[course_id]['C'].append(title)
+        fields[course_id]['D'].append(description)
+    for pk, course in fields.items():
+        index.add(pk, {**course, 'C': ' '.join(course['C']), 'D': ' '.join(course['D'])})
+    return index
+
+
+def reset_index():
+    """
+    Drop the in-memory index; it is rebuilt from the database on the next search.
+    """
+    global _index
+    _index = None
+
+
+def encode_cursor(rank, pk):
+    return urlsafe_b64encode(f'{rank!r}|{pk}'.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        rank, pk = urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return float(rank), int(pk)
+    except (TypeError, ValueError, UnicodeError):
+        return None
+
+
+def search_courses(text, page_size, cursor=None):
+    """
+    Return one page of courses matching ``text``, best match first, and whether more remain.
+
+    Each course carries its ``rank``; pages are keyed on (rank, id).
+    """
+    if uses_search_vector():
+        query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+        courses = Course.objects.select_related('instructor__user').defer('search_vector')
+        courses = courses.annotate(rank=SearchRank(F('search_vector'), query))
+        courses = courses.filter(search_vector=query)
+        if cursor is not None:
+            rank, pk = cursor
+            courses = courses.filter(Q(rank__lt=rank) | Q(rank=rank, pk__lt=pk))
+        courses = list(courses.order_by('-rank', '-pk')[:page_size + 1])
+        return courses[:page_size], len(courses) > page_size
+
+    matches = get_index().search(text)
+    if cursor is not None:
+        matches = [match for match in matches if match < cursor]
+    page = matches[:page_size]
+    courses = Course.objects.select_related('instructor__user').defer('search_vector').in_bulk([pk for _, pk in page])
+    results = []
+    for rank, pk in page:
+        if pk in courses:
+            courses[pk].rank = rank
+            results.append(courses[pk])
+    return results, len(matches) > page_size
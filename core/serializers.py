@@ -1,27 +1,67 @@
+from django.utils.text import slugify
 from rest_framework import serializers
 from .models import *
+from .instrumentation import TimedSerializerMixin
 
 
-class InstructorSerializer(serializers.ModelSerializer):
+class TimedModelSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    # Base of the API's output serializers, timed on requests sampled by InstrumentationMiddleware
+    pass
+
+
+class InstructorSerializer(TimedModelSerializer):
     user = serializers.ReadOnlyField(source='user.username')
 
     class Meta:
         model = Instructor
         fields = ['user', 'bio']
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(TimedModelSerializer):
     class Meta:
         model = Enrollment
         fields = ['id', 'enrollment_date']
         read_only_fields = ['id', 'enrollment_date']
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(TimedModelSerializer):
+    instructor = serializers.ReadOnlyField(source='instructor.user.username')
 
     class Meta:
         model = Course
-        fields = ['id', 'title', 'description', 'start_date', 'end_date']
+        fields = [
+            'id', 'title', 'description', 'instructor', 'start_date', 'end_date',
+            'enrollment_count', 'lesson_count', 'assessment_count',
+        ]
+
+    def validate_title(self, title):
+        # The slug is made from the title when the course is saved
+        if slugify(title) in Course.RESERVED_SLUGS:
+            raise serializers.ValidationError("This title is reserved, please choose another one.")
+        return title
+
+class CourseFilterSerializer(serializers.Serializer):
+    # Query parameters of the course list; each one is backed by an index on Course
+    ORDERINGS = {
+        'id': ('id',),
+        '-id': ('-id',),
+        'start_date': ('start_date', 'id'),
+        '-start_date': ('-start_date', '-id'),
+        'end_date': ('end_date', 'id'),
+        '-end_date': ('-end_date', '-id'),
+    }
+
+    instructor = serializers.CharField(required=False)
+    start_date = serializers.DateField(required=False, help_text="Courses starting on or after this day.")
+    end_date = serializers.DateField(required=False, help_text="Courses ending on or before this day.")
+    active = serializers.BooleanField(required=False, help_text="Courses running today, or not.")
+    ordering = serializers.ChoiceField(choices=list(ORDERINGS), default='id')
+
+class CourseSearchSerializer(CourseSerializer):
+    rank = serializers.FloatField(read_only=True)
 
-class ContentSerializer(serializers.ModelSerializer):
+    class Meta(CourseSerializer.Meta):
+        fields = CourseSerializer.Meta.fields + ['slug', 'rank']
+
+class ContentSerializer(TimedModelSerializer):
     formatted_description = serializers.SerializerMethodField()
 
     class Meta:
@@ -29,29 +69,133 @@ class ContentSerializer(serializers.ModelSerializer):
         fields = [ 'title', 'description', 'formatted_description']
     
     def get_formatted_description(self, obj):
-        return markdown.markdown(obj.description)
+        return obj.formatted_description()
 
-class AssessmentSerializer(serializers.ModelSerializer):
-    questions = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+class AssessmentSerializer(TimedModelSerializer):
+    questions = serializers.PrimaryKeyRelatedField(source='question_set', many=True, read_only=True)
     
     class Meta:
         model = Assessment
         fields = [ 'title', 'description', 'questions']
 
-class QuestionSerializer(serializers.ModelSerializer):
-    options = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+class QuestionSerializer(TimedModelSerializer):
+    options = serializers.PrimaryKeyRelatedField(source='option_set', many=True, read_only=True)
     
     class Meta:
         model = Question
         fields = [ 'question_text', 'options']
 
-class OptionSerializer(serializers.ModelSerializer):
+class OptionSerializer(TimedModelSerializer):
     class Meta:
         model = Option
         fields = ['option_text', 'is_correct']
 
-class MessageSerializer(serializers.ModelSerializer):
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Students are graded on the server and never see the answer key
+        if self.context.get('hide_answers'):
+            data.pop('is_correct', None)
+        return data
+
+class NestedOptionSerializer(OptionSerializer):
+    class Meta(OptionSerializer.Meta):
+        fields = ['id', 'option_text', 'is_correct']
+
+class NestedQuestionSerializer(TimedModelSerializer):
+    options = NestedOptionSerializer(source='option_set', many=True, read_only=True)
+
+    class Meta:
+        model = Question
+        fields = ['id', 'question_text', 'options']
+
+class AssessmentExportSerializer(TimedModelSerializer):
+    questions = NestedQuestionSerializer(source='question_set', many=True, read_only=True)
+
+    class Meta:
+        model = Assessment
+        fields = ['id', 'title', 'description', 'updated_at', 'questions']
+
+class BulkQuestionSerializer(TimedModelSerializer):
+    options = OptionSerializer(many=True)
+
+    class Meta:
+        model = Question
+        fields = ['question_text', 'options']
+
+    def validate_options(self, options):
+        # Same rules OptionViewSet enforces one option at a time
+        if len(options) > 4:
+            raise serializers.ValidationError("Cannot create more than 4 options for a question.")
+
+        option_texts = [option['option_text'] for option in options]
+        if len(set(option_texts)) != len(option_texts):
+            raise serializers.ValidationError("Option texts must be unique within a question.")
+
+        if sum(1 for option in options if option.get('is_correct')) != 1:
+            raise serializers.ValidationError("A question must have exactly one correct answer.")
+        return options
+
+class AttemptSerializer(TimedModelSerializer):
+    answers = serializers.DictField(child=serializers.IntegerField())
+
+    class Meta:
+        model = Attempt
+        fields = ['id', 'answers', 'score', 'total', 'submitted_at']
+        read_only_fields = ['id', 'score', 'total', 'submitted_at']
+
+class ProgressEventSerializer(serializers.Serializer):
+    lesson = serializers.SlugField()
+    type = serializers.ChoiceField(choices=['view', 'complete'])
+    at = serializers.DateTimeField(required=False)
+
+class ProgressEventBatchSerializer(serializers.Serializer):
+    MAX_EVENTS = 500
+
+    events = ProgressEventSerializer(many=True, allow_empty=False)
+
+    def validate_events(self, events):
+        if len(events) > self.MAX_EVENTS:
+            raise serializers.ValidationError(f"At most {self.MAX_EVENTS} events per batch.")
+        return events
+
+class CourseProgressSerializer(TimedModelSerializer):
+    lesson_count = serializers.ReadOnlyField(source='course.lesson_count')
+
+    class Meta:
+        model = CourseProgress
+        fields = ['completed_lessons', 'lesson_count', 'percent', 'last_activity_at']
+
+class MessageSerializer(TimedModelSerializer):
 
     class Meta:
         model = Message
         fields = [ 'content', 'timestamp']
+
+class ThreadMessageSerializer(TimedModelSerializer):
+    sender = serializers.ReadOnlyField(source='sender.username')
+
+    class Meta:
+        model = Message
+        fields = ['id', 'sender', 'content', 'timestamp']
+
+class DashboardCourseSerializer(TimedModelSerializer):
+    instructor = serializers.ReadOnlyField(source='instructor.user.username')
+    enrolled_at = serializers.DateTimeField(read_only=True)
+    completed_lessons = serializers.ReadOnlyField(source='progress.completed_lessons')
+    percent = serializers.ReadOnlyField(source='progress.percent')
+    latest_message = ThreadMessageSerializer(read_only=True)
+
+    class Meta:
+        model = Course
+        fields = [
+            'slug', 'title', 'instructor', 'start_date', 'end_date', 'lesson_count', 'assessment_count',
+            'enrolled_at', 'completed_lessons', 'percent', 'latest_message',
+        ]
+
+class ConversationSerializer(TimedModelSerializer):
+    peer = serializers.ReadOnlyField(source='peer.username')
+    last_message = ThreadMessageSerializer(read_only=True)
+
+    class Meta:
+        model = Conversation
+        fields = ['peer', 'unread_count', 'updated_at', 'last_message']
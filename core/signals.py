@@ -0,0 +1,182 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .analytics import forget_scores
+from .cache import bump_course_version, bump_user_versions, invalidate_enrollment
+from .counters import adjust, deleted_with, deleted_with_course, expire_course
+from .events import publish_message
+from .freshness import touch_course_content
+from .inbox import forget_message, record_message
+from .models import (
+    Assessment, Attempt, Content, Course, CourseProgress, Enrollment, LessonProgress, Message, Option, Question,
+)
+from .search import remove_course, update_course
+
+
+@receiver([post_save, post_delete], sender=Question)
+def touch_assessment_for_question(sender, instance, origin=None, **kwargs):
+    if deleted_with(origin, Course, Content, Assessment):
+        return
+    Assessment.objects.filter(pk=instance.assessment_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=Option)
+def touch_assessment_for_option(sender, instance, origin=None, **kwargs):
+    if deleted_with(origin, Course, Content, Assessment, Question):
+        return
+    Question.objects.filter(pk=instance.question_id).update(updated_at=timezone.now())
+    Assessment.objects.filter(question__id=instance.question_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=Content)
+def touch_course_for_lesson(sender, instance, origin=None, **kwargs):
+    if deleted_with_course(origin):
+        return
+    touch_course_content(pk=instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=Assessment)
+def touch_course_for_assessment(sender, instance, origin=None, **kwargs):
+    # A cascade touches the course once, from the receiver of the row it started from
+    if deleted_with(origin, Course, Content):
+        return
+    touch_course_content(content__id=instance.content_id)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def touch_course_for_question(sender, instance, origin=None, **kwargs):
+    if deleted_with(origin, Course, Content, Assessment):
+        return
+    touch_course_content(content__assessment__id=instance.assessment_id)
+
+
+@receiver([post_save, post_delete], sender=Option)
+def touch_course_for_option(sender, instance, origin=None, **kwargs):
+    if deleted_with(origin, Course, Content, Assessment, Question):
+        return
+    touch_course_content(content__assessment__question__id=instance.question_id)
+
+
+@receiver([post_save, post_delete], sender=Course)
+def expire_course_responses(sender, instance, **kwargs):
+    # After commit: a reader must not cache rows of the open transaction under the new version
+    transaction.on_commit(partial(bump_course_version, instance.slug))
+    previous_slug = getattr(instance, '_previous_slug', None)
+    if previous_slug and previous_slug != instance.slug:
+        transaction.on_commit(partial(bump_course_version, previous_slug))
+
+
+@receiver([post_save, post_delete], sender=Content)
+def expire_lesson_responses(sender, instance, origin=None, **kwargs):
+    # Deleting a course already expires everything cached under its slug
+    if deleted_with_course(origin):
+        return
+    expire_course(pk=instance.course_id)
+
+
+def counter_delta(signal, created=False, origin=None, **kwargs):
+    # A new row adds one, a deleted row removes one unless its course is being deleted too
+    if signal is post_save:
+        return 1 if created else 0
+    return 0 if deleted_with_course(origin) else -1
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def count_enrollments(sender, instance, **kwargs):
+    delta = counter_delta(**kwargs)
+    if delta:
+        adjust('enrollment_count', delta, pk=instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=Content)
+def count_lessons(sender, instance, **kwargs):
+    delta = counter_delta(**kwargs)
+    if delta:
+        adjust('lesson_count', delta, pk=instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=Assessment)
+def count_assessments(sender, instance, **kwargs):
+    delta = counter_delta(**kwargs)
+    if delta:
+        # The lesson is still there when its own delete cascades to the assessment
+        adjust('assessment_count', delta, content__id=instance.content_id)
+
+
+@receiver(pre_delete, sender=Content)
+def forget_completions(sender, instance, origin=None, **kwargs):
+    # Runs before the cascade removes the lesson's progress rows
+    if deleted_with_course(origin):
+        return
+    completed = LessonProgress.objects.filter(content=instance, completed_at__isnull=False).values('student')
+    CourseProgress.objects.filter(course_id=instance.course_id, student__in=completed).update(
+        completed_lessons=F('completed_lessons') - 1
+    )
+
+
+@receiver(post_delete, sender=Attempt)
+def uncount_attempt(sender, instance, origin=None, **kwargs):
+    # The score rollup of a deleted assessment goes with it
+    if deleted_with(origin, Course, Content, Assessment):
+        return
+    forget_scores([instance])
+
+
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, **kwargs):
+    update_course(instance.pk)
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course(sender, instance, **kwargs):
+    remove_course(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Content)
+def index_lessons(sender, instance, origin=None, **kwargs):
+    if deleted_with_course(origin):
+        return
+    update_course(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def expire_enrollment_membership(sender, instance, **kwargs):
+    # Every write path, admin and course deletes included, drops the cached access answer
+    transaction.on_commit(partial(invalidate_enrollment, instance.student_id, instance.course_id))
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def expire_student_dashboard(sender, instance, **kwargs):
+    transaction.on_commit(partial(bump_user_versions, [instance.student_id]))
+
+
+@receiver(post_save, sender=Message)
+def expire_dashboards_for_message(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(bump_user_versions, [instance.sender_id, instance.receiver_id]))
+
+
+@receiver(post_save, sender=Message)
+def update_conversations(sender, instance, created, **kwargs):
+    if created:
+        record_message(instance)
+
+
+@receiver(post_delete, sender=Message)
+def update_conversations_for_deleted_message(sender, instance, origin=None, **kwargs):
+    # Conversations are deleted along with their course
+    if deleted_with_course(origin):
+        return
+    forget_message(instance)
+    transaction.on_commit(partial(bump_user_versions, [instance.sender_id, instance.receiver_id]))
+
+
+@receiver(post_save, sender=Message)
+def push_message(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(partial(publish_message, instance))
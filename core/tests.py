@@ -1,3 +1,1633 @@
-from django.test import TestCase
+import time
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from knox.models import AuthToken
+from rest_framework.serializers import BaseSerializer
+from rest_framework.test import APITestCase
+
+from .models import *
+from .analytics import refresh
+from .cache import bump_course_version, course_version_key, get_course_version, response_cache_stats
+from .instrumentation import RequestTimings, route_stats
+from .permissions import is_enrolled_student
+from .progress import get_buffer
+from .pubsub import get_broker, message_channel
+from .roster import enroll_students
+from .search import reset_index
+from .serializers import ContentSerializer, CourseFilterSerializer
+from .views import CourseViewSet
+
+
+def create_course(username='instructor', title='Python Basics'):
+    user = User.objects.create_user(username=username, password='secret')
+    instructor = Instructor.objects.create(user=user, bio='')
+    return Course.objects.create(
+        title=title, description='', instructor=instructor,
+        start_date=date(2023, 1, 1), end_date=date(2023, 12, 31),
+    )
+
+
+class ContentDescriptionTests(TestCase):
+    def setUp(self):
+        self.course = create_course()
+
+    def test_save_stores_rendered_html(self):
+        content = Content.objects.create(course=self.course, title='Intro', description='**hello**')
+        content.refresh_from_db()
+
+        self.assertEqual(content.description_html, '<p><strong>hello</strong></p>')
+        self.assertEqual(content.description_hash, description_hash('**hello**'))
+        self.assertEqual(content.formatted_description(), '<p><strong>hello</strong></p>')
+
+    def test_save_rerenders_changed_description(self):
+        content = Content.objects.create(course=self.course, title='Intro', description='**hello**')
+        content.description = '*bye*'
+        content.save(update_fields=['description'])
+        content.refresh_from_db()
+
+        self.assertEqual(content.description_html, '<p><em>bye</em></p>')
+
+    def test_stale_store_falls_back_to_rendering(self):
+        content = Content.objects.create(course=self.course, title='Intro', description='**hello**')
+        Content.objects.filter(pk=content.pk).update(description='*bye*')
+        content.refresh_from_db()
+
+        self.assertEqual(content.formatted_description(), '<p><em>bye</em></p>')
+
+    def test_render_descriptions_command_backfills(self):
+        content = Content.objects.create(course=self.course, title='Intro', description='**hello**')
+        Content.objects.filter(pk=content.pk).update(description_html='', description_hash='')
+
+        call_command('render_descriptions', stdout=StringIO())
+        content.refresh_from_db()
+
+        self.assertEqual(content.description_html, '<p><strong>hello</strong></p>')
+
+
+class EnrollmentMembershipTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        Content.objects.create(course=self.course, title='Intro', description='hello')
+        self.student = User.objects.create_user(username='student', password='secret')
+        self.enrollment = Enrollment.objects.create(course=self.course, student=self.student)
+        self.url = f'/api/{self.course.slug}/lessons/intro/'
+
+    def count_queries(self):
+        cache.clear()
+        self.client.force_authenticate(self.student)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_query_count_is_independent_of_enrollment_size(self):
+        small = self.count_queries()
+
+        others = [User(username=f'learner{n}') for n in range(50)]
+        User.objects.bulk_create(others)
+        Enrollment.objects.bulk_create(
+            [Enrollment(course=self.course, student=user) for user in User.objects.filter(username__startswith='learner')]
+        )
+
+        self.assertEqual(self.count_queries(), small)
+
+    def test_membership_is_cached_between_requests(self):
+        first = self.count_queries()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+
+        self.assertEqual(len(context), first - 1)
+
+    def test_destroy_invalidates_membership(self):
+        admin = User.objects.create_superuser(username='admin', password='secret')
+        self.assertTrue(is_enrolled_student(self.student, self.course))
+
+        self.client.force_authenticate(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/{self.course.slug}/enrollments/{self.enrollment.pk}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(is_enrolled_student(self.student, self.course))
+
+    def test_any_write_path_invalidates_membership(self):
+        self.assertTrue(is_enrolled_student(self.student, self.course))
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.filter(pk=self.enrollment.pk).delete()
+        self.assertFalse(is_enrolled_student(self.student, self.course))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(course=self.course, student=self.student)
+        self.assertTrue(is_enrolled_student(self.student, self.course))
+
+
+class NestedRouteQueryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        self.instructor = self.course.instructor.user
+        self.student = User.objects.create_user(username='student', password='secret')
+        Enrollment.objects.create(course=self.course, student=self.student)
+
+        lesson = Content.objects.create(course=self.course, title='Intro', description='hello')
+        self.assessment = Assessment.objects.create(content=lesson, title='quiz', description='')
+        self.question = Question.objects.create(assessment=self.assessment, question_text='?')
+        Option.objects.create(question=self.question, option_text='yes')
+        Message.objects.create(course=self.course, sender=self.student, receiver=self.instructor, content='hi')
+
+    def assertRouteQueries(self, num, user, url, method='get', data=None):
+        self.client.force_authenticate(user)
+        with self.assertNumQueries(num):
+            response = getattr(self.client, method)(url, data)
+        return response
+
+    def test_lesson_routes(self):
+        slug = self.course.slug
+        self.assertRouteQueries(2, self.instructor, f'/api/{slug}/lessons/')
+        self.assertRouteQueries(2, self.instructor, f'/api/{slug}/lessons/intro/')
+        self.assertRouteQueries(3, self.student, f'/api/{slug}/lessons/intro/')
+
+    def test_assessment_routes(self):
+        slug = self.course.slug
+        self.assertRouteQueries(4, self.instructor, f'/api/{slug}/assessments/intro/')
+        self.assertRouteQueries(4, self.instructor, f'/api/{slug}/assessments/intro/quiz/')
+        self.assertRouteQueries(3, self.instructor, f'/api/{slug}/assessment-{self.assessment.pk}/questions/')
+        self.assertRouteQueries(
+            2, self.instructor, f'/api/{slug}/assessment-{self.assessment.pk}/question-{self.question.pk}/options/'
+        )
+
+    def test_message_routes(self):
+        slug = self.course.slug
+        self.assertRouteQueries(3, self.student, f'/api/{slug}/messages/')
+        # Course, receiver and insert, then both conversation rows updated in a savepoint
+        response = self.assertRouteQueries(
+            7, self.student, f'/api/{slug}/messages/', 'post', {'receiver': 'instructor', 'content': 'question'}
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_enrollment_routes(self):
+        learner = User.objects.create_user(username='learner', password='secret')
+        # Course lookup, then the insert and the counter update wrapped in a savepoint
+        self.assertRouteQueries(5, learner, f'/api/{self.course.slug}/enrollments/', 'post')
+
+
+class IndexUsageTests(TestCase):
+    def setUp(self):
+        self.course = create_course()
+        self.student = User.objects.create_user(username='student', password='secret')
+        lesson = Content.objects.create(course=self.course, title='Intro', description='hello')
+        assessment = Assessment.objects.create(content=lesson, title='quiz', description='')
+        self.question = Question.objects.create(assessment=assessment, question_text='?')
+
+    def explain(self, queryset):
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Tiny test tables would otherwise always be read sequentially
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = self.explain(queryset)
+        for index_name in index_names:
+            self.assertIn(index_name, plan)
+
+    def test_enrollment_membership_lookup(self):
+        queryset = Enrollment.objects.filter(course=self.course, student=self.student)
+        if connection.vendor == 'sqlite':
+            # SQLite backs inline unique constraints with an automatic index
+            self.assertUsesIndex(queryset, 'sqlite_autoindex_core_enrollment')
+        else:
+            self.assertUsesIndex(queryset, 'unique_course_enrollment')
+
+    def test_message_list(self):
+        queryset = (
+            Message.objects.filter(course=self.course, sender=self.student)
+            | Message.objects.filter(course=self.course, receiver=self.student)
+        ).order_by('timestamp')
+        plan = self.explain(queryset)
+        self.assertRegex(plan, 'message_course_sender_idx|message_thread_idx')
+        self.assertIn('message_course_receiver_idx', plan)
+
+    def test_correct_option_lookup(self):
+        plan = self.explain(Option.objects.filter(question=self.question, is_correct=True))
+        # Either the composite index or the partial unique index answers this lookup
+        self.assertRegex(plan, 'option_question_correct_idx|unique_correct_option')
+
+    def test_course_title_lookup(self):
+        queryset = Course.objects.filter(title='Python Basics', instructor=self.course.instructor)
+        self.assertUsesIndex(queryset, 'course_title_instructor_idx')
+
+    def test_course_list_lookups(self):
+        courses = Course.objects.filter(instructor=self.course.instructor)
+        if connection.vendor == 'sqlite':
+            # SQLite's indexes end with the rowid, so the foreign key index is already ordered by id
+            self.assertRegex(self.explain(courses.order_by('id')), 'core_course_instructor_id|course_instructor_idx')
+        else:
+            self.assertUsesIndex(courses.order_by('id'), 'course_instructor_idx')
+        self.assertUsesIndex(
+            courses.filter(start_date__gte=date(2023, 1, 1)).order_by('start_date', 'id'), 'course_instructor_start_idx',
+        )
+        self.assertUsesIndex(
+            courses.filter(end_date__lte=date(2023, 6, 1)).order_by('end_date', 'id'), 'course_instructor_end_idx',
+        )
+
+    def test_every_course_list_ordering_is_indexed(self):
+        # The list always filters by instructor, so each ordering needs an index leading with it;
+        # on SQLite the foreign key index already ends with the rowid, which serves the id order
+        indexes = {
+            'id': 'course_instructor_idx|core_course_instructor_id',
+            'start_date': 'course_instructor_start_idx',
+            'end_date': 'course_instructor_end_idx',
+        }
+        courses = Course.objects.filter(instructor=self.course.instructor)
+        for name, fields in CourseFilterSerializer.ORDERINGS.items():
+            with self.subTest(ordering=name):
+                plan = self.explain(courses.order_by(*fields))
+                self.assertRegex(plan, indexes[name.lstrip('-')])
+                # No sort step: rows come out of the index already in order
+                self.assertNotRegex(plan, 'TEMP B-TREE|Sort')
+
+
+class ConstraintTests(APITestCase):
+    def setUp(self):
+        self.course = create_course()
+        self.student = User.objects.create_user(username='student', password='secret')
+
+    def test_duplicate_enrollment_is_rejected(self):
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.post(f'/api/{self.course.slug}/enrollments/').status_code, 201)
+        response = self.client.post(f'/api/{self.course.slug}/enrollments/')
+
+        self.assertEqual(response.data, {'detail': 'You are already enrolled in this course.'})
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 1)
+
+    def test_only_one_correct_option(self):
+        lesson = Content.objects.create(course=self.course, title='Intro', description='hello')
+        assessment = Assessment.objects.create(content=lesson, title='quiz', description='')
+        question = Question.objects.create(assessment=assessment, question_text='?')
+        Option.objects.create(question=question, option_text='yes', is_correct=True)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Option.objects.create(question=question, option_text='no', is_correct=True)
+
+
+class CursorPaginationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        self.instructor = self.course.instructor.user
+        self.student = User.objects.create_user(username='student', password='secret')
+        Enrollment.objects.create(course=self.course, student=self.student)
+        for n in range(5):
+            Message.objects.create(course=self.course, sender=self.student, receiver=self.instructor, content=f'{n}')
+        self.client.force_authenticate(self.student)
+
+    def test_messages_are_paginated_newest_first(self):
+        response = self.client.get(f'/api/{self.course.slug}/messages/?page_size=2')
+        self.assertEqual([message['content'] for message in response.data['results']], ['4', '3'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([message['content'] for message in response.data['results']], ['2', '1'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([message['content'] for message in response.data['results']], ['0'])
+        self.assertIsNone(response.data['next'])
+
+    def test_page_size_is_capped(self):
+        for n in range(120):
+            Content.objects.create(course=self.course, title=f'Lesson {n}', description='')
+
+        response = self.client.get(f'/api/{self.course.slug}/lessons/?page_size=1000')
+        self.assertEqual(len(response.data['results']), 100)
+
+
+class AssessmentExportTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        lesson = Content.objects.create(course=self.course, title='Intro', description='hello')
+        self.assessment = Assessment.objects.create(content=lesson, title='quiz', description='')
+        self.url = f'/api/{self.course.slug}/assessments/intro/quiz/full/'
+        self.client.force_authenticate(self.course.instructor.user)
+
+    def add_questions(self, count):
+        for n in range(count):
+            question = Question.objects.create(assessment=self.assessment, question_text=f'Question {n}')
+            Option.objects.create(question=question, option_text='yes', is_correct=True)
+            Option.objects.create(question=question, option_text='no')
+
+    def test_export_includes_questions_and_options(self):
+        self.add_questions(2)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['questions']), 2)
+        self.assertEqual(
+            [option['option_text'] for option in response.data['questions'][0]['options']], ['yes', 'no']
+        )
+
+    def test_query_count_is_fixed(self):
+        self.add_questions(1)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url)
+
+        self.add_questions(10)
+        with self.assertNumQueries(len(small)):
+            self.client.get(self.url)
+
+    def test_unchanged_assessment_returns_not_modified(self):
+        self.add_questions(1)
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Option.objects.create(question=Question.objects.first(), option_text='maybe')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_students_do_not_share_the_instructor_etag(self):
+        student = User.objects.create_user(username='student', password='secret')
+        Enrollment.objects.create(course=self.course, student=student)
+        etag = self.client.get(self.url)['ETag']
+
+        self.client.force_authenticate(student)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class BulkQuestionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        lesson = Content.objects.create(course=self.course, title='Intro', description='hello')
+        self.assessment = Assessment.objects.create(content=lesson, title='quiz', description='')
+        self.url = f'/api/{self.course.slug}/assessment-{self.assessment.pk}/questions/bulk/'
+        self.client.force_authenticate(self.course.instructor.user)
+
+    def question(self, n, correct=1):
+        return {
+            'question_text': f'Question {n}',
+            'options': [{'option_text': f'Option {i}', 'is_correct': i < correct} for i in range(3)],
+        }
+
+    def test_creates_whole_tree_in_fixed_queries(self):
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(self.url, [self.question(0)], format='json')
+
+        with self.assertNumQueries(len(small)):
+            response = self.client.post(self.url, [self.question(n) for n in range(20)], format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Question.objects.filter(assessment=self.assessment).count(), 21)
+        self.assertEqual(Option.objects.filter(question__assessment=self.assessment, is_correct=True).count(), 21)
+
+    def test_reports_per_item_errors_and_saves_nothing(self):
+        tree = [self.question(0), self.question(1, correct=2), self.question(2, correct=0)]
+        tree[0]['options'].append(dict(tree[0]['options'][0], is_correct=False))
+
+        response = self.client.post(self.url, tree, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0]['options'], ["Option texts must be unique within a question."])
+        self.assertEqual(response.data[1]['options'], ["A question must have exactly one correct answer."])
+        self.assertEqual(response.data[2]['options'], ["A question must have exactly one correct answer."])
+        self.assertFalse(Question.objects.exists())
+
+    def test_students_cannot_author(self):
+        student = User.objects.create_user(username='student', password='secret')
+        Enrollment.objects.create(course=self.course, student=student)
+        self.client.force_authenticate(student)
+
+        response = self.client.post(self.url, [self.question(0)], format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class GradingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        lesson = Content.objects.create(course=self.course, title='Intro', description='hello')
+        self.assessment = Assessment.objects.create(content=lesson, title='quiz', description='')
+        self.student = User.objects.create_user(username='student', password='secret')
+        Enrollment.objects.create(course=self.course, student=self.student)
+
+        self.correct = {}
+        self.wrong = {}
+        for n in range(3):
+            question = Question.objects.create(assessment=self.assessment, question_text=f'Question {n}')
+            self.correct[str(question.pk)] = Option.objects.create(question=question, option_text='yes', is_correct=True).pk
+            self.wrong[str(question.pk)] = Option.objects.create(question=question, option_text='no').pk
+
+        self.url = f'/api/{self.course.slug}/assessments/intro/quiz/submit/'
+        self.client.force_authenticate(self.student)
+
+    def submit(self, answers):
+        return self.client.post(self.url, {'answers': answers}, format='json')
+
+    def test_scores_answer_sheet(self):
+        question_ids = list(self.correct)
+        answers = {question_ids[0]: self.correct[question_ids[0]], question_ids[1]: self.wrong[question_ids[1]]}
+
+        response = self.submit(answers)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['score'], response.data['total']), (1, 3))
+        self.assertEqual(Attempt.objects.get().score, 1)
+
+    def test_grading_runs_no_per_answer_queries(self):
+        self.submit({})
+        with self.assertNumQueries(4):
+            # Course, content, assessment and the attempt insert
+            self.submit(self.correct)
+
+    def test_unknown_questions_are_rejected(self):
+        response = self.submit({'999999': 1})
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_enrolled_students_can_submit(self):
+        self.client.force_authenticate(self.course.instructor.user)
+        self.assertEqual(self.submit(self.correct).status_code, 403)
+
+    def test_students_do_not_see_the_answer_key(self):
+        response = self.client.get(f'/api/{self.course.slug}/assessments/intro/quiz/full/')
+        self.assertNotIn('is_correct', response.data['questions'][0]['options'][0])
+
+    def test_regrade_uses_the_updated_answer_key(self):
+        self.submit(self.wrong)
+        self.assertEqual(Attempt.objects.get().score, 0)
+
+        Option.objects.filter(is_correct=True).update(is_correct=False)
+        for option_id in self.wrong.values():
+            Option.objects.filter(pk=option_id).update(is_correct=True)
+        Assessment.objects.filter(pk=self.assessment.pk).update(updated_at=timezone.now())
+
+        call_command('regrade_attempts', chunk_size=1, stdout=StringIO())
+        self.assertEqual(Attempt.objects.get().score, 3)
+
+    @override_settings(ROLLUP_SETTLE_SECONDS=0)
+    def test_regrade_moves_counted_attempts_in_the_rollup(self):
+        self.submit(self.wrong)
+        refresh('scores')
+        self.submit(self.wrong)
+
+        Option.objects.filter(is_correct=True).update(is_correct=False)
+        for option_id in self.wrong.values():
+            Option.objects.filter(pk=option_id).update(is_correct=True)
+        Assessment.objects.filter(pk=self.assessment.pk).update(updated_at=timezone.now())
+        call_command('regrade_attempts', stdout=StringIO())
+        # The second attempt is counted once refresh reaches it, with its new score
+        refresh('scores')
+
+        self.client.force_authenticate(self.course.instructor.user)
+        assessment = self.client.get(f'/api/courses/{self.course.slug}/analytics/').data['assessments'][0]
+        self.assertEqual(assessment['attempts'], 2)
+        self.assertEqual(assessment['distribution'], [0] * 9 + [2])
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        self.instructor = self.course.instructor.user
+        self.lesson = Content.objects.create(course=self.course, title='Intro', description='hello')
+
+    def test_course_retrieve_is_served_from_cache(self):
+        url = f'/api/courses/{self.course.slug}/'
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response_cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_course_update_is_never_served_stale(self):
+        url = f'/api/courses/{self.course.slug}/'
+        self.client.get(url)
+
+        self.client.force_authenticate(self.instructor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, {'description': 'Updated'})
+        self.client.force_authenticate(None)
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['description'], 'Updated')
+
+    def test_renamed_course_is_not_served_under_old_slug(self):
+        url = f'/api/courses/{self.course.slug}/'
+        self.client.get(url)
+
+        self.course.title = 'Advanced Python'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.save()
+
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_versions_are_bumped_after_commit(self):
+        url = f'/api/{self.course.slug}/lessons/'
+        self.client.force_authenticate(self.instructor)
+        self.client.get(url)
+        version = get_course_version(self.course.slug)
+
+        # Until the transaction commits, readers keep the entry cached under the current version
+        with self.captureOnCommitCallbacks() as callbacks:
+            Content.objects.create(course=self.course, title='Next', description='')
+            self.assertEqual(get_course_version(self.course.slug), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_course_version(self.course.slug), version)
+
+    def test_lesson_change_expires_lesson_list(self):
+        url = f'/api/{self.course.slug}/lessons/'
+        self.client.force_authenticate(self.instructor)
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        self.lesson.description = 'changed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['description'], 'changed')
+
+    def test_cached_lesson_list_still_checks_permissions(self):
+        url = f'/api/{self.course.slug}/lessons/'
+        self.client.force_authenticate(self.instructor)
+        self.client.get(url)
+
+        self.client.force_authenticate(User.objects.create_user(username='outsider', password='secret'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        self.instructor = self.course.instructor.user
+        self.student = User.objects.create_user(username='student', password='secret')
+        Enrollment.objects.create(course=self.course, student=self.student)
+        self.lesson = Content.objects.create(course=self.course, title='Intro', description='hello')
+        self.assessment = Assessment.objects.create(content=self.lesson, title='quiz', description='')
+        self.question = Question.objects.create(assessment=self.assessment, question_text='Ready?')
+        self.option = Option.objects.create(question=self.question, option_text='yes', is_correct=True)
+        self.lessons_url = f'/api/{self.course.slug}/lessons/'
+        self.options_url = f'/api/{self.course.slug}/assessment-{self.assessment.pk}/question-{self.question.pk}/options/'
+        self.client.force_authenticate(self.student)
+
+    def assertNotModified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_unchanged_lessons_return_not_modified_without_reading_them(self):
+        response = self.client.get(self.lessons_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+
+        # The course lookup and the enrollment check, both needed for the permission check anyway
+        cache.clear()
+        with self.assertNumQueries(2):
+            self.assertNotModified(self.lessons_url, response['ETag'])
+
+    def test_missing_lesson_with_current_etag_is_not_found(self):
+        etag = self.client.get(f'{self.lessons_url}intro/')['ETag']
+        response = self.client.get(f'{self.lessons_url}missing/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+
+    def test_cached_lesson_list_still_answers_not_modified(self):
+        etag = self.client.get(self.lessons_url)['ETag']
+        self.assertEqual(self.client.get(self.lessons_url)['X-Cache'], 'HIT')
+        self.assertNotModified(self.lessons_url, etag)
+
+    def test_if_modified_since_is_honoured(self):
+        last_modified = self.client.get(f'{self.lessons_url}intro/')['Last-Modified']
+        response = self.client.get(f'{self.lessons_url}intro/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_nested_option_change_changes_course_etags(self):
+        lessons_etag = self.client.get(self.lessons_url)['ETag']
+        options_etag = self.client.get(self.options_url)['ETag']
+        before = Question.objects.get(pk=self.question.pk).updated_at
+
+        self.option.option_text = 'sure'
+        self.option.save()
+
+        response = self.client.get(self.lessons_url, HTTP_IF_NONE_MATCH=lessons_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], lessons_etag)
+        response = self.client.get(self.options_url, HTTP_IF_NONE_MATCH=options_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['option_text'], 'sure')
+        self.assertGreater(Question.objects.get(pk=self.question.pk).updated_at, before)
+
+    def test_deleted_lesson_changes_etag(self):
+        other = Content.objects.create(course=self.course, title='Next', description='')
+        etag = self.client.get(self.lessons_url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+
+        response = self.client.get(self.lessons_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def create_quiz(self, title):
+        lesson = Content.objects.create(course=self.course, title=title, description='')
+        assessment = Assessment.objects.create(content=lesson, title='quiz', description='')
+        questions = Question.objects.bulk_create(
+            [Question(assessment=assessment, question_text=f'Question {n}?') for n in range(20)]
+        )
+        Option.objects.bulk_create([
+            Option(question=question, option_text=f'Option {n}', is_correct=n == 0)
+            for question in questions for n in range(4)
+        ])
+        return lesson, assessment
+
+    def test_deleting_a_lesson_touches_its_course_once(self):
+        lesson, _ = self.create_quiz('Quiz lesson')
+        etag = self.client.get(self.lessons_url)['ETag']
+
+        # Only the lesson's receivers write, the quiz beneath it is collected in batches
+        with self.assertNumQueries(14):
+            lesson.delete()
+
+        self.assertEqual(self.client.get(self.lessons_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertFalse(Option.objects.filter(question__assessment__content_id=lesson.pk).exists())
+
+    def test_deleting_an_assessment_touches_its_course_once(self):
+        _, assessment = self.create_quiz('Quiz lesson')
+        etag = self.client.get(self.lessons_url)['ETag']
+
+        with self.assertNumQueries(9):
+            assessment.delete()
+
+        self.assertEqual(self.client.get(self.lessons_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_bulk_questions_change_etag(self):
+        url = f'/api/{self.course.slug}/assessments/intro/'
+        etag = self.client.get(url)['ETag']
+
+        self.client.force_authenticate(self.instructor)
+        self.client.post(f'/api/{self.course.slug}/assessment-{self.assessment.pk}/questions/bulk/', [{
+            'question_text': 'Bulk?', 'options': [
+                {'option_text': 'yes', 'is_correct': True}, {'option_text': 'no', 'is_correct': False},
+            ],
+        }], format='json')
+
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_enrollments_keep_lesson_etag(self):
+        etag = self.client.get(self.lessons_url)['ETag']
+        Enrollment.objects.create(course=self.course, student=User.objects.create_user(username='other'))
+        self.assertNotModified(self.lessons_url, etag)
+
+    def test_students_and_instructor_get_different_option_etags(self):
+        student_etag = self.client.get(self.options_url)['ETag']
+
+        self.client.force_authenticate(self.instructor)
+        response = self.client.get(self.options_url, HTTP_IF_NONE_MATCH=student_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['results'][0]['is_correct'])
+
+    def test_course_detail_is_validated_by_etag_alone(self):
+        url = f'/api/courses/{self.course.slug}/'
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertNotIn('Last-Modified', response)
+        self.assertNotModified(url, response['ETag'])
+
+        # The version says the course changed, not when, so a date alone never matches
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_course_is_not_versioned(self):
+        response = self.client.get('/api/courses/missing/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(cache.get(course_version_key('missing')))
+
+    def test_course_etag_follows_counts(self):
+        url = f'/api/courses/{self.course.slug}/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertNotModified(url, etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(course=self.course, student=User.objects.create_user(username='other'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['enrollment_count'], 2)
+
+
+class ConversationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        self.instructor = self.course.instructor.user
+        self.students = []
+        for n in range(2):
+            student = User.objects.create_user(username=f'student{n}', password='secret')
+            Enrollment.objects.create(course=self.course, student=student)
+            self.students.append(student)
+        self.url = f'/api/{self.course.slug}/conversations/'
+
+    def send(self, sender, receiver, content):
+        return Message.objects.create(course=self.course, sender=sender, receiver=receiver, content=content)
+
+    def test_messages_maintain_both_conversations(self):
+        student = self.students[0]
+        self.send(student, self.instructor, 'hello')
+        last = self.send(student, self.instructor, 'anyone?')
+
+        inbox = Conversation.objects.get(user=self.instructor, peer=student)
+        outbox = Conversation.objects.get(user=student, peer=self.instructor)
+        self.assertEqual((inbox.last_message, inbox.unread_count), (last, 2))
+        self.assertEqual((outbox.last_message, outbox.unread_count), (last, 0))
+
+    def test_thread_list_in_fixed_queries(self):
+        self.send(self.students[0], self.instructor, 'first')
+        self.client.force_authenticate(self.instructor)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url)
+
+        self.send(self.students[1], self.instructor, 'second')
+        with self.assertNumQueries(len(small)):
+            response = self.client.get(self.url)
+
+        threads = response.data['results']
+        self.assertEqual([thread['peer'] for thread in threads], ['student1', 'student0'])
+        self.assertEqual(threads[0]['last_message']['content'], 'second')
+        self.assertEqual(threads[0]['unread_count'], 1)
+
+    def test_mark_read(self):
+        self.send(self.students[0], self.instructor, 'hello')
+        self.client.force_authenticate(self.instructor)
+
+        response = self.client.post(f'{self.url}student0/read/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(Conversation.objects.get(user=self.instructor).unread_count, 0)
+
+    def test_history_is_keyset_paginated(self):
+        student = self.students[0]
+        for n in range(5):
+            self.send(student, self.instructor, f'question {n}')
+            self.send(self.instructor, student, f'answer {n}')
+        self.send(self.students[1], self.instructor, 'other thread')
+        self.client.force_authenticate(student)
+
+        contents = []
+        url = f'{self.url}instructor/messages/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            contents.extend(message['content'] for message in response.data['results'])
+            url = response.data['next']
+
+        expected = [f'{kind} {n}' for n in reversed(range(5)) for kind in ['answer', 'question']]
+        self.assertEqual(contents, expected)
+
+    def test_other_users_conversations_are_private(self):
+        self.send(self.students[0], self.instructor, 'hello')
+        self.client.force_authenticate(self.students[1])
+
+        self.assertEqual(self.client.get(f'{self.url}instructor/').status_code, 404)
+
+    def test_deleted_message_updates_both_conversations(self):
+        student = self.students[0]
+        first = self.send(student, self.instructor, 'hello')
+        self.send(student, self.instructor, 'anyone?')
+        self.client.force_authenticate(self.instructor)
+        self.client.post(f'{self.url}student0/read/')
+        unread = self.send(student, self.instructor, 'still there?')
+
+        unread.delete()
+        inbox = Conversation.objects.get(user=self.instructor, peer=student)
+        self.assertEqual((inbox.last_message.content, inbox.unread_count), ('anyone?', 0))
+        self.assertEqual(Conversation.objects.get(user=student).last_message.content, 'anyone?')
+
+        # Deleting a message already read leaves the unread count alone
+        self.send(student, self.instructor, 'hello again')
+        first.delete()
+        self.assertEqual(Conversation.objects.get(user=self.instructor, peer=student).unread_count, 1)
+
+        Message.objects.filter(course=self.course).delete()
+        self.assertFalse(Conversation.objects.exists())
+
+    def test_rebuild_conversations(self):
+        message = self.send(self.students[0], self.instructor, 'hello')
+        Conversation.objects.all().delete()
+
+        call_command('rebuild_conversations', stdout=StringIO())
+
+        self.assertEqual(Conversation.objects.get(user=self.instructor).last_message, message)
+        self.assertEqual(Conversation.objects.get(user=self.students[0]).last_message, message)
+
+
+class MessageStreamTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        self.instructor = self.course.instructor.user
+        self.student = User.objects.create_user(username='student', password='secret')
+        Enrollment.objects.create(course=self.course, student=self.student)
+        self.url = f'/api/{self.course.slug}/messages/stream/'
+
+    def test_new_messages_are_published_to_both_users(self):
+        with mock.patch.object(get_broker(), 'publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            Message.objects.create(course=self.course, sender=self.student, receiver=self.instructor, content='hi')
+
+        channels = sorted(call.args[0] for call in publish.call_args_list)
+        self.assertEqual(channels, sorted([
+            message_channel(self.course.pk, self.student.pk), message_channel(self.course.pk, self.instructor.pk)
+        ]))
+        self.assertEqual(publish.call_args.args[1]['content'], 'hi')
+
+    def test_stream_requires_authentication(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_stream_requires_course_membership(self):
+        outsider = User.objects.create_user(username='outsider', password='secret')
+        token = AuthToken.objects.create(outsider)[1]
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION=f'Token {token}').status_code, 403)
+
+    async def test_stream_delivers_published_messages(self):
+        token = (await sync_to_async(AuthToken.objects.create)(self.student))[1]
+        response = await self.async_client.get(self.url, headers={'Authorization': f'Token {token}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b': connected\n\n')
+
+        get_broker().publish(message_channel(self.course.pk, self.student.pk), {'content': 'pushed'})
+        self.assertEqual(await anext(events), b'event: message\ndata: {"content": "pushed"}\n\n')
+        await events.aclose()
+
+
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        self.instructor = self.course.instructor.user
+        self.student = User.objects.create_user(username='student', password='secret')
+        Enrollment.objects.create(course=self.course, student=self.student)
+        self.token = AuthToken.objects.create(self.student)[1]
+
+    def get(self, url):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def test_course_detail(self):
+        response = self.client.get(f'/api/async/courses/{self.course.slug}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Python Basics')
+        self.assertEqual(self.client.get('/api/async/courses/missing/').status_code, 404)
+
+    def test_course_detail_and_lessons_answer_not_modified(self):
+        Content.objects.create(course=self.course, title='Intro', description='')
+        for url in [f'/api/async/courses/{self.course.slug}/', f'/api/async/{self.course.slug}/lessons/']:
+            with self.subTest(url=url):
+                self.get(url)
+                response = self.get(url)
+                revalidated = self.client.get(
+                    url, HTTP_AUTHORIZATION=f'Token {self.token}', HTTP_IF_NONE_MATCH=response['ETag'],
+                )
+                self.assertEqual(revalidated.status_code, 304)
+
+    def test_only_lessons_send_last_modified(self):
+        url = f'/api/async/courses/{self.course.slug}/'
+        self.get(url)
+        self.assertNotIn('Last-Modified', self.get(url))
+
+        lessons_url = f'/api/async/{self.course.slug}/lessons/'
+        last_modified = self.get(lessons_url)['Last-Modified']
+        revalidated = self.client.get(
+            lessons_url, HTTP_AUTHORIZATION=f'Token {self.token}', HTTP_IF_MODIFIED_SINCE=last_modified,
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_lessons_require_course_membership(self):
+        url = f'/api/async/{self.course.slug}/lessons/'
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        outsider = User.objects.create_user(username='outsider', password='secret')
+        token = AuthToken.objects.create(outsider)[1]
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=f'Token {token}').status_code, 403)
+
+    def test_lessons_are_paginated_by_id(self):
+        for n in range(3):
+            Content.objects.create(course=self.course, title=f'Lesson {n}', description='**bold**')
+
+        first = self.get(f'/api/async/{self.course.slug}/lessons/?page_size=2').json()
+        self.assertEqual([lesson['title'] for lesson in first['results']], ['Lesson 0', 'Lesson 1'])
+        self.assertEqual(first['results'][0]['formatted_description'], '<p><strong>bold</strong></p>')
+
+        second = self.get(first['next']).json()
+        self.assertEqual([lesson['title'] for lesson in second['results']], ['Lesson 2'])
+        self.assertIsNone(second['next'])
+
+    def test_messages_merge_sent_and_received(self):
+        for n in range(3):
+            sender, receiver = (self.student, self.instructor) if n % 2 else (self.instructor, self.student)
+            Message.objects.create(course=self.course, sender=sender, receiver=receiver, content=f'{n}')
+        other = User.objects.create_user(username='other', password='secret')
+        Message.objects.create(course=self.course, sender=self.instructor, receiver=other, content='private')
+
+        first = self.get(f'/api/async/{self.course.slug}/messages/?page_size=2').json()
+        self.assertEqual([message['content'] for message in first['results']], ['2', '1'])
+
+        second = self.get(first['next']).json()
+        self.assertEqual([message['content'] for message in second['results']], ['0'])
+        self.assertIsNone(second['next'])
+        self.assertEqual(self.get(f'/api/async/{self.course.slug}/messages/?cursor=bogus').status_code, 404)
+
+    async def test_served_by_async_client(self):
+        response = await self.async_client.get(
+            f'/api/async/{self.course.slug}/lessons/', headers={'Authorization': f'Token {self.token}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_lessons_share_the_course_version_cache(self):
+        url = f'/api/async/{self.course.slug}/lessons/'
+        self.assertEqual(self.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Content.objects.create(course=self.course, title='Lesson 1', description='')
+        response = self.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.json()['results']), 1)
+
+
+class CourseListTests(APITestCase):
+    url = '/api/courses/'
+
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        self.instructor = self.course.instructor.user
+        today = timezone.localdate()
+        for title, start, end in [
+            ('Past', date(2020, 1, 1), date(2020, 6, 1)),
+            ('Current', today - timedelta(days=10), today + timedelta(days=10)),
+            ('Future', today + timedelta(days=30), today + timedelta(days=60)),
+        ]:
+            Course.objects.create(
+                title=title, description='', instructor=self.course.instructor, start_date=start, end_date=end,
+            )
+        create_course(username='teacher', title='Django')
+        self.client.force_authenticate(self.instructor)
+
+    def titles(self, query=''):
+        response = self.client.get(f'{self.url}{query}')
+        self.assertEqual(response.status_code, 200)
+        return [course['title'] for course in response.data['results']]
+
+    def test_instructor_lists_own_courses_in_one_query(self):
+        with CaptureQueriesContext(connection) as captured:
+            titles = self.titles()
+        self.assertEqual(titles, ['Python Basics', 'Past', 'Current', 'Future'])
+        self.assertEqual(len([query for query in captured if 'core_course' in query['sql']]), 1)
+        self.assertEqual(self.client.get(self.url).data['results'][0]['instructor'], 'instructor')
+
+    def test_filters(self):
+        self.assertEqual(self.titles('?instructor=teacher'), ['Django'])
+        self.assertEqual(self.titles('?instructor=nobody'), [])
+        self.assertEqual(self.titles('?active=true'), ['Current'])
+        self.assertEqual(self.titles('?active=false'), ['Python Basics', 'Past', 'Future'])
+        self.assertEqual(self.titles('?start_date=2021-01-01&end_date=2023-12-31'), ['Python Basics'])
+
+    def test_ordering_is_paginated(self):
+        response = self.client.get(f'{self.url}?ordering=-start_date&page_size=2')
+        self.assertEqual([course['title'] for course in response.data['results']], ['Future', 'Current'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([course['title'] for course in response.data['results']], ['Python Basics', 'Past'])
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.client.get(f'{self.url}?start_date=yesterday').status_code, 400)
+        self.assertEqual(self.client.get(f'{self.url}?ordering=title').status_code, 400)
+
+
+class CourseSearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        reset_index()
+        self.python = create_course(title='Python Basics')
+        self.python.description = 'Learn programming from scratch'
+        self.python.save()
+        self.django = create_course(username='teacher', title='Django for APIs')
+        self.url = '/api/courses/search/'
+
+    def results(self, query):
+        return [course['slug'] for course in self.client.get(self.url, {'q': query}).json()['results']]
+
+    def test_search_is_public_and_ranks_titles_first(self):
+        Content.objects.create(course=self.django, title='Python packaging', description='')
+
+        response = self.client.get(self.url, {'q': 'python'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([course['slug'] for course in response.json()['results']], ['python-basics', 'django-for-apis'])
+        self.assertEqual(self.results('python programming'), ['python-basics'])
+        self.assertEqual(self.results('rust'), [])
+
+    def test_index_follows_course_and_lesson_changes(self):
+        self.assertEqual(self.results('serializers'), [])
+        lesson = Content.objects.create(course=self.django, title='Serializers', description='')
+        self.assertEqual(self.results('serializers'), ['django-for-apis'])
+
+        lesson.delete()
+        self.django.delete()
+        self.assertEqual(self.results('serializers'), [])
+        self.assertEqual(self.results('django'), [])
+
+    def test_titles_of_course_actions_are_reserved(self):
+        self.client.force_authenticate(self.python.instructor.user)
+        course = {'description': 'Finding things', 'start_date': '2023-01-01', 'end_date': '2023-12-31'}
+        for title in ['Search', 'dashboard']:
+            response = self.client.post('/api/courses/', {'title': title, **course})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('title', response.json())
+        response = self.client.patch(f'/api/courses/{self.python.slug}/', {'title': 'Search'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Course.objects.filter(slug__in=Course.RESERVED_SLUGS).exists())
+
+        response = self.client.post('/api/courses/', {'title': 'Search engines', **course})
+        self.assertEqual(response.status_code, 201)
+
+    def test_course_reads_and_saves_leave_the_search_vector_alone(self):
+        self.client.force_authenticate(self.python.instructor.user)
+        for url in [f'/api/courses/{self.python.slug}/', f'/api/{self.python.slug}/lessons/']:
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertTrue(captured.captured_queries)
+            self.assertFalse([query for query in captured if 'search_vector' in query['sql']])
+
+        course = Course.objects.get(pk=self.python.pk)
+        with CaptureQueriesContext(connection) as captured:
+            course.save()
+        update = next(query['sql'] for query in captured if query['sql'].startswith('UPDATE "core_course"'))
+        self.assertNotIn('search_vector', update)
+
+    def test_results_are_paginated_by_rank(self):
+        create_course(username='author', title='Python Advanced')
+
+        first = self.client.get(self.url, {'q': 'python', 'page_size': 1}).json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual([course['slug'] for course in first['results'] + second['results']], ['python-advanced', 'python-basics'])
+        self.assertIsNone(second['next'])
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'python', 'cursor': 'bogus'}).status_code, 404)
+
+
+class CourseCounterTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        self.student = User.objects.create_user(username='student', password='secret')
+
+    def counts(self):
+        course = Course.objects.get(pk=self.course.pk)
+        return course.enrollment_count, course.lesson_count, course.assessment_count
+
+    def test_counters_follow_creates_and_deletes(self):
+        enrollment = Enrollment.objects.create(course=self.course, student=self.student)
+        lesson = Content.objects.create(course=self.course, title='Intro', description='')
+        Content.objects.create(course=self.course, title='Next', description='')
+        Assessment.objects.create(content=lesson, title='quiz', description='')
+        self.assertEqual(self.counts(), (1, 2, 1))
+
+        lesson.delete()
+        enrollment.delete()
+        self.assertEqual(self.counts(), (0, 1, 0))
+
+    def test_counted_rows_expire_their_courses_in_one_query(self):
+        lesson = Content.objects.create(course=self.course, title='Intro', description='')
+        students = [User.objects.create_user(username=f'student{n}') for n in range(5)]
+        url = f'/api/courses/{self.course.slug}/'
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as captured, self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for student in students:
+                    Enrollment.objects.create(course_id=self.course.pk, student=student)
+                Assessment.objects.create(content_id=lesson.pk, title='quiz', description='')
+        # The counter updates never load a course, its slug is read once after commit
+        course_reads = [query for query in captured if query['sql'].startswith('SELECT') and 'core_course' in query['sql']]
+        self.assertEqual(len(course_reads), 1)
+
+        response = self.client.get(url)
+        self.assertEqual((response.data['enrollment_count'], response.data['assessment_count']), (5, 1))
+
+    def test_saving_a_course_keeps_concurrent_counts(self):
+        stale = Course.objects.get(pk=self.course.pk)
+        Enrollment.objects.create(course=self.course, student=self.student)
+
+        stale.description = 'updated'
+        stale.save()
+        self.assertEqual(self.counts(), (1, 0, 0))
+        self.assertEqual(Course.objects.get(pk=self.course.pk).description, 'updated')
+
+    def test_counts_are_served_with_the_course(self):
+        self.client.force_authenticate(self.course.instructor.user)
+        self.client.get(f'/api/courses/{self.course.slug}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(course=self.course, student=self.student)
+
+        response = self.client.get(f'/api/courses/{self.course.slug}/')
+        self.assertEqual(response.data['enrollment_count'], 1)
+
+    def test_reconcile_fixes_drift(self):
+        Enrollment.objects.create(course=self.course, student=self.student)
+        Course.objects.filter(pk=self.course.pk).update(enrollment_count=7, lesson_count=3)
+        other = create_course(username='teacher', title='Django')
+
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Fixed the counters of 1 course(s).', out.getvalue())
+        self.assertEqual(self.counts(), (1, 0, 0))
+        self.assertEqual(Course.objects.get(pk=other.pk).enrollment_count, 0)
+
+
+@override_settings(PROGRESS_FLUSH_INTERVAL=0)
+class ProgressTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        get_buffer().drain()
+        self.course = create_course()
+        self.student = User.objects.create_user(username='student', password='secret')
+        Enrollment.objects.create(course=self.course, student=self.student)
+        self.intro = Content.objects.create(course=self.course, title='Intro', description='')
+        self.next = Content.objects.create(course=self.course, title='Next', description='')
+        self.client.force_authenticate(self.student)
+
+    def send(self, *events):
+        return self.client.post(f'/api/{self.course.slug}/progress/events/', {
+            'events': [{'lesson': lesson.slug, 'type': kind} for lesson, kind in events],
+        }, format='json')
+
+    def progress(self):
+        return self.client.get(f'/api/{self.course.slug}/progress/').data
+
+    def test_events_are_written_on_flush(self):
+        response = self.send((self.intro, 'view'), (self.intro, 'view'), (self.intro, 'complete'), (self.next, 'view'))
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(LessonProgress.objects.exists())
+
+        self.assertEqual(get_buffer().flush(), 2)
+        intro = LessonProgress.objects.get(student=self.student, content=self.intro)
+        self.assertEqual(intro.view_count, 2)
+        self.assertIsNotNone(intro.completed_at)
+        self.assertIsNone(LessonProgress.objects.get(student=self.student, content=self.next).completed_at)
+
+        progress = self.progress()
+        self.assertEqual((progress['completed_lessons'], progress['lesson_count'], progress['percent']), (1, 2, 50))
+
+    def test_completion_is_counted_once(self):
+        self.send((self.intro, 'complete'))
+        get_buffer().flush()
+        self.send((self.intro, 'view'), (self.intro, 'complete'))
+        get_buffer().flush()
+
+        self.assertEqual(LessonProgress.objects.get(content=self.intro).view_count, 1)
+        self.assertEqual(self.progress()['completed_lessons'], 1)
+
+    def test_completion_written_by_another_flush_is_not_added_again(self):
+        # Another worker's flush committed the completion and its summary while this one was buffering
+        LessonProgress.objects.create(
+            student=self.student, content=self.intro, course=self.course, completed_at=timezone.now(),
+        )
+        CourseProgress.objects.create(student=self.student, course=self.course, completed_lessons=1)
+
+        self.send((self.intro, 'complete'), (self.next, 'complete'))
+        get_buffer().flush()
+        self.assertEqual(self.progress()['completed_lessons'], 2)
+
+        # A summary that drifted is corrected by the next flush of the student
+        CourseProgress.objects.update(completed_lessons=7)
+        self.send((self.intro, 'view'))
+        get_buffer().flush()
+        self.assertEqual(self.progress()['completed_lessons'], 2)
+
+    def test_flush_queries_do_not_grow_with_events(self):
+        def flush_queries(count):
+            lessons = [Content.objects.create(course=self.course, title=f'Lesson {count}-{n}', description='') for n in range(count)]
+            self.send(*[(lesson, kind) for lesson in lessons for kind in ['view', 'complete']])
+            with CaptureQueriesContext(connection) as captured:
+                get_buffer().flush()
+            return len(captured)
+
+        self.assertEqual(flush_queries(2), flush_queries(20))
+        self.assertEqual(self.progress()['completed_lessons'], 22)
+
+    def test_reading_progress_before_any_event(self):
+        with self.assertNumQueries(3):
+            progress = self.progress()
+        self.assertEqual((progress['completed_lessons'], progress['percent'], progress['last_activity_at']), (0, 0, None))
+
+    def test_events_are_validated(self):
+        response = self.client.post(f'/api/{self.course.slug}/progress/events/', {
+            'events': [{'lesson': 'missing', 'type': 'view'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        outsider = User.objects.create_user(username='outsider', password='secret')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.send((self.intro, 'view')).status_code, 403)
+        self.assertEqual(get_buffer().pending, {})
+
+    def test_future_timestamps_are_clamped(self):
+        self.client.post(f'/api/{self.course.slug}/progress/events/', {
+            'events': [{'lesson': self.intro.slug, 'type': 'view', 'at': '2999-01-01T00:00:00Z'}],
+        }, format='json')
+        get_buffer().flush()
+        self.assertLessEqual(LessonProgress.objects.get(content=self.intro).last_viewed_at, timezone.now())
+
+    def test_stale_events_are_dropped(self):
+        self.send((self.intro, 'complete'), (self.next, 'complete'))
+        self.next.delete()
+        get_buffer().flush()
+        self.assertEqual(list(LessonProgress.objects.values_list('content', flat=True)), [self.intro.pk])
+
+        self.send((Content.objects.create(course=self.course, title='Later', description=''), 'view'))
+        Enrollment.objects.filter(student=self.student).delete()
+        self.assertEqual(get_buffer().flush(), 0)
+
+    def test_deleting_a_completed_lesson_updates_the_summary(self):
+        self.send((self.intro, 'complete'), (self.next, 'complete'))
+        get_buffer().flush()
+        self.intro.delete()
+        self.assertEqual(CourseProgress.objects.get(student=self.student).completed_lessons, 1)
+
+    def test_rebuild_command_fixes_drift(self):
+        self.send((self.intro, 'complete'), (self.next, 'view'))
+        get_buffer().flush()
+        CourseProgress.objects.update(completed_lessons=5)
+
+        out = StringIO()
+        call_command('rebuild_progress', stdout=out)
+        self.assertIn('Rebuilt 1 progress summary(ies).', out.getvalue())
+        self.assertEqual(CourseProgress.objects.get(student=self.student).completed_lessons, 1)
+
+
+@override_settings(ROLLUP_SETTLE_SECONDS=0)
+class AnalyticsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        self.instructor = self.course.instructor.user
+        lesson = Content.objects.create(course=self.course, title='Intro', description='')
+        self.assessment = Assessment.objects.create(content=lesson, title='quiz', description='')
+        self.url = f'/api/courses/{self.course.slug}/analytics/'
+
+    def enroll(self, day, *usernames):
+        with mock.patch('django.utils.timezone.now', return_value=timezone.make_aware(timezone.datetime(2023, 1, day, 12))):
+            for username in usernames:
+                student = User.objects.create_user(username=username, password='secret')
+                Enrollment.objects.create(course=self.course, student=student)
+
+    def attempt(self, score, total=10):
+        student = User.objects.create_user(username=f'taker{Attempt.objects.count()}', password='secret')
+        Attempt.objects.create(assessment=self.assessment, student=student, score=score, total=total)
+
+    def test_analytics_are_read_from_rollups(self):
+        self.enroll(1, 'ann', 'bob')
+        self.enroll(3, 'cat')
+        for score in [2, 9, 10, 0]:
+            self.attempt(score)
+        self.assertEqual(refresh('enrollments'), 3)
+        self.assertEqual(refresh('scores'), 4)
+
+        self.client.force_authenticate(self.instructor)
+        data = self.client.get(self.url).data
+        self.assertEqual(
+            [(row['day'], row['enrollments'], row['total']) for row in data['enrollments']],
+            [(date(2023, 1, 1), 2, 2), (date(2023, 1, 3), 1, 3)],
+        )
+        self.assertEqual(data['assessments'][0]['attempts'], 4)
+        self.assertEqual(data['assessments'][0]['distribution'], [1, 0, 1, 0, 0, 0, 0, 0, 0, 2])
+
+    def test_refresh_only_counts_rows_past_the_watermark(self):
+        self.enroll(1, 'ann')
+        refresh('enrollments')
+        self.enroll(1, 'bob')
+        self.enroll(2, 'cat')
+
+        self.assertEqual(refresh('enrollments', chunk_size=1), 2)
+        self.assertEqual(RollupWatermark.objects.get(name='enrollments').last_id, Enrollment.objects.latest('pk').pk)
+        self.assertEqual(refresh('enrollments'), 0)
+        self.assertEqual(list(EnrollmentRollup.objects.order_by('day').values_list('enrollments', flat=True)), [2, 1])
+
+    def test_deleted_attempts_leave_the_rollup(self):
+        self.attempt(2)
+        self.attempt(9)
+        refresh('scores')
+        User.objects.get(username='taker0').delete()
+
+        self.client.force_authenticate(self.instructor)
+        data = self.client.get(self.url).data
+        self.assertEqual(data['assessments'][0]['distribution'], [0, 0, 0, 0, 0, 0, 0, 0, 0, 1])
+
+    def test_recent_rows_wait_for_the_next_refresh(self):
+        self.attempt(5)
+        with self.settings(ROLLUP_SETTLE_SECONDS=60):
+            self.assertEqual(refresh('scores'), 0)
+        self.assertEqual(refresh('scores'), 1)
+
+    def test_queries_do_not_grow_with_rows(self):
+        self.client.force_authenticate(self.instructor)
+        self.enroll(1, 'ann')
+        refresh('enrollments')
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(self.url)
+        self.enroll(2, 'bob', 'cat')
+        self.enroll(5, 'dan')
+        for score in range(10):
+            self.attempt(score)
+        refresh('enrollments')
+        refresh('scores')
+        with self.assertNumQueries(len(captured)):
+            self.client.get(self.url)
+
+    def test_only_the_instructor_and_admins_see_analytics(self):
+        self.enroll(1, 'ann')
+        self.client.force_authenticate(User.objects.get(username='ann'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        other = create_course(username='teacher', title='Django')
+        self.client.force_authenticate(other.instructor.user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        self.client.force_authenticate(User.objects.create_superuser(username='admin', password='secret'))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_rebuild_command(self):
+        self.enroll(1, 'ann')
+        refresh('enrollments')
+        EnrollmentRollup.objects.update(enrollments=9)
+
+        out = StringIO()
+        call_command('refresh_rollups', '--rebuild', stdout=out)
+        self.assertIn('Rolled up 1 new row(s) into enrollments.', out.getvalue())
+        self.assertEqual(EnrollmentRollup.objects.get().enrollments, 1)
+
+
+@override_settings(PROGRESS_FLUSH_INTERVAL=0)
+class DashboardTests(APITestCase):
+    url = '/api/courses/dashboard/'
+
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        self.other = create_course(username='teacher', title='Django')
+        self.student = User.objects.create_user(username='student', password='secret')
+        for course in [self.course, self.other]:
+            Enrollment.objects.create(course=course, student=self.student)
+        self.lesson = Content.objects.create(course=self.course, title='Intro', description='')
+        Assessment.objects.create(content=self.lesson, title='quiz', description='')
+        self.message = Message.objects.create(
+            course=self.course, sender=self.student, receiver=self.course.instructor.user, content='Hello',
+        )
+        self.client.force_authenticate(self.student)
+
+    def courses(self, response=None):
+        response = response or self.client.get(self.url)
+        return {course['slug']: course for course in response.data}
+
+    def test_lists_enrolled_courses(self):
+        create_course(username='stranger', title='Elsewhere')
+        courses = self.courses()
+
+        self.assertEqual(set(courses), {self.course.slug, self.other.slug})
+        course = courses[self.course.slug]
+        self.assertEqual((course['instructor'], course['lesson_count'], course['assessment_count']), ('instructor', 1, 1))
+        self.assertEqual(course['latest_message']['content'], 'Hello')
+        self.assertEqual((course['completed_lessons'], course['percent']), (0, 0))
+        self.assertIsNone(courses[self.other.slug]['latest_message'])
+
+    def test_queries_do_not_grow_with_courses(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(self.url)
+        for n in range(5):
+            course = create_course(username=f'teacher{n}', title=f'Course {n}')
+            Enrollment.objects.create(course=course, student=self.student)
+            Message.objects.create(course=course, sender=course.instructor.user, receiver=self.student, content='Hi')
+        cache.clear()
+
+        with self.assertNumQueries(len(captured)):
+            self.assertEqual(len(self.client.get(self.url).data), 7)
+
+    def test_cached_until_the_user_or_a_course_changes(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Message.objects.create(course=self.course, sender=self.course.instructor.user, receiver=self.student, content='Reply')
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(self.courses(response)[self.course.slug]['latest_message']['content'], 'Reply')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Content.objects.create(course=self.other, title='Models', description='')
+        self.assertEqual(self.courses()[self.other.slug]['lesson_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.filter(course=self.other, student=self.student).delete()
+        self.assertEqual(set(self.courses()), {self.course.slug})
+
+    def test_course_changed_while_rendering_is_not_cached_as_current(self):
+        render = CourseViewSet.render_dashboard
+
+        def render_then_change(view, user):
+            rendered = render(view, user)
+            # Committed after the courses were read, before the entry is stored
+            bump_course_version(self.course.slug)
+            return rendered
+
+        with mock.patch.object(CourseViewSet, 'render_dashboard', render_then_change):
+            self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+    def test_deleted_message_expires_the_dashboard(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.message.delete()
+        self.assertIsNone(self.courses()[self.course.slug]['latest_message'])
+
+    def test_progress_flush_expires_the_dashboard(self):
+        self.client.get(self.url)
+        get_buffer().drain()
+        get_buffer().add(self.student.pk, self.course.pk, [(self.lesson.pk, 'complete', timezone.now())])
+        get_buffer().flush()
+        self.assertEqual(self.courses()[self.course.slug]['percent'], 100)
+
+    def test_roster_import_expires_the_dashboard(self):
+        course = create_course(username='teacher2', title='Imported')
+        self.client.get(self.url)
+        enroll_students(course, ['student'])
+        self.assertIn(course.slug, self.courses())
+
+
+class RosterTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        self.instructor = self.course.instructor.user
+        self.students = [
+            User.objects.create_user(username=f'student{n}', email=f'student{n}@example.com', password='secret')
+            for n in range(3)
+        ]
+        Enrollment.objects.create(course=self.course, student=self.students[0])
+        self.url = f'/api/{self.course.slug}/enrollments/'
+
+    def test_import_enrolls_by_username_or_email(self):
+        self.assertFalse(is_enrolled_student(self.students[1], self.course))
+        self.client.force_authenticate(self.instructor)
+        body = 'username\nstudent0\nstudent1\nstudent2@example.com\nnobody\n\n'
+        response = self.client.post(f'{self.url}import/', body, content_type='text/csv')
+
+        self.assertEqual(response.data, {'enrolled': 2, 'already_enrolled': 1, 'unknown': ['nobody']})
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 3)
+        self.assertEqual(Course.objects.get(pk=self.course.pk).enrollment_count, 3)
+        # The cached "not enrolled" answer was dropped
+        self.assertTrue(is_enrolled_student(self.students[1], self.course))
+
+    def test_roster_streams_enrollments(self):
+        Enrollment.objects.create(course=self.course, student=self.students[1])
+        self.client.force_authenticate(self.instructor)
+        response = self.client.get(f'{self.url}roster/')
+
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'username,email,enrollment_date')
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], ['student0', 'student1'])
+
+    def test_only_instructor_or_admin_manage_roster(self):
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(f'{self.url}roster/').status_code, 403)
+        self.assertEqual(self.client.post(f'{self.url}import/', 'student1', content_type='text/csv').status_code, 403)
+
+        admin = User.objects.create_superuser(username='admin', password='secret')
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get(f'{self.url}roster/').status_code, 200)
+
+    def test_import_command(self):
+        out, err = StringIO(), StringIO()
+        with mock.patch('sys.stdin', StringIO('student1\nstudent2\nghost\n')):
+            call_command('import_enrollments', self.course.slug, '-', stdout=out, stderr=err)
+
+        self.assertIn('Enrolled 2 student(s), 0 already enrolled, 1 unknown.', out.getvalue())
+        self.assertIn("No user matches 'ghost'.", err.getvalue())
+        self.assertEqual(Enrollment.objects.filter(course=self.course).count(), 3)
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1.0, INSTRUMENTATION_DETECT_DUPLICATES=True)
+class InstrumentationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.course = create_course()
+        self.instructor = self.course.instructor.user
+        self.admin = User.objects.create_superuser(username='admin', password='secret')
+        lesson = Content.objects.create(course=self.course, title='Intro', description='hello')
+        assessment = Assessment.objects.create(content=lesson, title='quiz', description='')
+        for n in range(3):
+            question = Question.objects.create(assessment=assessment, question_text=f'{n}?')
+            Option.objects.create(question=question, option_text='yes')
+
+    def stats(self, route):
+        return next(row for row in route_stats() if row['route'] == route)
+
+    def test_records_queries_and_latency_per_route(self):
+        self.client.force_authenticate(self.instructor)
+        self.client.get(f'/api/{self.course.slug}/lessons/')
+        self.client.get(f'/api/{self.course.slug}/lessons/')
+
+        stats = self.stats('lessons-list')
+        self.assertEqual(stats['requests'], 2)
+        # The second request is served from the response cache
+        self.assertEqual(stats['queries_per_request'], 1.5)
+        self.assertGreater(stats['latency_ms'], stats['db_ms'])
+        self.assertGreater(stats['serializer_ms'], 0)
+        self.assertIsNotNone(stats['latency_p95_ms'])
+
+    def test_serializers_are_timed_without_patching_drf(self):
+        original = BaseSerializer.data
+        self.client.force_authenticate(self.instructor)
+        self.client.get(f'/api/{self.course.slug}/lessons/')
+
+        self.assertIs(BaseSerializer.data, original)
+        self.assertGreater(self.stats('lessons-list')['serializer_ms'], 0)
+        # Outside a sampled request serializers run untimed
+        self.assertEqual(ContentSerializer(Content.objects.first()).data['title'], 'Intro')
+
+    async def test_records_queries_of_async_views(self):
+        token = (await sync_to_async(AuthToken.objects.create)(self.instructor))[1]
+        await self.async_client.get(f'/api/async/{self.course.slug}/lessons/', headers={'Authorization': f'Token {token}'})
+
+        stats = await sync_to_async(self.stats)('async-lessons')
+        self.assertGreater(stats['queries_per_request'], 0)
+
+    def test_detects_repeated_statements(self):
+        timings = RequestTimings(detect_duplicates=True)
+        execute = lambda sql, params, many, context: None
+        for pk in range(3):
+            timings.query(execute, 'SELECT * FROM core_question WHERE id = %s', [pk], False, {})
+        timings.query(execute, 'SELECT 1', [], False, {})
+        self.assertEqual(timings.duplicates(), (2, 'SELECT * FROM core_question WHERE id = %s'))
+
+    def test_admin_option_list_queries_do_not_grow_with_rows(self):
+        self.client.force_login(self.admin)
+        self.client.get('/admin/core/option/')
+        first = self.stats('admin:core_option_changelist')['queries_per_request']
+
+        question = Question.objects.first()
+        for n in range(5):
+            Option.objects.create(question=question, option_text=f'{n}')
+        self.client.get('/admin/core/option/')
+        self.assertEqual(self.stats('admin:core_option_changelist')['queries_per_request'], first)
+
+    def test_unsampled_requests_are_not_recorded(self):
+        with self.settings(INSTRUMENTATION_SAMPLE_RATE=0.0):
+            self.client = self.client_class()
+            self.client.force_authenticate(self.instructor)
+            self.client.get(f'/api/{self.course.slug}/lessons/')
+        self.assertEqual(route_stats(), [])
+
+    def test_report_is_admin_only(self):
+        self.client.force_authenticate(self.instructor)
+        self.assertEqual(self.client.get('/api/instrumentation/').status_code, 403)
+
+        self.client.force_authenticate(self.admin)
+        self.client.get(f'/api/courses/{self.course.slug}/')
+        report = self.client.get('/api/instrumentation/').data
+        self.assertIn('courses-detail', [row['route'] for row in report])
+
+        self.assertEqual(self.client.post('/api/instrumentation/reset/').status_code, 204)
+        self.assertNotIn('courses-detail', [row['route'] for row in route_stats()])
+
+    def test_report_command(self):
+        self.client.force_authenticate(self.instructor)
+        self.client.get(f'/api/{self.course.slug}/lessons/')
+
+        out = StringIO()
+        call_command('instrumentation_report', '--reset', stdout=out)
+        self.assertIn('lessons-list', out.getvalue())
+        self.assertEqual(route_stats(), [])
@@ -1,9 +1,12 @@
 from django.urls import path,include
 from rest_framework.routers import DefaultRouter
 from .views import *
+from .events import message_stream
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'instructors', InstructorViewSet, basename="instructors")
+router.register(r'instrumentation', InstrumentationViewSet, basename='instrumentation')
 router.register(r'courses', CourseViewSet, basename='courses')
 router.register(r'(?P<course_slug>[-\w]+)/enrollments', EnrollmentViewSet,basename='enrollment')
 router.register(r'(?P<course_slug>[-\w]+)/lessons', ContentViewSet, basename='lessons')
@@ -11,7 +14,14 @@ router.register(r'(?P<course_slug>[-\w]+)/assessments/(?P<content_slug>[-\w]+)',
 router.register(r'(?P<course_slug>[-\w]+)/assessment-(?P<assessment_pk>\d+)/questions', QuestionViewSet, basename= "questions")
 router.register(r'(?P<course_slug>[-\w]+)/assessment-(?P<assessment_pk>\d+)/question-(?P<question_pk>\d+)/options', OptionViewSet, basename= "options")
 router.register(r'(?P<course_slug>[-\w]+)/messages', MessageViewSet, basename='messages')
+router.register(r'(?P<course_slug>[-\w]+)/conversations', ConversationViewSet, basename='conversations')
+router.register(r'(?P<course_slug>[-\w]+)/progress', ProgressViewSet, basename='progress')
 
 urlpatterns = [
+    path('<slug:course_slug>/messages/stream/', message_stream, name='message-stream'),
+    # Async read paths, served without a worker thread per request under backend.asgi
+    path('async/courses/<slug:slug>/', async_views.course_detail, name='async-course-detail'),
+    path('async/<slug:course_slug>/lessons/', async_views.lesson_list, name='async-lessons'),
+    path('async/<slug:course_slug>/messages/', async_views.message_list, name='async-messages'),
     path('', include(router.urls)),
 ]
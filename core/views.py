@@ -1,23 +1,37 @@
-from rest_framework import viewsets, permissions
-from rest_framework.exceptions import ValidationError
+import codecs
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Prefetch, Q, Subquery, prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 from .models import *
 from .serializers import *
 from .permissions import *
-
-
-def get_course(self):
-    # Get the course_slug from the URL and fetch the course
-    course_slug = self.kwargs.get('course_slug')
-    course = get_object_or_404(Course, slug=course_slug)
-    return course
+from .cache import cached_dashboard, cached_response, conditional_response
+from .freshness import ConditionalCourseContentMixin, touch_course_content
+from .grading import build_answer_key, grade
+from .inbox import decode_cursor, encode_cursor, thread_history
+from .instrumentation import reset_stats, route_stats
+from .pagination import CursorPagination
+from .progress import get_buffer
+from .roster import enroll_students, read_identifiers, roster_rows
+from . import search
+from .analytics import course_analytics
 
 
 class InstructorViewSet(viewsets.ModelViewSet):
-    queryset = Instructor.objects.all()
+    queryset = Instructor.objects.select_related('user')
     serializer_class = InstructorSerializer
     permission_classes = [IsOwnerOrReadOnly]
     lookup_field = 'user__username'
+    ordering = 'pk'
     
     def perform_create(self, serializer):
         user = self.request.user
@@ -36,43 +50,142 @@ class InstructorViewSet(viewsets.ModelViewSet):
 class EnrollmentViewSet(viewsets.ModelViewSet):
     queryset = Enrollment.objects.all()
     serializer_class = EnrollmentSerializer
+    ordering = ('enrollment_date', 'id')
+
+    def get_queryset(self):
+        return super().get_queryset().filter(course=get_course(self))
 
     def perform_create(self, serializer):     
         course = get_course(self)   
         
-        # Check if the student is already enrolled in the course
-        if Enrollment.objects.filter(course=course, student=self.request.user).exists():
+        # The unique (course, student) constraint rejects duplicate enrollments
+        try:
+            with transaction.atomic():
+                serializer.save(course=course, student=self.request.user)
+        except IntegrityError:
             raise ValidationError({"detail": "You are already enrolled in this course."})
-        else:
-            # Save the enrollment with the course and student
-            serializer.save(course=course, student=self.request.user)
-            raise ValidationError("Enrolled Successfully!")
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request, *args, **kwargs):
+        # The body is a CSV of usernames or emails, read line by line as it is enrolled
+        course = get_course(self)
+        lines = codecs.iterdecode(request.stream or [], 'utf-8')
+        result = enroll_students(course, read_identifiers(lines))
+        return Response(result)
+
+    @action(detail=False)
+    def roster(self, request, *args, **kwargs):
+        course = get_course(self)
+        response = StreamingHttpResponse(roster_rows(course), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{course.slug}-roster.csv"'
+        return response
 
     def get_permissions(self):
         if self.action in ['retrieve', 'list' ,' update', 'delete']:
             return [permissions.IsAdminUser()]
         if self.action in  ['create']:
             return [permissions.IsAuthenticated()]
+        if self.action in ['bulk_import', 'roster']:
+            return [permissions.IsAuthenticated(), RosterPermission()]
         return super().get_permissions()
 
 
 class CourseViewSet(viewsets.ModelViewSet):
-    queryset = Course.objects.all()
+    queryset = Course.objects.select_related('instructor__user').defer('search_vector')
     serializer_class = CourseSerializer
     permission_classes = [CoursesPermission]
     lookup_field = 'slug'
+    ordering = 'id'
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        # If the user is an instructor, only return courses associated with that instructor
-        if self.request.user.is_authenticated and hasattr(self.request.user, 'instructor'):
-            if queryset.filter(instructor=self.request.user.instructor).exists():
-                return queryset.filter(instructor=self.request.user.instructor)
-            else:
-                return []
-        
-        # For unauthenticated or non-instructor users, return an empty queryset
+        if self.action != 'list':
+            return queryset
+
+        filters = CourseFilterSerializer(data=self.request.query_params.dict())
+        filters.is_valid(raise_exception=True)
+        params = filters.validated_data
+
+        # All filters go into one query; an instructor lists their own courses unless another is named
+        if 'instructor' in params:
+            queryset = queryset.filter(instructor__user__username=params['instructor'])
+        else:
+            queryset = queryset.filter(instructor=self.request.user.instructor)
+        if 'start_date' in params:
+            queryset = queryset.filter(start_date__gte=params['start_date'])
+        if 'end_date' in params:
+            queryset = queryset.filter(end_date__lte=params['end_date'])
+        if 'active' in params:
+            today = timezone.localdate()
+            running = Q(start_date__lte=today, end_date__gte=today)
+            queryset = queryset.filter(running if params['active'] else ~running)
+
+        # Read by CursorPagination, which keys its pages on the same fields
+        self.ordering = CourseFilterSerializer.ORDERINGS[params['ordering']]
         return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        # Course details are public, so one cached response serves every visitor
+        render = partial(super().retrieve, request, *args, **kwargs)
+        # Every change to the course or its counts bumps its version, which validates it without a query
+        return cached_response(self.kwargs['slug'], 'course', request, render, conditional=True)
+
+    @action(detail=False, permission_classes=[permissions.AllowAny])
+    def search(self, request):
+        # Public catalog search over course and lesson text, best match first
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            raise ValidationError({"q": "This query parameter is required."})
+        page_size = CursorPagination().get_page_size(request)
+
+        cursor = request.query_params.get('cursor')
+        position = search.decode_cursor(cursor) if cursor else None
+        if cursor and position is None:
+            raise NotFound("Invalid cursor.")
+
+        courses, has_more = search.search_courses(text, page_size, position)
+        next_url = None
+        if has_more:
+            last = courses[-1]
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', search.encode_cursor(last.rank, last.pk))
+
+        serializer = CourseSearchSerializer(courses, many=True)
+        return Response({'next': next_url, 'results': serializer.data})
+
+    @action(detail=False, permission_classes=[permissions.IsAuthenticated])
+    def dashboard(self, request):
+        # The courses the user is enrolled in, in three queries whatever their number
+        course_slugs = Course.objects.filter(enrollment__student=request.user).values_list('slug', flat=True)
+        return cached_dashboard(request.user.pk, request, partial(list, course_slugs), partial(self.render_dashboard, request.user))
+
+    def render_dashboard(self, user):
+        latest_message = Conversation.objects.filter(user=user, course=OuterRef('pk')).order_by('-updated_at')
+        courses = list(
+            Course.objects.filter(enrollment__student=user)
+            .select_related('instructor__user')
+            .defer('search_vector')
+            .annotate(
+                enrolled_at=F('enrollment__enrollment_date'),
+                latest_message_id=Subquery(latest_message.values('last_message')[:1]),
+            )
+            .order_by('-enrolled_at', '-id')
+        )
+        messages = Message.objects.select_related('sender').in_bulk(
+            [course.latest_message_id for course in courses if course.latest_message_id]
+        )
+        progress = {row.course_id: row for row in CourseProgress.objects.filter(student=user, course__in=courses)}
+        for course in courses:
+            course.latest_message = messages.get(course.latest_message_id)
+            course.progress = progress.get(course.pk) or CourseProgress(student=user, course=course)
+            course.progress.course = course
+
+        serializer = DashboardCourseSerializer(courses, many=True)
+        return Response(serializer.data), [course.slug for course in courses]
+
+    @action(detail=True, permission_classes=[permissions.IsAuthenticated, AnalyticsPermission])
+    def analytics(self, request, *args, **kwargs):
+        # Read from the daily rollups refreshed by refresh_rollups, never from the raw rows
+        return Response(course_analytics(self.get_object()))
     
     def perform_create(self, serializer):
         title = self.request.data.get('title')
@@ -99,11 +212,21 @@ class CourseViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
 
-class ContentViewSet(viewsets.ModelViewSet):
+class ContentViewSet(ConditionalCourseContentMixin, viewsets.ModelViewSet):
     queryset = Content.objects.all()
     serializer_class = ContentSerializer
     permission_classes = [ContentPermission]
     lookup_field = 'slug'
+    ordering = 'id'
+
+    def get_queryset(self):
+        return super().get_queryset().filter(course=get_course(self))
+
+    def list(self, request, *args, **kwargs):
+        # Permissions have already been checked, and the lesson list is the same for every allowed user.
+        # The ETag check wraps the cache, so a cached list still answers 304 to a client that has it
+        render = partial(viewsets.ModelViewSet.list, self, request, *args, **kwargs)
+        return self.conditional(partial(cached_response, self.kwargs['course_slug'], 'lessons', request, render))
 
     def perform_create(self, serializer):
         course = get_course(self)
@@ -113,6 +236,7 @@ class ContentViewSet(viewsets.ModelViewSet):
 class MessageViewSet(viewsets.ModelViewSet):
     serializer_class = MessageSerializer
     permission_classes = [MessagesPermission]
+    ordering = ('-timestamp', '-id')
 
     def get_queryset(self):
         course= get_course(self)
@@ -131,35 +255,157 @@ class MessageViewSet(viewsets.ModelViewSet):
             raise ValidationError("You can only send messages to your enrolled instructors.")
 
 
-class AssessmentViewSet(viewsets.ModelViewSet):
+class ConversationViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = ConversationSerializer
+    permission_classes = [ConversationPermission]
+    lookup_field = 'peer__username'
+    lookup_value_regex = '[^/]+'
+    ordering = ('-updated_at', '-id')
+
+    def get_queryset(self):
+        course = get_course(self)
+        return Conversation.objects.filter(user=self.request.user, course=course).select_related(
+            'peer', 'last_message__sender'
+        )
+
+    @action(detail=True)
+    def messages(self, request, *args, **kwargs):
+        conversation = self.get_object()
+        page_size = CursorPagination().get_page_size(request)
+
+        cursor = request.query_params.get('cursor')
+        position = decode_cursor(cursor) if cursor else None
+        if cursor and position is None:
+            raise NotFound("Invalid cursor.")
+
+        messages, has_more = thread_history(get_course(self), request.user, conversation.peer, page_size, position)
+        next_url = None
+        if has_more:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', encode_cursor(messages[-1]))
+
+        serializer = ThreadMessageSerializer(messages, many=True)
+        return Response({'next': next_url, 'results': serializer.data})
+
+    @action(detail=True, methods=['post'])
+    def read(self, request, *args, **kwargs):
+        conversation = self.get_object()
+        Conversation.objects.filter(pk=conversation.pk).update(unread_count=0)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ProgressViewSet(viewsets.ViewSet):
+    permission_classes = [ProgressPermission]
+
+    def list(self, request, *args, **kwargs):
+        # One indexed row; the lesson count comes from the course's counter
+        course = get_course(self)
+        progress = CourseProgress.objects.filter(student=request.user, course=course).first()
+        if progress is None:
+            progress = CourseProgress(student=request.user, course=course)
+        progress.course = course
+        return Response(CourseProgressSerializer(progress).data)
+
+    @action(detail=False, methods=['post'])
+    def events(self, request, *args, **kwargs):
+        course = get_course(self)
+        serializer = ProgressEventBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        events = serializer.validated_data['events']
+
+        lessons = dict(Content.objects.filter(
+            course=course, slug__in={event['lesson'] for event in events}
+        ).values_list('slug', 'pk'))
+        unknown = sorted({event['lesson'] for event in events} - set(lessons))
+        if unknown:
+            raise ValidationError({"events": f"Unknown lesson(s): {', '.join(unknown)}."})
+
+        # Client clocks may run ahead, no event is recorded in the future
+        now = timezone.now()
+        get_buffer().add(request.user.pk, course.pk, [
+            (lessons[event['lesson']], event['type'], min(event.get('at', now), now)) for event in events
+        ])
+        return Response({'accepted': len(events)}, status=status.HTTP_202_ACCEPTED)
+
+
+class AssessmentViewSet(ConditionalCourseContentMixin, viewsets.ModelViewSet):
     serializer_class = AssessmentSerializer
     permission_classes = [ContentPermission]
     lookup_field = 'title'
+    ordering = 'id'
 
     def get_queryset(self):
-        content_slug = self.kwargs.get('content_slug')
-        content = get_object_or_404(Content, slug=content_slug)
+        content = self.get_content()
         queryset = Assessment.objects.filter(content=content)
-        return queryset
+        if self.action in ['full', 'submit']:
+            # The export prefetches its own tree once the ETag check has passed, grading needs none
+            return queryset
+        return queryset.prefetch_related('question_set')
 
-    def perform_create(self, serializer):
-        content_slug = self.kwargs.get('content_slug')
-        content = get_object_or_404(Content, slug=content_slug)
-        serializer.save(content=content)
+    def get_permissions(self):
+        if self.action in ['submit']:
+            return [AttemptPermission()]
+        return super().get_permissions()
 
+    def get_content(self):
+        content_slug = self.kwargs.get('content_slug')
+        return get_object_or_404(Content, slug=content_slug, course=get_course(self))
 
-class QuestionViewSet(viewsets.ModelViewSet):
+    def perform_create(self, serializer):
+        serializer.save(content=self.get_content())
+
+    @action(detail=True, url_path='full')
+    def full(self, request, *args, **kwargs):
+        assessment = self.get_object()
+        hide_answers = request.user != get_course(self).instructor.user
+
+        def render():
+            # Questions and options are fetched in one query each, whatever the size of the assessment
+            prefetch_related_objects([assessment], Prefetch(
+                'question_set',
+                queryset=Question.objects.order_by('id').prefetch_related(
+                    Prefetch('option_set', queryset=Option.objects.order_by('id'))
+                ),
+            ))
+            serializer = AssessmentExportSerializer(assessment, context={'hide_answers': hide_answers})
+            return Response(serializer.data)
+
+        # Students and the instructor get different bodies, so they get different ETags
+        role = 'questions' if hide_answers else 'answers'
+        last_modified = assessment.updated_at.timestamp()
+        etag = f'"assessment-{assessment.pk}-{role}-{last_modified}-{request.accepted_renderer.format}"'
+        return conditional_response(request, etag, last_modified, render)
+
+    @action(detail=True, methods=['post'])
+    def submit(self, request, *args, **kwargs):
+        assessment = self.get_object()
+        serializer = AttemptSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # The answer key is cached, so grading runs no per-answer queries
+        answer_key = build_answer_key(assessment)
+        answers = {str(question_id): option_id for question_id, option_id in serializer.validated_data['answers'].items()}
+        unknown = sorted(set(answers) - set(answer_key))
+        if unknown:
+            raise ValidationError({"answers": f"Unknown question(s): {', '.join(unknown)}."})
+
+        score, total = grade(answer_key, answers)
+        serializer.save(assessment=assessment, student=request.user, answers=answers, score=score, total=total)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class QuestionViewSet(ConditionalCourseContentMixin, viewsets.ModelViewSet):
     serializer_class = QuestionSerializer
     permission_classes = [ContentPermission]
+    ordering = 'id'
     
     def get_queryset(self):
-        course_slug = self.kwargs.get('course_slug')
+        course = get_course(self)
         assessment_pk = self.kwargs.get('assessment_pk')
         
         queryset = Question.objects.filter(
-                assessment__content__course__slug=course_slug,
+                assessment__content__course=course,
                 assessment_id=assessment_pk
-            ) 
+            ).prefetch_related('option_set')
         return queryset
 
     def perform_create(self, serializer):
@@ -168,23 +414,71 @@ class QuestionViewSet(viewsets.ModelViewSet):
         assessment = Assessment.objects.get(pk=assessment_id)
         serializer.save(assessment=assessment)
 
-
-class OptionViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        assessment = get_object_or_404(
+            Assessment, pk=self.kwargs.get('assessment_pk'), content__course=get_course(self)
+        )
+
+        # The whole tree is validated in memory; errors are reported per question
+        serializer = BulkQuestionSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            questions = Question.objects.bulk_create([
+                Question(assessment=assessment, question_text=item['question_text'])
+                for item in serializer.validated_data
+            ])
+            options = Option.objects.bulk_create([
+                Option(question=question, **option)
+                for question, item in zip(questions, serializer.validated_data)
+                for option in item['options']
+            ])
+            # bulk_create skips the signals that normally bump the assessment and its course
+            Assessment.objects.filter(pk=assessment.pk).update(updated_at=timezone.now())
+            touch_course_content(pk=get_course(self).pk)
+
+        options_by_question = {}
+        for option in options:
+            options_by_question.setdefault(option.question_id, []).append(option)
+        data = [
+            {
+                'id': question.pk,
+                'question_text': question.question_text,
+                'options': NestedOptionSerializer(options_by_question[question.pk], many=True).data,
+            }
+            for question in questions
+        ]
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class OptionViewSet(ConditionalCourseContentMixin, viewsets.ModelViewSet):
     serializer_class  = OptionSerializer
-    permissions_class = [ContentPermission]
+    permission_classes = [ContentPermission]
+    ordering = 'id'
 
     def get_queryset(self):
-        course_slug = self.kwargs.get('course_slug')
+        course = get_course(self)
         assessment_pk = self.kwargs.get('assessment_pk')
         question_pk = self.kwargs.get('question_pk')
 
         queryset = Option.objects.filter(
-                question__assessment__content__course__slug=course_slug,
+                question__assessment__content__course=course,
                 question__assessment_id=assessment_pk,
                 question_id=question_pk
             )
 
         return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['hide_answers'] = self.request.user != get_course(self).instructor.user
+        return context
+
+    def etag_variant(self):
+        role = 'questions' if self.get_serializer_context()['hide_answers'] else 'answers'
+        return f'{role}-{super().etag_variant()}'
+
     def perform_create(self, serializer):
         question_pk = self.kwargs.get('question_pk')
         question = get_object_or_404(Question, pk=question_pk)
@@ -225,4 +519,17 @@ class OptionViewSet(viewsets.ModelViewSet):
 
         else:
             serializer.save(question=question)
-            
\ No newline at end of file
+            
+
+
+class InstrumentationViewSet(viewsets.ViewSet):
+    # Per-route query and latency aggregates recorded by InstrumentationMiddleware
+    permission_classes = [permissions.IsAdminUser]
+
+    def list(self, request):
+        return Response(route_stats())
+
+    @action(detail=False, methods=['post'])
+    def reset(self, request):
+        reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)